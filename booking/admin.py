@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Team, Room, Booking, UserProfile
+from .models import Team, Room, Booking, ArchivedBooking, BookingRequest, UserProfile
 
 admin.site.register(Team)
 admin.site.register(Room)
 admin.site.register(Booking)
-admin.site.register(UserProfile)
\ No newline at end of file
+admin.site.register(UserProfile)
+admin.site.register(BookingRequest)
+admin.site.register(ArchivedBooking)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BookingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'booking'
+
+    def ready(self):
+        # Connect model signal handlers
+        from . import signals  # noqa: F401
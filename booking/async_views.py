@@ -0,0 +1,186 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+from rest_framework.request import Request
+from .authentication import token_cache
+from .models import BOOKING_HOURS, Room
+from .cache import availability_cache, occupancy_index, slot_date
+from .events import stream_filters, aevent_stream
+from .export import EXPORT_FORMATS, export_filters, aexport_stream
+from .filters import booking_list_etag, booking_list_params, booking_list_queryset
+from .serializers import BookingSerializer
+from .throttling import TokenBucket
+from .views import BookingViewSet, BookingCursorPagination
+
+# Async versions of the read-heavy endpoints, served by the ASGI entry point (virtual_workspace/asgi_urls.py).
+# Responses match the DRF views they replace.
+
+# Sync view for the methods the async booking list doesn't serve itself
+booking_list_sync = BookingViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+async def authenticate(request):
+    # Same order of checks as CachedTokenAuthentication and SessionAuthentication; returns (user, error)
+    header = request.headers.get('Authorization', '').split()
+    if header and header[0].lower() == 'token':
+        if len(header) != 2:
+            return None, 'Invalid token header. Token string should not contain spaces.'
+        token, version = await token_cache.alookup(header[1])
+        if token is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=header[1])
+            except Token.DoesNotExist:
+                return None, 'Invalid token.'
+            await token_cache.aset(token, version)
+        if not token.user.is_active:
+            return None, 'User inactive or deleted.'
+        return token.user, None
+    user = await request.auser()
+    if user.is_authenticated:
+        return user, None
+    return None, 'Authentication credentials were not provided.'
+
+
+async def throttle(request, scope):
+    # Same token bucket and key as the DRF throttles (token or session user, else client IP); a 429 response, or None to go ahead
+    bucket = TokenBucket(scope)
+    if not bucket.enabled():
+        # Off by default; don't look up a session for nothing
+        return None
+    user, _ = await authenticate(request)
+    ident = f'user:{user.pk}' if user else f'ip:{BaseThrottle().get_ident(request)}'
+    wait = await sync_to_async(bucket.consume)(ident)
+    if not wait:
+        return None
+    throttled = Throttled(wait)
+    return JsonResponse({'detail': str(throttled.detail)}, status=429, headers={'Retry-After': str(throttled.wait)})
+
+
+def room_data(room, available_spots):
+    return {
+        'id': room.id,
+        'name': room.name,
+        'type': room.room_type,
+        'capacity': room.capacity,
+        'available_spots': available_spots,
+    }
+
+
+async def load_rooms(rooms):
+    return [room async for room in rooms.order_by('id')]
+
+
+# available_rooms is the async AvailableRoomsView
+async def available_rooms(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    throttled = await throttle(request, 'availability')
+    if throttled:
+        return throttled
+    room_type = request.GET.get('type')
+    date = request.GET.get('date')
+    hour = request.GET.get('hour')
+    rooms = Room.objects.all()
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    available = []
+    cache_key = None
+    if date and hour:
+        try:
+            hour_int = int(hour)
+        except ValueError:
+            # Invalid hour values match no rooms
+            hour_int = None
+        if hour_int is not None:
+            if slot_date(date) is None:
+                return JsonResponse({'detail': 'Enter a valid date in YYYY-MM-DD format.'}, status=400)
+            if not BOOKING_HOURS[0] <= hour_int <= BOOKING_HOURS[-1]:
+                return JsonResponse({'detail': 'Booking hours must be between 9 and 18 (9AM-6PM).'}, status=400)
+            cache_key = await sync_to_async(availability_cache.result_key)(room_type, date, hour_int)
+            cached = await sync_to_async(availability_cache.get)(cache_key)
+            if cached is not None:
+                return JsonResponse(cached)
+            # The day's occupancy arrays cover every room; a missing day loads in one query
+            available = await sync_to_async(occupancy_index.available)(room_type, date, hour_int)
+    else:
+        for room in await load_rooms(rooms):
+            available.append(room_data(room, room.capacity if room.room_type == 'shared' else 1))
+    if date and hour and room_type and not available:
+        result = {'rooms': [], 'message': 'No available room for the selected slot and type.'}
+    else:
+        result = {'rooms': available}
+    if cache_key is not None:
+        await sync_to_async(availability_cache.set)(cache_key, result)
+    return JsonResponse(result)
+
+
+# booking_list is the async booking list (GET); other methods go to BookingViewSet
+@csrf_exempt
+async def booking_list(request):
+    if request.method != 'GET':
+        return await sync_to_async(booking_list_sync)(request)
+    user, error = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': error}, status=403)
+    try:
+        filters = booking_list_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+    etag = await sync_to_async(booking_list_etag)(user, filters, request.build_absolute_uri(), 'application/json')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        paginator = BookingCursorPagination()
+        # The paginator runs the single page query; the relations shown are joined, so serializing needs no queries
+        page = await sync_to_async(paginator.paginate_queryset)(booking_list_queryset(user, filters), Request(request))
+        response = JsonResponse({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': BookingSerializer(page, many=True, fields=filters['fields']).data,
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# slot_stream pushes occupancy changes as Server-Sent Events, optionally filtered by date, hour and type.
+# It is only routed under ASGI, where an open stream costs a task instead of a worker.
+async def slot_stream(request):
+    try:
+        filters = stream_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+    # Reconnects count against the availability bucket, like the reads they replace
+    throttled = await throttle(request, 'availability')
+    if throttled:
+        return throttled
+    response = StreamingHttpResponse(
+        aevent_stream(filters, request.headers.get('Last-Event-ID')), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let a proxy hold events back
+    return response
+
+
+# booking_export is the async BookingViewSet.export; Django would buffer a sync iterator in memory under ASGI
+async def booking_export(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user, error = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': error}, status=403)
+    if not user.is_staff:
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+    output = request.GET.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        return JsonResponse({'detail': 'Output must be csv or ndjson.'}, status=400)
+    try:
+        filters = export_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+    response = StreamingHttpResponse(aexport_stream(filters, output), content_type=EXPORT_FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="bookings.{output}"'
+    return response
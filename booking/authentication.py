@@ -0,0 +1,172 @@
+import hashlib
+import time
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .cache import LRUCache
+
+AUTH_CACHE_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,  # seconds a token stays in the shared cache; deleting it or saving its user drops it at once
+    'LOCAL_TTL': 5,  # seconds a worker trusts its own copy; bounds how late other workers see a revocation
+    'LOCAL_MAX_ENTRIES': 10000,
+}
+
+
+def auth_cache_config():
+    return {**AUTH_CACHE_DEFAULTS, **getattr(settings, 'BOOKING_AUTH_CACHE', {})}
+
+
+# TokenCache keeps what authentication needs about a token's user in a per-process LRU in front of a shared Django cache.
+# Entries are plain tuples of the user's id, username and flags, stored under a hash of the key: neither the
+# raw token nor the password hash is ever written to the cache. Each hit is rebuilt into a fresh Token and User.
+# Shared entries live under a per-token version that invalidation bumps. A cache fill writes under the version
+# it read before querying the database, so a fill racing a deactivation lands on a key that is never read again.
+class TokenCache:
+    # User fields kept per token, in model field order as from_db expects; any other field is loaded if a view reads it
+    USER_FIELDS = ['id', 'is_superuser', 'username', 'is_staff', 'is_active']
+
+    def __init__(self, alias='default', ttl=300, local_ttl=5, local_max_entries=10000):
+        self.alias = alias
+        self.ttl = ttl
+        self.local = LRUCache(max_entries=local_max_entries, ttl=local_ttl)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def digest(self, key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def version_key(self, key):
+        return 'booking:version:token:' + self.digest(key)
+
+    def make_key(self, key, version):
+        return f'booking:token:{version}:{self.digest(key)}'
+
+    def _new_version(self):
+        # Start from the clock so a version key that was evicted never reuses an old number
+        return int(time.time() * 1000)
+
+    def version(self, key):
+        version_key = self.version_key(key)
+        version = self.cache.get(version_key)
+        if version is None:
+            self.cache.add(version_key, self._new_version(), None)
+            version = self.cache.get(version_key)
+        return version
+
+    async def aversion(self, key):
+        version_key = self.version_key(key)
+        version = await self.cache.aget(version_key)
+        if version is None:
+            await self.cache.aadd(version_key, self._new_version(), None)
+            version = await self.cache.aget(version_key)
+        return version
+
+    def lookup(self, key):
+        """
+        (Token with .user loaded, None) on a hit, or (None, version) on a miss. Pass the
+        version to set() once the token has been read from the database.
+        """
+        entry = self.local.get(key)
+        if entry is not None:
+            return self.build(key, entry), None
+        if self.ttl <= 0:
+            return None, None
+        version = self.version(key)
+        entry = self.cache.get(self.make_key(key, version))
+        if entry is None:
+            return None, version
+        self.local.set(key, entry)
+        return self.build(key, entry), None
+
+    async def alookup(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            return self.build(key, entry), None
+        if self.ttl <= 0:
+            return None, None
+        version = await self.aversion(key)
+        entry = await self.cache.aget(self.make_key(key, version))
+        if entry is None:
+            return None, version
+        self.local.set(key, entry)
+        return self.build(key, entry), None
+
+    def entry(self, token):
+        return tuple(getattr(token.user, field) for field in self.USER_FIELDS)
+
+    def build(self, key, entry):
+        # New instances per request, so changes a view makes to request.user never reach the cache
+        user = AuthUser.from_db(DEFAULT_DB_ALIAS, self.USER_FIELDS, list(entry))
+        token = Token.from_db(DEFAULT_DB_ALIAS, ['key', 'user_id'], [key, user.pk])
+        token.user = user
+        return token
+
+    def set(self, token, version=None):
+        # version as returned by lookup() before the token was read; None reads the current one
+        if self.ttl <= 0:
+            return
+        if version is None:
+            version = self.version(token.key)
+        entry = self.entry(token)
+        self.local.set(token.key, entry)
+        self.cache.set(self.make_key(token.key, version), entry, self.ttl)
+
+    async def aset(self, token, version=None):
+        if self.ttl <= 0:
+            return
+        if version is None:
+            version = await self.aversion(token.key)
+        entry = self.entry(token)
+        self.local.set(token.key, entry)
+        await self.cache.aset(self.make_key(token.key, version), entry, self.ttl)
+
+    def invalidate(self, key):
+        # Move the token to a new version now and again after commit, so neither an entry filled inside the
+        # transaction nor one filled from a read that started before the change is used again
+        def drop():
+            self.local.delete(key)
+            try:
+                self.cache.incr(self.version_key(key))
+            except ValueError:
+                self.cache.add(self.version_key(key), self._new_version(), None)
+        drop()
+        transaction.on_commit(drop)
+
+    def clear(self):
+        self.local.clear()
+
+
+_auth_cache_settings = auth_cache_config()
+
+# Shared per-process token cache used by CachedTokenAuthentication and the async views
+token_cache = TokenCache(
+    alias=_auth_cache_settings['CACHE_ALIAS'],
+    ttl=_auth_cache_settings['TTL'],
+    local_ttl=_auth_cache_settings['LOCAL_TTL'],
+    local_max_entries=_auth_cache_settings['LOCAL_MAX_ENTRIES'],
+)
+
+
+# CachedTokenAuthentication is DRF's TokenAuthentication with the token and user lookup cached.
+# A cache hit authenticates without a query, with a user that has only TokenCache.USER_FIELDS loaded;
+# misses fall back to the usual token/user join and fill the cache.
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token, version = token_cache.lookup(key)
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token_cache.set(token, version)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
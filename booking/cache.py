@@ -0,0 +1,388 @@
+import datetime
+import operator
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from .events import publish_slot_change
+
+
+# LRUCache is a thread-safe in-process cache with LRU eviction and a per-entry TTL
+class LRUCache:
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # Expired entries are dropped on read
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def slot_date(date):
+    # Accept both request strings and date objects
+    if not isinstance(date, datetime.date):
+        date = parse_date(date)
+    return date
+
+
+# AvailabilityResultCache stores AvailableRoomsView responses under versioned keys in a Django cache.
+# Booking writes bump the (date, hour) version and room changes bump the rooms version,
+# so stale results are never read again and simply expire.
+class AvailabilityResultCache:
+    def __init__(self, alias='default', ttl=30):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _version_keys(self, date, hour):
+        return 'booking:version:rooms', f'booking:version:slot:{slot_date(date).isoformat()}:{int(hour)}'
+
+    def _new_version(self):
+        # Start from the clock so a version key that was evicted never reuses an old number
+        return int(time.time() * 1000)
+
+    def _bump(self, key):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, self._new_version(), None)
+
+    def bump_slot(self, date, hour):
+        self._bump(self._version_keys(date, hour)[1])
+
+    def bump_rooms(self):
+        self._bump('booking:version:rooms')
+
+    def day_version_key(self, date):
+        return f'booking:version:day:{slot_date(date).isoformat()}'
+
+    def bump_day(self, date):
+        self._bump(self.day_version_key(date))
+
+    def list_version_keys(self, user_id):
+        # What a user's booking list depends on: rooms, archiving (all lists) and the user's own bookings
+        return ['booking:version:rooms', 'booking:version:lists', f'booking:version:list:{user_id}']
+
+    def bump_lists(self, user_ids=None):
+        # Move the given users' booking lists to a new version, or every list when user_ids is None
+        if user_ids is None:
+            self._bump('booking:version:lists')
+        for user_id in user_ids or []:
+            self._bump(f'booking:version:list:{user_id}')
+
+    def versions(self, keys):
+        # {key: version} in one read, starting any version that isn't set yet
+        versions = self.cache.get_many(keys)
+        missing = {key: self._new_version() for key in keys if key not in versions}
+        if missing:
+            for key, version in missing.items():
+                self.cache.add(key, version, None)
+            versions = self.cache.get_many(keys)
+        return {key: versions.get(key, 0) for key in keys}
+
+    def result_key(self, room_type, date, hour):
+        keys = self._version_keys(date, hour)
+        versions = self.versions(keys)
+        rooms_version, slot_version = (versions[key] for key in keys)
+        return f'booking:available:{rooms_version}:{slot_version}:{room_type or "all"}:{slot_date(date).isoformat()}:{int(hour)}'
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, result):
+        self.cache.set(key, result, self.ttl)
+
+
+# TeamEligibilityCache keeps each team's id, name and member count in a Django cache, so conference
+# bookings check eligibility without reading the team. Membership and team changes invalidate the entry.
+class TeamEligibilityCache:
+    def __init__(self, alias='default', ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, team_id):
+        return f'booking:team:{team_id}'
+
+    def get_team(self, team_id):
+        # Team with id, name and member_count loaded, or None if there is no such team
+        from .models import Team
+        try:
+            team_id = int(team_id)
+        except (TypeError, ValueError):
+            return None
+        values = self.cache.get(self.make_key(team_id)) if self.ttl > 0 else None
+        if values is None:
+            # One primary key read on a miss
+            values = Team.objects.filter(pk=team_id).values('id', 'name', 'member_count').first()
+            if values is None:
+                return None
+            if self.ttl > 0:
+                self.cache.set(self.make_key(team_id), values, self.ttl)
+        return Team.from_db(None, list(values), list(values.values()))
+
+    def invalidate(self, team_id):
+        # Drop the entry now and again after commit, so a read made inside the transaction doesn't linger
+        key = self.make_key(team_id)
+        self.cache.delete(key)
+        transaction.on_commit(lambda: self.cache.delete(key))
+
+
+# RoomTable is the room list as parallel columns in id order; OccupancyIndex arrays line up with its positions
+class RoomTable:
+    def __init__(self, rooms, version):
+        self.version = version
+        self.ids = array('q', [room.id for room in rooms])
+        self.names = [room.name for room in rooms]
+        self.types = [room.room_type for room in rooms]
+        self.capacities = array('L', [room.capacity for room in rooms])
+        # Bookings allowed per slot (Room.slot_capacity), the column availability is computed against
+        self.slot_capacities = array('L', [room.slot_capacity() for room in rooms])
+        self.positions = {room_id: position for position, room_id in enumerate(self.ids)}
+        self.by_type = {}
+        for position, room_type in enumerate(self.types):
+            self.by_type.setdefault(room_type, array('L')).append(position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, room_type=None):
+        # Positions of the rooms of a type (all rooms without one), in id order
+        if not room_type:
+            return range(len(self.ids))
+        return self.by_type.get(room_type, ())
+
+    def room_data(self, position, available_spots):
+        return {
+            'id': self.ids[position],
+            'name': self.names[position],
+            'type': self.types[position],
+            'capacity': self.capacities[position],
+            'available_spots': available_spots,
+        }
+
+
+# DayOccupancy holds one day's booked counts for every room in a flat array, hour-major:
+# counts[hour_index * rooms + position]. An hour's column across all rooms is one contiguous slice.
+class DayOccupancy:
+    def __init__(self, date, counts, rooms, version):
+        self.date = date
+        self.counts = counts
+        self.rooms = rooms
+        self.version = version
+
+    def booked(self, hour_index):
+        size = len(self.rooms)
+        return self.counts[hour_index * size:(hour_index + 1) * size]
+
+    def spots(self, hour_index):
+        # Spots left in every room for one hour, computed over the whole column at once
+        return list(map(operator.sub, self.rooms.slot_capacities, self.booked(hour_index)))
+
+    def room_counts(self, position, hours):
+        # Booked counts for one room, one per hour
+        return list(self.counts[position::len(self.rooms)][:hours])
+
+
+# OccupancyIndex keeps per-day occupancy arrays in this process, loaded lazily: a day missing from the
+# index is read with one range query over SlotOccupancy (several days at once share the query).
+# Each day is stamped with its version from the shared cache, which every booking write bumps after
+# commit, so a worker reloads a day as soon as another worker changes it.
+class OccupancyIndex:
+    ROOMS = 'rooms'
+
+    def __init__(self, max_days=366, ttl=30):
+        self.local = LRUCache(max_entries=max_days + 1, ttl=ttl)
+        # Days served from the index, days (re)loaded from SlotOccupancy, and the range queries that loaded them
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def load(self, dates):
+        # (RoomTable, {date: DayOccupancy}) for the given dates
+        from .models import BOOKING_HOURS, OPENING_HOUR, Room, SlotOccupancy
+        dates = sorted({slot_date(date) for date in dates})
+        day_keys = {date: availability_cache.day_version_key(date) for date in dates}
+        versions = availability_cache.versions(['booking:version:rooms', *day_keys.values()])
+        rooms_version = versions['booking:version:rooms']
+        table = self.local.get(self.ROOMS)
+        if table is None or table.version != rooms_version:
+            table = RoomTable(list(Room.objects.order_by('id')), rooms_version)
+            self.local.set(self.ROOMS, table)
+        days = {}
+        missing = []
+        for date in dates:
+            day = self.local.get(date)
+            if day is None or day.version != versions[day_keys[date]] or day.rooms is not table:
+                missing.append(date)
+            else:
+                days[date] = day
+        self.hits += len(days)
+        self.misses += len(missing)
+        if missing:
+            self.loads += 1
+            size = len(table)
+            counts = {date: array('L', [0]) * (size * len(BOOKING_HOURS)) for date in missing}
+            slots = SlotOccupancy.objects.filter(date__in=missing, count__gt=0).values_list('date', 'room_id', 'hour', 'count')
+            for date, room_id, hour, count in slots:
+                position = table.positions.get(room_id)
+                if position is not None and hour in BOOKING_HOURS:
+                    counts[date][(hour - OPENING_HOUR) * size + position] = count
+            for date in missing:
+                days[date] = DayOccupancy(date, counts[date], table, versions[day_keys[date]])
+                self.local.set(date, days[date])
+        return table, days
+
+    def available(self, room_type, date, hour):
+        # Rooms of the type with a spot left in the slot, as available rooms API entries
+        from .models import OPENING_HOUR
+        table, days = self.load([date])
+        spots = days[slot_date(date)].spots(int(hour) - OPENING_HOUR)
+        return [table.room_data(position, spots[position]) for position in table.select(room_type) if spots[position] > 0]
+
+    def booked(self, room_id, date, hour):
+        # Booked count of one slot; a room the table doesn't know yet is read from its counter
+        from .models import OPENING_HOUR, SlotOccupancy
+        table, days = self.load([date])
+        position = table.positions.get(int(room_id))
+        if position is None:
+            return SlotOccupancy.counts([room_id], slot_date(date), hour)[room_id]
+        return days[slot_date(date)].booked(int(hour) - OPENING_HOUR)[position]
+
+    def drop(self, date):
+        self.local.delete(slot_date(date))
+
+    def drop_rooms(self):
+        self.local.delete(self.ROOMS)
+
+    def clear(self):
+        self.local.clear()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def stats(self):
+        # Counters are per process, like the index itself
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'size': self.local.stats()['size'],
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+_slot_cache_settings = getattr(settings, 'BOOKING_SLOT_CACHE', {})
+
+# Shared instances used by views, model validation and signal handlers
+availability_cache = AvailabilityResultCache(
+    alias=_slot_cache_settings.get('CACHE_ALIAS', 'default'),
+    ttl=_slot_cache_settings.get('TTL', 30),
+)
+team_cache = TeamEligibilityCache(
+    alias=_slot_cache_settings.get('CACHE_ALIAS', 'default'),
+    ttl=_slot_cache_settings.get('TEAM_TTL', 300),
+)
+occupancy_index = OccupancyIndex(
+    max_days=_slot_cache_settings.get('INDEX_DAYS', 366),
+    ttl=_slot_cache_settings.get('TTL', 30),
+)
+
+
+def invalidate_slot(room_id, date, hour):
+    # Drop the occupancy day now and again after commit, so reads made inside the transaction don't linger.
+    # Cached availability results and other workers' occupancy days move to a new version once the change
+    # is visible to them, and live slot streams are told about the new occupancy.
+    occupancy_index.drop(date)
+
+    def after_commit():
+        occupancy_index.drop(date)
+        availability_cache.bump_slot(date, hour)
+        availability_cache.bump_day(date)
+        publish_slot_change(room_id, date, hour)
+    transaction.on_commit(after_commit)
+
+
+def invalidate_booking_lists(user_ids=(), team_ids=(), everyone=False):
+    # After commit, move to a new version the booking lists of these users and of every member of these teams
+    # (every list when everyone is set), so their list ETags change
+    user_ids = [user_id for user_id in user_ids if user_id]
+    team_ids = [team_id for team_id in team_ids if team_id]
+
+    def after_commit():
+        from .models import Team
+        if everyone:
+            availability_cache.bump_lists()
+            return
+        affected = set(user_ids)
+        if team_ids:
+            affected.update(Team.members.through.objects.filter(team_id__in=team_ids).values_list('user_id', flat=True))
+        availability_cache.bump_lists(affected)
+    transaction.on_commit(after_commit)
+
+
+def invalidate_rooms():
+    # Room changes reshape the occupancy arrays: drop this worker's copy now, everyone's after commit
+    occupancy_index.drop_rooms()
+
+    def after_commit():
+        occupancy_index.drop_rooms()
+        availability_cache.bump_rooms()
+    transaction.on_commit(after_commit)
@@ -0,0 +1,19 @@
+from django.db import connections
+
+
+def uses_pool(connection):
+    return bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+
+
+def warm_up_connections():
+    # Open and check a connection for every configured database in this process.
+    # Persistent connections stay open for the thread's first request; with psycopg's pool the
+    # connection goes back to the pool, which has opened its min_size connections by then.
+    warmed = []
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if uses_pool(connection):
+            connection.close()
+        warmed.append(connection.alias)
+    return warmed
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.dateparse import parse_date
+from .locking import cache_lock
+
+logger = logging.getLogger('booking.events')
+
+EVENT_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'HISTORY_TTL': 300,  # seconds an event stays on the bus for other workers and Last-Event-ID replay
+    'POLL_INTERVAL': 0.5,  # seconds between bus reads in each worker
+    'HEARTBEAT': 15,  # seconds between keep-alive comments on an idle stream
+    'MAX_STREAM_SECONDS': 300,  # streams end after this long; EventSource reconnects with Last-Event-ID
+    'MAX_PENDING': 1000,  # events buffered per slow client before the oldest are dropped
+    'RETRY_MS': 3000,  # reconnect delay sent to clients
+}
+
+
+def event_config():
+    return {**EVENT_DEFAULTS, **getattr(settings, 'BOOKING_EVENTS', {})}
+
+
+def slot_event(occupancy):
+    # Occupancy delta for one slot, as sent to clients
+    room = occupancy.room
+    return {
+        'room_id': room.id,
+        'name': room.name,
+        'type': room.room_type,
+        'capacity': room.capacity,
+        'date': occupancy.date.isoformat(),
+        'hour': occupancy.hour,
+        'booked': occupancy.count,
+        'remaining': room.spots_left(occupancy.count),
+    }
+
+
+def stream_filters(params):
+    # {'date', 'hour', 'type'} from query parameters; raises ValueError for malformed values
+    filters = {'date': None, 'hour': None, 'type': params.get('type') or None}
+    if params.get('date'):
+        date = parse_date(params['date'])
+        if date is None:
+            raise ValueError('Enter a valid date in YYYY-MM-DD format.')
+        filters['date'] = date.isoformat()
+    if params.get('hour'):
+        try:
+            filters['hour'] = int(params['hour'])
+        except ValueError:
+            raise ValueError('Invalid hour value.')
+    return filters
+
+
+def format_event(seq, event):
+    return f'id: {seq}\nevent: slot\ndata: {json.dumps(event)}\n\n'
+
+
+# Subscription buffers matching events for one stream; a sync stream blocks on get(), an async one awaits aget()
+class Subscription:
+    def __init__(self, broadcaster, filters, loop=None, max_pending=1000):
+        self.broadcaster = broadcaster
+        self.filters = filters
+        self.loop = loop
+        self.queue = asyncio.Queue(max_pending) if loop else queue.Queue(max_pending)
+
+    def matches(self, event):
+        return all(value is None or event[key] == value for key, value in self.filters.items())
+
+    def put(self, item):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._put, item, asyncio.QueueFull, asyncio.QueueEmpty)
+        else:
+            self._put(item, queue.Full, queue.Empty)
+
+    def _put(self, item, full, empty):
+        # A client that falls this far behind loses its oldest events rather than growing the buffer
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except full:
+                try:
+                    self.queue.get_nowait()
+                except empty:
+                    pass
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+# CacheEventBus carries slot events between workers through a Django cache, under increasing sequence numbers.
+# With a shared cache (file or Redis) every worker sees every event; it stands in for a real pub/sub service.
+# Two publishers must never get the same number, or the second event overwrites the first, so numbers are
+# taken under cache_lock (atomic incr on Redis/Memcached, a file lock on the file cache).
+class CacheEventBus:
+    seq_key = 'booking:events:seq'
+    listeners_key = 'booking:events:listeners'
+
+    def __init__(self, alias='default', ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def event_key(self, seq):
+        return f'booking:events:{seq}'
+
+    def publish(self, envelope):
+        with cache_lock(self.cache):
+            self.cache.add(self.seq_key, 0, None)
+            seq = self.cache.incr(self.seq_key)
+        self.cache.set(self.event_key(seq), envelope, self.ttl)
+        return seq
+
+    def latest(self):
+        return self.cache.get(self.seq_key, 0)
+
+    def read(self, after, until):
+        # {seq: envelope} for after < seq <= until; expired or not yet written entries are missing
+        keys = {self.event_key(seq): seq for seq in range(after + 1, until + 1)}
+        return {keys[key]: envelope for key, envelope in self.cache.get_many(keys).items()}
+
+    def mark_listening(self, timeout):
+        self.cache.set(self.listeners_key, True, timeout)
+
+    def has_listeners(self):
+        return bool(self.cache.get(self.listeners_key))
+
+
+# SlotEventBroadcaster fans slot events out to the streams of this worker process.
+# Events published here are delivered locally at once; a poller thread picks up other workers' events from the bus.
+class SlotEventBroadcaster:
+    def __init__(self, bus, poll_interval=0.5, max_pending=1000):
+        self.bus = bus
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.origin = f'{os.getpid()}:{id(self)}'
+        self.subscriptions = set()
+        self.cursor = None
+        self._gap = None
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def subscribe(self, filters, loop=None, start_poller=True):
+        subscription = Subscription(self, filters, loop=loop, max_pending=self.max_pending)
+        with self._lock:
+            self.subscriptions.add(subscription)
+            if self.cursor is None:
+                self.cursor = self.bus.latest()
+            if start_poller and self._poller is None:
+                self._poller = threading.Thread(target=self._poll_forever, name='slot-event-poller', daemon=True)
+                self._poller.start()
+        self.bus.mark_listening(self.listener_timeout)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscriptions.discard(subscription)
+
+    @property
+    def listener_timeout(self):
+        return max(30, self.poll_interval * 10)
+
+    def has_listeners(self):
+        return bool(self.subscriptions) or self.bus.has_listeners()
+
+    def publish(self, event):
+        seq = self.bus.publish({'origin': self.origin, 'event': event})
+        self.deliver(seq, event)
+        return seq
+
+    def deliver(self, seq, event):
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.put((seq, event))
+
+    def poll_once(self):
+        # Deliver other workers' events published since the last poll
+        latest = self.bus.latest()
+        if self.cursor is None or latest < self.cursor:
+            # First poll, or the bus was cleared: start from now
+            self.cursor = latest
+            return
+        if latest == self.cursor:
+            return
+        envelopes = self.bus.read(self.cursor, latest)
+        for seq in range(self.cursor + 1, latest + 1):
+            envelope = envelopes.get(seq)
+            if envelope is None and self._gap != seq:
+                # Numbered but not written yet by another worker (or already expired): give it one more poll
+                self._gap = seq
+                return
+            if envelope is not None and envelope['origin'] != self.origin:
+                self.deliver(seq, envelope['event'])
+            self.cursor = seq
+
+    def _poll_forever(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if not self.subscriptions:
+                self.cursor = None
+                continue
+            try:
+                self.bus.mark_listening(self.listener_timeout)
+                self.poll_once()
+            except Exception:
+                logger.exception('Reading slot events from the bus failed')
+
+    def replay(self, last_event_id, filters):
+        # Events after a client's Last-Event-ID that are still on the bus
+        try:
+            after = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        latest = self.bus.latest()
+        after = max(after, latest - self.max_pending)
+        envelopes = self.bus.read(after, latest)
+        matcher = Subscription(self, filters)
+        return [
+            (seq, envelopes[seq]['event'])
+            for seq in sorted(envelopes)
+            if matcher.matches(envelopes[seq]['event'])
+        ]
+
+
+_event_settings = event_config()
+
+# One broadcaster per worker process, shared by every stream it serves
+broadcaster = SlotEventBroadcaster(
+    CacheEventBus(alias=_event_settings['CACHE_ALIAS'], ttl=_event_settings['HISTORY_TTL']),
+    poll_interval=_event_settings['POLL_INTERVAL'],
+    max_pending=_event_settings['MAX_PENDING'],
+)
+
+
+def publish_slot_change(room_id, date, hour):
+    # Push the slot's new occupancy to every listening stream; runs after the change is committed
+    from .models import SlotOccupancy
+    try:
+        if not broadcaster.has_listeners():
+            return
+        occupancy = SlotOccupancy.objects.select_related('room').filter(room_id=room_id, date=date, hour=hour).first()
+        if occupancy is not None:
+            broadcaster.publish(slot_event(occupancy))
+    except Exception:
+        # Bookings must not fail because a notification could not be sent
+        logger.exception('Publishing slot change for room %s on %s at %s failed', room_id, date, hour)
+
+
+async def aevent_stream(filters, last_event_id=None):
+    # Server-Sent Events for the async (ASGI) stream view; a sync worker would be held for the whole stream
+    from asgiref.sync import sync_to_async
+    config = event_config()
+    # subscribe() reads and writes the shared cache; keep that I/O off the event loop
+    subscription = await sync_to_async(broadcaster.subscribe)(filters, loop=asyncio.get_running_loop())
+    try:
+        yield f'retry: {config["RETRY_MS"]}\n\n'
+        replayed = set()
+        for seq, event in await sync_to_async(broadcaster.replay)(last_event_id, filters):
+            replayed.add(seq)
+            yield format_event(seq, event)
+        deadline = time.monotonic() + config['MAX_STREAM_SECONDS']
+        while time.monotonic() < deadline:
+            item = await subscription.aget(timeout=min(config['HEARTBEAT'], max(0, deadline - time.monotonic())))
+            if item is None:
+                yield ': keep-alive\n\n'
+            elif item[0] not in replayed:
+                yield format_event(*item)
+    finally:
+        subscription.close()
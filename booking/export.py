@@ -0,0 +1,117 @@
+import csv
+import itertools
+import json
+from asgiref.sync import sync_to_async
+from django.utils.dateparse import parse_date
+from .models import ArchivedBooking, Booking
+
+# Rows fetched per round trip; on PostgreSQL this is the server-side cursor's fetch size
+EXPORT_CHUNK_SIZE = 2000
+
+# Exported columns and the value lookups that fill them; related names come from joins, not model instances
+EXPORT_COLUMNS = [
+    ('booking_id', 'booking_id'),
+    ('date', 'date'),
+    ('hour', 'hour'),
+    ('room', 'room__name'),
+    ('type', 'room__room_type'),
+    ('user', 'user__username'),
+    ('team_id', 'team_id'),
+    ('team_name', 'team__name'),
+    ('created_at', 'created_at'),
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_filters(params):
+    # {'type', 'start', 'end', 'team', 'history'} from query parameters; raises ValueError for malformed values
+    filters = {
+        'type': params.get('type') or None,
+        'start': None,
+        'end': None,
+        'team': None,
+        'history': params.get('history') in ['1', 'true', True],
+    }
+    for key in ['start', 'end']:
+        if params.get(key):
+            filters[key] = parse_date(str(params[key]))
+            if filters[key] is None:
+                raise ValueError('Enter a valid date in YYYY-MM-DD format.')
+    if params.get('team'):
+        try:
+            filters['team'] = int(params['team'])
+        except ValueError:
+            raise ValueError('Invalid team id.')
+    return filters
+
+
+def export_querysets(filters):
+    # One values_list query per table: archived bookings (if asked for) first, then live ones, each in date order
+    models = [ArchivedBooking, Booking] if filters['history'] else [Booking]
+    querysets = []
+    for model in models:
+        rows = model.objects.all()
+        if filters['type']:
+            rows = rows.filter(room__room_type=filters['type'])
+        if filters['start']:
+            rows = rows.filter(date__gte=filters['start'])
+        if filters['end']:
+            rows = rows.filter(date__lte=filters['end'])
+        if filters['team']:
+            rows = rows.filter(team_id=filters['team'])
+        querysets.append(
+            rows.order_by('date', 'hour', 'id').values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+        )
+    return querysets
+
+
+# Echo is the file-like object csv.writer needs; it hands each line back instead of storing it
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_line(output, writer, row):
+    values = [export_value(value) for value in row]
+    if output == 'csv':
+        return writer.writerow(values)
+    return json.dumps(dict(zip([name for name, _ in EXPORT_COLUMNS], values))) + '\n'
+
+
+def export_stream(filters, output='csv'):
+    # Export lines for a sync response or file; rows are read through .iterator(), so memory stays flat
+    writer = csv.writer(Echo())
+    if output == 'csv':
+        yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for rows in export_querysets(filters):
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield export_line(output, writer, row)
+
+
+def next_chunk(rows, size):
+    return list(itertools.islice(rows, size))
+
+
+async def aexport_stream(filters, output='csv'):
+    # Export lines for an async (ASGI) response. values_list().aiterator() opens its cursor on the
+    # event loop thread, so the same .iterator() is advanced one chunk at a time in the ORM thread instead.
+    writer = csv.writer(Echo())
+    if output == 'csv':
+        yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for queryset in export_querysets(filters):
+        rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        while chunk := await sync_to_async(next_chunk)(rows, EXPORT_CHUNK_SIZE):
+            for row in chunk:
+                yield export_line(output, writer, row)
@@ -0,0 +1,100 @@
+import hashlib
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .cache import availability_cache
+from .models import Booking, Room
+
+# Columns each BookingSerializer field reads; relations are joined only when one of their columns is asked for
+BOOKING_FIELD_COLUMNS = {
+    'booking_id': ['booking_id'],
+    'user': ['user__username'],
+    'room': ['room__name'],
+    'type': ['room__room_type'],
+    'date': ['date'],
+    'hour': ['hour'],
+    'team_id': ['team'],
+    'team_name': ['team__name'],
+}
+
+
+def booking_list_params(params):
+    """
+    Filters and fields for the booking list from query parameters; raises ValueError
+    for malformed values. Every filter is optional:
+    start/end (dates, inclusive), type, room, team, upcoming (1/true) and fields
+    (comma-separated serializer fields, all of them when absent).
+    """
+    filters = {'start': None, 'end': None, 'type': None, 'room': None, 'team': None, 'upcoming': False, 'fields': None}
+    for key in ['start', 'end']:
+        if params.get(key):
+            filters[key] = parse_date(params[key])
+            if filters[key] is None:
+                raise ValueError('Enter a valid date in YYYY-MM-DD format.')
+    if params.get('type'):
+        if params['type'] not in dict(Room.ROOM_TYPE_CHOICES):
+            raise ValueError('type must be private, conference or shared.')
+        filters['type'] = params['type']
+    for key in ['room', 'team']:
+        if params.get(key):
+            try:
+                filters[key] = int(params[key])
+            except ValueError:
+                raise ValueError(f'Invalid {key} id.')
+    filters['upcoming'] = params.get('upcoming') in ['1', 'true']
+    if params.get('fields'):
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in BOOKING_FIELD_COLUMNS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}. Choose from {", ".join(BOOKING_FIELD_COLUMNS)}.')
+        # Keep the serializer's field order
+        filters['fields'] = [field for field in BOOKING_FIELD_COLUMNS if field in fields]
+    return filters
+
+
+def booking_list_queryset(user, filters):
+    """
+    The user's own and their teams' bookings narrowed by the filters, newest first.
+    Each filter lands on a leading column of a Booking index ((user|team|room, date, hour)
+    or (date)), and with a field list only those columns are selected and only the
+    relations they need are joined.
+    """
+    bookings = Booking.objects.filter(Q(user=user) | Q(team__in=user.teams.values('id')))
+    if filters['start']:
+        bookings = bookings.filter(date__gte=filters['start'])
+    if filters['end']:
+        bookings = bookings.filter(date__lte=filters['end'])
+    if filters['room']:
+        bookings = bookings.filter(room_id=filters['room'])
+    if filters['team']:
+        bookings = bookings.filter(team_id=filters['team'])
+    if filters['type']:
+        bookings = bookings.filter(room__room_type=filters['type'])
+    if filters['upcoming']:
+        # Slots still to come, including the one under way
+        now = timezone.localtime()
+        bookings = bookings.filter(Q(date__gt=now.date()) | Q(date=now.date(), hour__gte=now.hour))
+    if filters['fields'] is None:
+        return bookings.select_related('room', 'user', 'team').order_by('-created_at')
+    columns = [column for field in filters['fields'] for column in BOOKING_FIELD_COLUMNS[field]]
+    relations = sorted({column.split('__')[0] for column in columns if '__' in column})
+    if relations:
+        # Called with no names, select_related would join every non-null relation
+        bookings = bookings.select_related(*relations)
+    # created_at is the cursor's ordering column
+    return bookings.only('created_at', *relations, *columns).order_by('-created_at')
+
+
+def booking_list_etag(user, filters, uri, media_type):
+    """
+    ETag for one page of a user's booking list, from cached versions only (no queries).
+    The user's list version moves whenever one of their or their teams' bookings, their
+    team memberships or names shown in the list change; room changes and archiving move
+    versions shared by every list. Upcoming lists also change with the clock hour.
+    """
+    keys = availability_cache.list_version_keys(user.pk)
+    versions = availability_cache.versions(keys)
+    parts = [str(versions[key]) for key in keys] + [uri, media_type or '']
+    if filters['upcoming']:
+        parts.append(timezone.localtime().strftime('%Y-%m-%dT%H'))
+    return '"' + hashlib.md5('\n'.join(parts).encode()).hexdigest() + '"'
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .locking import cache_lock
+
+IDEMPOTENCY_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 86400,  # seconds a key's response is replayed
+    'PENDING_TTL': 30,  # seconds a key stays claimed by a request that never finished
+    'MAX_KEY_LENGTH': 255,
+    'REPLAY_STATUSES': [201, 202],  # other responses free the key so a retry is decided afresh
+}
+
+
+def idempotency_config():
+    return {**IDEMPOTENCY_DEFAULTS, **getattr(settings, 'BOOKING_IDEMPOTENCY', {})}
+
+
+def request_fingerprint(request):
+    # Short digest of what was asked for, so a key reused for a different booking is caught
+    body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.path} {body}'.encode()).hexdigest()[:16]
+
+
+# IdempotentRequests remembers the response to each (user, Idempotency-Key) pair in a Django cache.
+# Entries are compact tuples of (request fingerprint, status, JSON body, Location, claim); the status is
+# None while the first request is still running, and claim is a token unique to that request, so it only
+# ever stores or frees an entry it still owns. A retry with the same key gets the stored response back
+# without reaching the booking code; the cache's TTL evicts old keys.
+# The 409 for concurrent requests relies on an atomic add: Redis and Memcached have one, the file cache
+# gets one from cache_lock on a single host, and the local-memory cache only within one worker.
+class IdempotentRequests:
+    @property
+    def cache(self):
+        return caches[idempotency_config()['CACHE_ALIAS']]
+
+    def cache_key(self, user, key):
+        return f'booking:idempotency:{user.pk}:{hashlib.sha256(key.encode()).hexdigest()[:32]}'
+
+    def respond(self, request, key, handler):
+        """
+        Return handler()'s response for the first request with this key and replay it for
+        retries. A retry while the first request is still running gets 409; reusing the key
+        for a different request gets 422.
+        """
+        config = idempotency_config()
+        if not key or len(key) > config['MAX_KEY_LENGTH']:
+            return Response(
+                {'detail': f"Idempotency-Key must be 1 to {config['MAX_KEY_LENGTH']} characters."}, status=400
+            )
+        cache_key = self.cache_key(request.user, key)
+        fingerprint = request_fingerprint(request)
+        claim = uuid.uuid4().hex
+        with cache_lock(self.cache):
+            claimed = self.cache.add(cache_key, (fingerprint, None, None, None, claim), config['PENDING_TTL'])
+            entry = None if claimed else self.cache.get(cache_key)
+            if not claimed and entry is None:
+                # Expired between the two calls; claim it again
+                claimed = self.cache.add(cache_key, (fingerprint, None, None, None, claim), config['PENDING_TTL'])
+            elif not claimed and not self.well_formed(entry):
+                # Not an entry this code wrote, so no request owns it; take the key over
+                self.cache.set(cache_key, (fingerprint, None, None, None, claim), config['PENDING_TTL'])
+                claimed = True
+        if not claimed:
+            return self.replay(entry, fingerprint) if entry is not None else self.in_progress()
+        stored = None
+        try:
+            response = handler()
+            if response.status_code in config['REPLAY_STATUSES']:
+                body = json.dumps(response.data, cls=JSONEncoder, separators=(',', ':'))
+                stored = (fingerprint, response.status_code, body, response.get('Location'), claim)
+            return response
+        finally:
+            self.finish(cache_key, claim, stored, config['TTL'])
+
+    def finish(self, cache_key, claim, stored, ttl):
+        # Store the response, or free the key, only while the entry still holds our claim; if our pending
+        # entry expired, another request may have claimed the key or stored its own response since
+        with cache_lock(self.cache):
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry[4:] != (claim,):
+                return
+            if stored is None:
+                self.cache.delete(cache_key)
+            else:
+                self.cache.set(cache_key, stored, ttl)
+
+    def well_formed(self, entry):
+        # Every entry carries its claim token as the fifth item
+        return isinstance(entry, tuple) and len(entry) == 5 and bool(entry[4])
+
+    def replay(self, entry, fingerprint):
+        stored_fingerprint, status_code, body, location, _ = entry
+        if stored_fingerprint != fingerprint:
+            return Response({'detail': 'This Idempotency-Key was already used for a different request.'}, status=422)
+        if status_code is None:
+            return self.in_progress()
+        headers = {'Idempotent-Replayed': 'true'}
+        if location:
+            headers['Location'] = location
+        return Response(json.loads(body), status=status_code, headers=headers)
+
+    def in_progress(self):
+        return Response({'detail': 'A request with this Idempotency-Key is in progress.'}, status=409)
+
+
+# Shared store used by booking creation
+idempotent_requests = IdempotentRequests()
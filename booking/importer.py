@@ -0,0 +1,265 @@
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User as AuthUser
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from .cache import invalidate_rooms
+from .models import CONFERENCE_MIN_MEMBERS, Room, Team, UserProfile
+
+# Bulk import of rooms, users and teams for onboarding an office (see the import_workspace command).
+# Files are read row by row and handled in chunks: each chunk is validated with set-based lookups,
+# then written with bulk_create in one transaction.
+
+
+def read_rows(path):
+    # (row number, dict) pairs from a .csv, .jsonl/.ndjson or .json file; unreadable rows come back as None
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as source:
+        if extension == '.csv':
+            yield from enumerate(csv.DictReader(source), start=1)
+        elif extension in ['.jsonl', '.ndjson']:
+            number = 0
+            for line in source:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else None
+        elif extension == '.json':
+            # A JSON array has to be parsed whole; use JSON lines for very large files
+            rows = json.load(source)
+            if not isinstance(rows, list):
+                raise ValueError('A .json import file must hold a list of objects.')
+            for number, row in enumerate(rows, start=1):
+                yield number, row if isinstance(row, dict) else None
+        else:
+            raise ValueError('Import files must be .csv, .jsonl, .ndjson or .json.')
+
+
+def text(row, field):
+    value = row.get(field)
+    return str(value).strip() if value is not None else ''
+
+
+def positive_int(row, field):
+    try:
+        value = int(row.get(field))
+    except (TypeError, ValueError):
+        raise ValidationError(f'{field} must be a whole number.')
+    if value < 1:
+        raise ValidationError(f'{field} must be at least 1.')
+    return value
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def setup_worker():
+    # Pool processes started with spawn (macOS, Windows) need Django configured before hashing
+    import django
+    django.setup()
+
+
+# RowImport validates and creates one kind of object from import rows; subclasses define the rules
+class RowImport:
+    key = None  # Field that must be unique in the file and the database
+
+    def __init__(self, dry_run=False, chunk_size=1000):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.errors = []  # (row number, message)
+        self.seen = set()
+
+    def run(self, rows):
+        rows = iter(rows)
+        while chunk := list(itertools.islice(rows, self.chunk_size)):
+            valid = self.validate_chunk(chunk)
+            if valid and not self.dry_run:
+                prepared = self.prepare(valid)
+                try:
+                    with transaction.atomic():
+                        self.create(prepared)
+                except IntegrityError as e:
+                    # Someone created one of these concurrently; the whole chunk was rolled back
+                    self.errors += [(number, f'Not imported: {e}') for number, _ in valid]
+                    continue
+            self.imported += len(valid)
+        self.errors.sort()
+        return self
+
+    def validate_chunk(self, chunk):
+        # [(row number, cleaned data)] for the chunk's valid rows; errors are recorded per row
+        cleaned = []
+        for number, row in chunk:
+            if row is None:
+                self.errors.append((number, 'Row could not be parsed.'))
+                continue
+            try:
+                data = self.clean(row)
+            except ValidationError as e:
+                self.errors.append((number, e.messages[0]))
+                continue
+            if data[self.key] in self.seen:
+                self.errors.append((number, f'Duplicate {self.key} "{data[self.key]}" in this file.'))
+                continue
+            self.seen.add(data[self.key])
+            cleaned.append((number, data))
+        taken = self.existing({data[self.key] for _, data in cleaned})
+        valid = []
+        for number, data in cleaned:
+            if data[self.key] in taken:
+                self.errors.append((number, f'{self.key} "{data[self.key]}" already exists.'))
+            else:
+                valid.append((number, data))
+        return valid
+
+    def prepare(self, valid):
+        # Work done before the transaction opens
+        return [data for _, data in valid]
+
+    def clean(self, row):
+        raise NotImplementedError
+
+    def existing(self, keys):
+        raise NotImplementedError
+
+    def create(self, rows):
+        raise NotImplementedError
+
+
+# RoomImport rows: name, room_type, capacity
+class RoomImport(RowImport):
+    key = 'name'
+
+    def clean(self, row):
+        name = text(row, 'name')
+        room_type = text(row, 'room_type')
+        if not name:
+            raise ValidationError('name is required.')
+        if len(name) > 50:
+            raise ValidationError('name must be at most 50 characters.')
+        if room_type not in dict(Room.ROOM_TYPE_CHOICES):
+            raise ValidationError('room_type must be private, conference or shared.')
+        return {'name': name, 'room_type': room_type, 'capacity': positive_int(row, 'capacity')}
+
+    def existing(self, keys):
+        return set(Room.objects.filter(name__in=keys).values_list('name', flat=True))
+
+    def create(self, rows):
+        Room.objects.bulk_create([Room(**data) for data in rows])
+        # bulk_create skips the post_save signal that bumps the cached room list
+        invalidate_rooms()
+
+
+# UserImport rows: username, password, age, gender; passwords are hashed in a process pool
+class UserImport(RowImport):
+    key = 'username'
+
+    def __init__(self, dry_run=False, chunk_size=1000, workers=None):
+        super().__init__(dry_run=dry_run, chunk_size=chunk_size)
+        self.workers = os.cpu_count() if workers is None else workers
+
+    def run(self, rows):
+        if self.dry_run or self.workers < 2:
+            self.pool = None
+            return super().run(rows)
+        with ProcessPoolExecutor(self.workers, initializer=setup_worker) as self.pool:
+            return super().run(rows)
+
+    def clean(self, row):
+        username = text(row, 'username')
+        if not username:
+            raise ValidationError('username is required.')
+        if len(username) > 150:
+            raise ValidationError('username must be at most 150 characters.')
+        AuthUser.username_validator(username)
+        password = row.get('password')
+        if not password:
+            raise ValidationError('password is required.')
+        gender = text(row, 'gender')
+        if not gender or len(gender) > 10:
+            raise ValidationError('gender is required and must be at most 10 characters.')
+        return {'username': username, 'password': str(password), 'age': positive_int(row, 'age'), 'gender': gender}
+
+    def existing(self, keys):
+        return set(AuthUser.objects.filter(username__in=keys).values_list('username', flat=True))
+
+    def prepare(self, valid):
+        rows = super().prepare(valid)
+        passwords = [data['password'] for data in rows]
+        if self.pool:
+            hashed = self.pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (self.workers * 4)))
+        else:
+            hashed = map(hash_password, passwords)
+        for data, password in zip(rows, hashed):
+            data['password'] = password
+        return rows
+
+    def create(self, rows):
+        users = AuthUser.objects.bulk_create([
+            AuthUser(username=data['username'], password=data['password']) for data in rows
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, age=data['age'], gender=data['gender']) for user, data in zip(users, rows)
+        ])
+
+
+# TeamImport rows: name, members (a list, or usernames separated by ";" in CSV)
+class TeamImport(RowImport):
+    key = 'name'
+
+    def clean(self, row):
+        name = text(row, 'name')
+        if not name:
+            raise ValidationError('name is required.')
+        if len(name) > 100:
+            raise ValidationError('name must be at most 100 characters.')
+        members = row.get('members') or []
+        if isinstance(members, str):
+            members = members.split(';')
+        members = sorted({str(member).strip() for member in members if str(member).strip()})
+        if len(members) < CONFERENCE_MIN_MEMBERS:
+            raise ValidationError('Conference rooms require a team of at least 3 members.')
+        return {'name': name, 'members': members}
+
+    def existing(self, keys):
+        return set(Team.objects.filter(name__in=keys).values_list('name', flat=True))
+
+    def validate_chunk(self, chunk):
+        valid = super().validate_chunk(chunk)
+        # Resolve every member of the chunk with one query
+        usernames = {username for _, data in valid for username in data['members']}
+        self.user_ids = dict(AuthUser.objects.filter(username__in=usernames).values_list('username', 'id'))
+        resolved = []
+        for number, data in valid:
+            missing = [username for username in data['members'] if username not in self.user_ids]
+            if missing:
+                self.errors.append((number, 'Unknown members: ' + ', '.join(missing) + '.'))
+            else:
+                resolved.append((number, data))
+        return resolved
+
+    def create(self, rows):
+        # The through rows skip m2m_changed, so member_count is set here
+        teams = Team.objects.bulk_create([Team(name=data['name'], member_count=len(data['members'])) for data in rows])
+        Team.members.through.objects.bulk_create([
+            Team.members.through(team_id=team.id, user_id=self.user_ids[username])
+            for team, data in zip(teams, rows)
+            for username in data['members']
+        ])
+
+
+IMPORT_KINDS = {
+    'rooms': RoomImport,
+    'users': UserImport,
+    'teams': TeamImport,
+}
@@ -0,0 +1,42 @@
+import os
+import threading
+from contextlib import contextmanager
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Backends whose add/incr are atomic for every process that shares them
+ATOMIC_BACKENDS = {'RedisCache', 'PyMemcacheCache', 'PyLibMCCache', 'LocMemCache'}
+
+_process_lock = threading.Lock()
+
+
+def has_atomic_operations(cache):
+    return type(cache).__name__ in ATOMIC_BACKENDS
+
+
+@contextmanager
+def cache_lock(cache):
+    """
+    Serialize a read-modify-write (add, incr, compare-and-delete) on a Django cache.
+    Free on backends with atomic operations. FileBasedCache's add and incr are a plain
+    get-then-set, so it is locked with flock on a file in the cache directory, which
+    every worker on the host shares. Other backends only get a per-process lock.
+    """
+    if has_atomic_operations(cache):
+        yield
+    elif isinstance(cache, FileBasedCache) and fcntl is not None:
+        os.makedirs(cache._dir, exist_ok=True)
+        # Not a .djcache file, so culling and clear() leave it alone
+        with open(os.path.join(cache._dir, 'booking.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        with _process_lock:
+            yield
@@ -0,0 +1,34 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from booking.models import Booking
+from booking.quotas import week_start
+
+
+# archive_bookings moves past bookings out of the live Booking table, one chunk per transaction
+class Command(BaseCommand):
+    help = 'Move bookings older than a cutoff date into the archive table in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=datetime.date.fromisoformat, help='Archive bookings dated before this day (YYYY-MM-DD).')
+        parser.add_argument('--keep-days', type=int, default=30, help='Without --before, keep this many past days live.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Bookings moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the bookings that would be moved.')
+
+    def handle(self, *args, **options):
+        before = options['before'] or timezone.localdate() - datetime.timedelta(days=options['keep_days'])
+        # Weekly quotas count live bookings only, so this week's bookings must stay in the live table
+        this_week = week_start(timezone.localdate())
+        if before > this_week:
+            raise CommandError(f'Cannot archive bookings from the current week; use a date up to {this_week.isoformat()}.')
+        if options['dry_run']:
+            count = Booking.objects.filter(date__lt=before).count()
+            self.stdout.write(f'{count} bookings dated before {before.isoformat()} would be archived.')
+            return
+        moved = 0
+        while True:
+            count = Booking.archive(before, options['chunk_size'])
+            if not count:
+                break
+            moved += count
+        self.stdout.write(f'Archived {moved} bookings dated before {before.isoformat()}.')
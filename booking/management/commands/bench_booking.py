@@ -0,0 +1,456 @@
+import asyncio
+import datetime
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import uuid
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from booking.cache import team_cache
+from booking.middleware import get_budgets
+from booking.models import Room, Team, Booking, UserProfile, BOOKING_HOURS
+
+# First day used for seeded and benchmarked bookings
+BASE_DATE = datetime.date(2030, 1, 7)
+
+
+def percentiles(samples):
+    # Latency summary in milliseconds
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3)
+    return {
+        'count': len(ordered),
+        'mean': round(statistics.fmean(ordered), 3),
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': round(ordered[-1], 3),
+    }
+
+
+# bench_booking seeds data and measures latency and queries per request for the booking hot paths.
+# It fails when a scenario runs more queries than its endpoint's BOOKING_METRICS budget or a slot is
+# double-booked, so it can gate a release as well as produce numbers.
+class Command(BaseCommand):
+    help = 'Benchmark booking, availability, listing and cancellation, and check concurrent booking (locks and queue) for double-booking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=50)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--teams', type=int, default=20)
+        parser.add_argument('--bookings', type=int, default=2000, help='Bookings to seed before measuring.')
+        parser.add_argument('--days', type=int, default=10, help='Number of days the seeded bookings spread over.')
+        parser.add_argument('--iterations', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Threads racing for one slot (0 to skip).')
+        parser.add_argument(
+            '--skip-connection-overhead', action='store_true',
+            help='Skip comparing a new database connection per request against a reused one.',
+        )
+        parser.add_argument(
+            '--server-concurrency', type=int, default=10,
+            help='Requests in flight when comparing the WSGI and ASGI read paths (0 to skip).',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write JSON results to this file instead of stdout.')
+        parser.add_argument(
+            '--no-test-db', action='store_true',
+            help='Seed into the current database instead of a throwaway test database.',
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        try:
+            setup_test_environment()
+            owns_test_environment = True
+        except RuntimeError:
+            # Already inside a test run
+            owns_test_environment = False
+        # Expected 400s and lock errors are counted in the results rather than logged per request
+        request_logger = logging.getLogger('django.request')
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        old_name = None
+        if not options['no_test_db']:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(options)
+        finally:
+            if old_name is not None:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            request_logger.setLevel(old_level)
+            if owns_test_environment:
+                teardown_test_environment()
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(f"Results written to {options['output']}")
+        else:
+            self.stdout.write(output)
+        if results['failures']:
+            raise CommandError('Benchmark failed:\n' + '\n'.join(results['failures']))
+
+    def run(self, options):
+        self.failures = []
+        started = time.perf_counter()
+        self.seed(options)
+        seed_seconds = time.perf_counter() - started
+        results = {
+            'meta': {
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'rooms': options['rooms'],
+                'users': options['users'],
+                'teams': options['teams'],
+                'seeded_bookings': Booking.objects.count(),
+                'seed_seconds': round(seed_seconds, 3),
+                'iterations': options['iterations'],
+                'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+                'pool': bool(connection.settings_dict.get('OPTIONS', {}).get('pool')),
+            },
+            'scenarios': {},
+        }
+        for name, scenario in self.scenarios():
+            results['scenarios'][name] = scenario(options['iterations'])
+        if not options['skip_connection_overhead']:
+            results['connection_overhead'] = self.bench_connection_overhead(options['iterations'])
+        if options['server_concurrency']:
+            results['server_modes'] = self.bench_server_modes(options['iterations'], options['server_concurrency'])
+        if options['concurrency']:
+            results['contention'] = self.bench_contention(options['concurrency'])
+        results['failures'] = self.failures
+        return results
+
+    def scenarios(self):
+        return [
+            ('booking_create', self.bench_create),
+            ('conference_booking', self.bench_conference),
+            ('available_rooms', self.bench_available),
+            ('booking_list', self.bench_list),
+            ('booking_cancel', self.bench_cancel),
+        ]
+
+    # Seeding
+
+    def seed(self, options):
+        types = ['private', 'shared', 'conference']
+        Room.objects.bulk_create([
+            Room(
+                name=f'bench-room-{i}',
+                room_type=types[i % 3],
+                capacity=4 if types[i % 3] == 'shared' else (10 if types[i % 3] == 'conference' else 1),
+            )
+            for i in range(options['rooms'])
+        ])
+        # One hash for every user keeps seeding fast
+        password = make_password('bench-pass')
+        User.objects.bulk_create([
+            User(username=f'bench-user-{i}', password=password) for i in range(options['users'])
+        ])
+        self.users = list(User.objects.filter(username__startswith='bench-user-').order_by('id'))
+        UserProfile.objects.bulk_create([UserProfile(user=user, age=30, gender='other') for user in self.users])
+        Token.objects.bulk_create([Token(key=uuid.uuid4().hex[:40], user=user) for user in self.users])
+        self.tokens = dict(Token.objects.values_list('user_id', 'key'))
+        Team.objects.bulk_create([Team(name=f'bench-team-{i}') for i in range(options['teams'])])
+        self.teams = list(Team.objects.filter(name__startswith='bench-team-').order_by('id'))
+        memberships = []
+        for i, team in enumerate(self.teams):
+            for j in range(3):
+                user = self.users[(i * 3 + j) % len(self.users)]
+                memberships.append(Team.members.through(team_id=team.id, user_id=user.id))
+        Team.members.through.objects.bulk_create(memberships, ignore_conflicts=True)
+        # bulk_create skips m2m_changed, so count the members here
+        Team.refresh_member_counts([team.id for team in self.teams])
+        self.rooms = list(Room.objects.filter(name__startswith='bench-room-').order_by('id'))
+        self.days = [BASE_DATE + datetime.timedelta(days=i) for i in range(options['days'])]
+        # Seed bookings in chunks through the set-based bulk path
+        requests = []
+        for _ in range(options['bookings']):
+            room = self.random.choice(self.rooms)
+            request = {'room': room, 'date': self.random.choice(self.days), 'hour': self.random.choice(BOOKING_HOURS)}
+            if room.room_type == 'conference':
+                request['team'] = self.random.choice(self.teams)
+            else:
+                request['user'] = self.random.choice(self.users)
+            requests.append(request)
+        for start in range(0, len(requests), 500):
+            Booking.create_bookings_with_lock(requests[start:start + 500], all_or_nothing=False)
+
+    # Measurement helpers
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.tokens[user.id])
+        return client
+
+    def measure(self, calls, reconnect=False, before_each=None):
+        # Run (client, method, url, data) calls and summarize latency, queries and status codes, recording
+        # every endpoint that went over its query budget as a failure.
+        # With reconnect, every request opens a new database connection, as with CONN_MAX_AGE=0 and no pool.
+        latencies = []
+        queries = []
+        statuses = {}
+        over_budget = {}
+        for client, method, url, data in calls:
+            if before_each:
+                before_each()
+            with CaptureQueriesContext(connection) as captured:
+                if reconnect:
+                    connection.close()
+                started = time.perf_counter()
+                if method == 'post':
+                    response = client.post(url, data, format='json')
+                else:
+                    response = client.get(url, data)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            # The budget the metrics middleware holds this endpoint to
+            name = resolve(url).url_name
+            budget = get_budgets(method.upper(), name)[0]
+            if budget is not None and queries[-1] > budget:
+                endpoint = f'{method.upper()} {name}'
+                over_budget[endpoint] = (max(queries[-1], over_budget.get(endpoint, (0, budget))[0]), budget)
+        for endpoint, (worst, budget) in sorted(over_budget.items()):
+            self.failures.append(f'{endpoint}: {worst} queries, budget is {budget}.')
+        return {
+            'latency_ms': percentiles(latencies),
+            'queries_per_request': {
+                'mean': round(statistics.fmean(queries), 2) if queries else 0,
+                'max': max(queries) if queries else 0,
+            },
+            'over_query_budget': sorted(over_budget),
+            'status_codes': statuses,
+        }
+
+    # Scenarios
+
+    def bench_create(self, iterations, reconnect=False):
+        url = reverse('booking-list')
+        calls = []
+        for _ in range(iterations):
+            room = self.random.choice([room for room in self.rooms if room.room_type != 'conference'])
+            user = self.random.choice(self.users)
+            data = {'room_id': room.id, 'date': self.random.choice(self.days).isoformat(), 'hour': self.random.choice(BOOKING_HOURS)}
+            calls.append((self.client_for(user), 'post', url, data))
+        return self.measure(calls, reconnect)
+
+    def bench_conference(self, iterations):
+        # Team bookings of conference rooms, with the team's eligibility cached and with every lookup missing
+        url = reverse('booking-list')
+        rooms = [room for room in self.rooms if room.room_type == 'conference']
+        if not rooms or not self.teams:
+            return {'skipped': 'No conference rooms or teams seeded.'}
+        members = dict(Team.members.through.objects.values_list('team_id', 'user_id'))
+        users = {user.id: user for user in self.users}
+        team_keys = [team_cache.make_key(team.id) for team in self.teams]
+        results = {}
+        for mode, before_each in [('cached_team', None), ('uncached_team', lambda: team_cache.cache.delete_many(team_keys))]:
+            calls = []
+            for _ in range(iterations):
+                team = self.random.choice(self.teams)
+                data = {
+                    'room_id': self.random.choice(rooms).id,
+                    'team_id': team.id,
+                    'date': self.random.choice(self.days).isoformat(),
+                    'hour': self.random.choice(BOOKING_HOURS),
+                }
+                calls.append((self.client_for(users[members[team.id]]), 'post', url, data))
+            results[mode] = self.measure(calls, before_each=before_each)
+        return results
+
+    def bench_available(self, iterations, reconnect=False):
+        url = reverse('available-rooms')
+        client = APIClient()
+        calls = []
+        for _ in range(iterations):
+            params = {
+                'type': self.random.choice(['private', 'shared', 'conference']),
+                'date': self.random.choice(self.days).isoformat(),
+                'hour': self.random.choice(BOOKING_HOURS),
+            }
+            calls.append((client, 'get', url, params))
+        return self.measure(calls, reconnect)
+
+    def bench_list(self, iterations):
+        url = reverse('booking-list')
+        calls = [(self.client_for(self.random.choice(self.users)), 'get', url, None) for _ in range(iterations)]
+        return self.measure(calls)
+
+    def bench_cancel(self, iterations):
+        bookings = list(
+            Booking.objects.filter(user__isnull=False).select_related('user').order_by('?')[:iterations]
+        )
+        calls = [
+            (self.client_for(booking.user), 'post', reverse('cancel-booking', args=[booking.booking_id]), None)
+            for booking in bookings
+        ]
+        return self.measure(calls)
+
+    def bench_connection_overhead(self, iterations):
+        # Same booking and availability calls with a new connection per request and with a reused one
+        if connection.vendor == 'sqlite':
+            return {'skipped': 'SQLite connections are local and the test database is in memory; run against PostgreSQL.'}
+        results = {}
+        for name, scenario in [('booking_create', self.bench_create), ('available_rooms', self.bench_available)]:
+            results[name] = {}
+            for mode, reconnect in [('new_connection', True), ('reused_connection', False)]:
+                results[name][mode] = scenario(iterations, reconnect=reconnect)
+            new, reused = (results[name][mode]['latency_ms'] for mode in ['new_connection', 'reused_connection'])
+            results[name]['p50_saved_ms'] = round(new['p50'] - reused['p50'], 3)
+        return results
+
+    def read_calls(self, iterations):
+        # (url, params, headers) for the read endpoints that have async versions
+        calls = {'available_rooms': [], 'booking_list': []}
+        for _ in range(iterations):
+            calls['available_rooms'].append((reverse('available-rooms'), {
+                'type': self.random.choice(['private', 'shared', 'conference']),
+                'date': self.random.choice(self.days).isoformat(),
+                'hour': self.random.choice(BOOKING_HOURS),
+            }, {}))
+            user = self.random.choice(self.users)
+            calls['booking_list'].append((reverse('booking-list'), {}, {'Authorization': 'Token ' + self.tokens[user.id]}))
+        return calls
+
+    def run_wsgi(self, calls, concurrency):
+        # Sync views, one thread (and connection) per request in flight, like gunicorn threads
+        latencies = []
+        statuses = []
+        lock = threading.Lock()
+
+        def worker(chunk):
+            client = Client()
+            for url, params, headers in chunk:
+                started = time.perf_counter()
+                response = client.get(url, params, headers=headers)
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses.append(response.status_code)
+            connection.close()
+
+        threads = [threading.Thread(target=worker, args=(calls[i::concurrency],)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, statuses
+
+    def run_asgi(self, calls, concurrency):
+        # Async views on one event loop; each request gets its own thread for sync work, as under an ASGI server
+        latencies = []
+        statuses = []
+
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call(url, params, headers):
+                async with semaphore, ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await client.get(url, params, headers=headers)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses.append(response.status_code)
+                    await sync_to_async(connections.close_all)()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(call(*c) for c in calls))
+            return time.perf_counter() - started
+
+        with override_settings(ROOT_URLCONF='virtual_workspace.asgi_urls'):
+            elapsed = asyncio.run(main())
+        return elapsed, latencies, statuses
+
+    def bench_server_modes(self, iterations, concurrency):
+        # Requests per second on the read endpoints: sync views under WSGI against async views under ASGI
+        if connection.vendor == 'sqlite':
+            return {'skipped': 'Concurrent requests need a database server; run against PostgreSQL.'}
+        results = {}
+        for name, calls in self.read_calls(iterations).items():
+            # One untimed pass, so both modes see the same warm caches
+            client = Client()
+            for url, params, headers in calls:
+                client.get(url, params, headers=headers)
+            results[name] = {}
+            for mode, runner in [('wsgi', self.run_wsgi), ('asgi', self.run_asgi)]:
+                elapsed, latencies, statuses = runner(calls, concurrency)
+                results[name][mode] = {
+                    'requests_per_second': round(len(calls) / elapsed, 1) if elapsed else None,
+                    'latency_ms': percentiles(latencies),
+                    'status_codes': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+                }
+        return results
+
+    def bench_contention(self, concurrency):
+        # Many users race for the last free slots of one shared desk and one private room,
+        # once through row locks and once through the admission queue (at a different hour)
+        if connection.vendor == 'sqlite':
+            return {'skipped': 'SQLite turns concurrent writers away with lock errors; run against PostgreSQL.'}
+        day = BASE_DATE + datetime.timedelta(days=len(self.days) + 1)
+        results = {}
+        for mode, hour, queue_enabled in [('lock', 10, False), ('queue', 11, True)]:
+            with override_settings(BOOKING_QUEUE={'ENABLED': queue_enabled, 'WAIT_SECONDS': 10}):
+                results[mode] = {
+                    room_type: self.contend(room_type, day, hour, concurrency)
+                    for room_type in ['shared', 'private']
+                }
+        return results
+
+    def contend(self, room_type, day, hour, concurrency):
+        room = next(room for room in self.rooms if room.room_type == room_type)
+        racers = self.users[:concurrency]
+        barrier = threading.Barrier(len(racers))
+        statuses = []
+        lock = threading.Lock()
+
+        def attempt(user):
+            client = self.client_for(user)
+            barrier.wait()
+            try:
+                response = client.post(reverse('booking-list'), {'room_id': room.id, 'date': day.isoformat(), 'hour': hour}, format='json')
+                outcome = str(response.status_code)
+            except Exception:
+                # Unhandled database errors (e.g. SQLite lock timeouts) count as failed attempts
+                outcome = 'error'
+            with lock:
+                statuses.append(outcome)
+            connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in racers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        booked = Booking.objects.filter(room=room, date=day, hour=hour).count()
+        if booked > room.slot_capacity():
+            self.failures.append(f'{room.name} at {day} {hour}:00 double-booked: {booked} bookings, capacity {room.slot_capacity()}.')
+        return {
+            'attempts': len(racers),
+            'succeeded': statuses.count('201'),
+            'rejected': len(statuses) - statuses.count('201'),
+            'capacity': room.slot_capacity(),
+            'booked': booked,
+            'double_booked': booked > room.slot_capacity(),
+            'attempts_per_second': round(len(racers) / elapsed, 1) if elapsed else None,
+            'status_codes': {code: statuses.count(code) for code in sorted(set(statuses))},
+        }
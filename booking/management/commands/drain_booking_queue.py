@@ -0,0 +1,32 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from booking.models import BookingRequest
+
+
+# drain_booking_queue decides queued booking requests in arrival order, one batch per transaction
+class Command(BaseCommand):
+    help = 'Decide queued booking requests in batches. Several copies can run at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Requests decided per transaction.')
+        parser.add_argument('--interval', type=float, default=0.05, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--keep-hours', type=float, default=24, help='Delete decided requests older than this.')
+        parser.add_argument('--once', action='store_true', help='Drain until the queue is empty, then exit.')
+
+    def handle(self, *args, **options):
+        decided = 0
+        last_purge = 0
+        while True:
+            count = BookingRequest.drain(options['batch_size'])
+            decided += count
+            if count:
+                continue
+            if time.monotonic() - last_purge > 60:
+                BookingRequest.purge(timezone.now() - datetime.timedelta(hours=options['keep_hours']))
+                last_purge = time.monotonic()
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Decided {decided} booking requests.')
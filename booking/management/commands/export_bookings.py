@@ -0,0 +1,26 @@
+import datetime
+from django.core.management.base import BaseCommand
+from booking.export import EXPORT_FORMATS, export_stream
+
+
+# export_bookings writes bookings as CSV or NDJSON, streaming rows from the database
+class Command(BaseCommand):
+    help = 'Export bookings for a date range as CSV or NDJSON without loading them into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=sorted(EXPORT_FORMATS), default='csv', help='Output format.')
+        parser.add_argument('--file', help='Write to this file instead of stdout.')
+        parser.add_argument('--type', help='Only this room type (private, conference, shared).')
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='First day (YYYY-MM-DD).')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last day (YYYY-MM-DD).')
+        parser.add_argument('--team', type=int, help='Only bookings of this team id.')
+        parser.add_argument('--history', action='store_true', help='Include archived bookings.')
+
+    def handle(self, *args, **options):
+        filters = {key: options[key] for key in ['type', 'start', 'end', 'team', 'history']}
+        if options['file']:
+            with open(options['file'], 'w', newline='') as output:
+                output.writelines(export_stream(filters, options['output']))
+        else:
+            for line in export_stream(filters, options['output']):
+                self.stdout.write(line, ending='')
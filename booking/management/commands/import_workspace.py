@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from booking.importer import IMPORT_KINDS, UserImport, read_rows
+
+
+# import_workspace creates rooms, users (with profiles) or teams from a CSV or JSON file in bulk
+class Command(BaseCommand):
+    help = 'Import rooms, users or teams from a .csv, .jsonl or .json file, one chunk per transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORT_KINDS), help='What the file holds.')
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated and inserted per transaction.')
+        parser.add_argument('--workers', type=int, help='Processes hashing passwords (default: one per CPU, 0 or 1 hashes inline).')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate every row without writing anything, and exit with an error if any row is invalid.',
+        )
+
+    def handle(self, *args, **options):
+        kind = IMPORT_KINDS[options['kind']]
+        extra = {'workers': options['workers']} if kind is UserImport else {}
+        importer = kind(dry_run=options['dry_run'], chunk_size=options['chunk_size'], **extra)
+        try:
+            importer.run(read_rows(options['path']))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        for number, message in importer.errors:
+            self.stdout.write(f'row {number}: {message}')
+        if options['dry_run']:
+            summary = f'Validated {importer.imported + len(importer.errors)} {options["kind"]}: {len(importer.errors)} invalid'
+            if importer.errors:
+                raise CommandError(summary + '.')
+            self.stdout.write(summary + ', nothing written.')
+        else:
+            self.stdout.write(f'Imported {importer.imported} {options["kind"]}, {len(importer.errors)} rows failed.')
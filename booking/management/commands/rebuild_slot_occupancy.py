@@ -0,0 +1,34 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from booking.models import Booking, SlotOccupancy
+
+
+# rebuild_slot_occupancy recounts the SlotOccupancy counters from Booking, one day per transaction
+class Command(BaseCommand):
+    help = 'Verify the slot occupancy counters against Booking rows and fix any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='First day to check (YYYY-MM-DD).')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last day to check (YYYY-MM-DD).')
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report differences, and exit with an error if there are any.',
+        )
+
+    def handle(self, *args, **options):
+        date_range = {}
+        if options['start']:
+            date_range['date__gte'] = options['start']
+        if options['end']:
+            date_range['date__lte'] = options['end']
+        days = set(Booking.objects.filter(**date_range).values_list('date', flat=True).distinct())
+        days |= set(SlotOccupancy.objects.filter(**date_range).values_list('date', flat=True).distinct())
+        mismatches = []
+        for day in sorted(days):
+            mismatches += SlotOccupancy.sync_day(day, fix=not options['verify'])
+        for room_id, date, hour, stored, actual in mismatches:
+            self.stdout.write(f'room {room_id} {date.isoformat()} {hour}:00 counter {stored}, bookings {actual}')
+        summary = f'Checked {len(days)} days: {len(mismatches)} slots out of sync'
+        if options['verify'] and mismatches:
+            raise CommandError(summary + '.')
+        self.stdout.write(summary + ('' if options['verify'] or not mismatches else ', fixed') + '.')
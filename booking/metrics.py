@@ -0,0 +1,93 @@
+import threading
+from .cache import occupancy_index
+
+# Latency histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# EndpointMetrics accumulates request statistics for one resolved URL name
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.over_budget = 0
+
+    def observe(self, latency, queries, db_seconds, serialization_seconds, over_budget):
+        self.requests += 1
+        self.latency_seconds += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[index] += 1
+        self.queries += queries
+        self.db_seconds += db_seconds
+        self.serialization_seconds += serialization_seconds
+        if over_budget:
+            self.over_budget += 1
+
+
+# MetricsRegistry keeps per-endpoint metrics for this worker process
+class MetricsRegistry:
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, **values):
+        with self._lock:
+            self._endpoints.setdefault((endpoint, method), EndpointMetrics()).observe(**values)
+
+    def snapshot(self):
+        # {(endpoint, method): metrics}
+        with self._lock:
+            return {key: vars(metrics).copy() for key, metrics in self._endpoints.items()}
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render_prometheus(self):
+        # Prometheus text exposition format (version 0.0.4)
+        endpoints = sorted(self.snapshot().items())
+        lines = [
+            '# HELP booking_request_duration_seconds Request latency by endpoint.',
+            '# TYPE booking_request_duration_seconds histogram',
+        ]
+        for (name, method), data in endpoints:
+            labels = f'endpoint="{name}",method="{method}"'
+            for bound, count in zip(LATENCY_BUCKETS, data['latency_buckets']):
+                lines.append(f'booking_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'booking_request_duration_seconds_bucket{{{labels},le="+Inf"}} {data["requests"]}')
+            lines.append(f'booking_request_duration_seconds_sum{{{labels}}} {data["latency_seconds"]:.6f}')
+            lines.append(f'booking_request_duration_seconds_count{{{labels}}} {data["requests"]}')
+        counters = [
+            ('booking_request_db_queries_total', 'Database queries by endpoint.', 'queries', '{}'),
+            ('booking_request_db_seconds_total', 'Time spent in database queries by endpoint.', 'db_seconds', '{:.6f}'),
+            ('booking_request_serialization_seconds_total', 'Time spent rendering response bodies by endpoint.', 'serialization_seconds', '{:.6f}'),
+            ('booking_requests_over_budget_total', 'Requests over their query or latency budget by endpoint.', 'over_budget', '{}'),
+        ]
+        for metric, help_text, field, value_format in counters:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for (name, method), data in endpoints:
+                lines.append(f'{metric}{{endpoint="{name}",method="{method}"}} ' + value_format.format(data[field]))
+        index_stats = occupancy_index.stats()
+        lines += [
+            '# HELP booking_occupancy_index_days_total Occupancy index day lookups by result.',
+            '# TYPE booking_occupancy_index_days_total counter',
+            f'booking_occupancy_index_days_total{{result="hit"}} {index_stats["hits"]}',
+            f'booking_occupancy_index_days_total{{result="miss"}} {index_stats["misses"]}',
+            '# HELP booking_occupancy_index_loads_total SlotOccupancy range queries run to load missing days.',
+            '# TYPE booking_occupancy_index_loads_total counter',
+            f'booking_occupancy_index_loads_total {index_stats["loads"]}',
+            '# HELP booking_occupancy_index_entries Days (and the room table) held by this worker.',
+            '# TYPE booking_occupancy_index_entries gauge',
+            f'booking_occupancy_index_entries {index_stats["size"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+# Shared per-process registry filled by RequestMetricsMiddleware
+registry = MetricsRegistry()
@@ -0,0 +1,118 @@
+import logging
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from .metrics import registry
+
+logger = logging.getLogger('booking.metrics')
+
+
+# Raised when a request goes over its query budget and RAISE_ON_BUDGET is enabled (used by tests)
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# QueryTimer is a database execute wrapper that counts queries and their time
+class QueryTimer:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+
+def wrap_connections(stack, timer):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+
+
+def get_budgets(method, endpoint):
+    # Budgets from BOOKING_METRICS: 'METHOD url-name' first, then 'url-name', then the defaults
+    config = getattr(settings, 'BOOKING_METRICS', {})
+    budgets = config.get('BUDGETS', {})
+    endpoint_budgets = budgets.get(f'{method} {endpoint}', budgets.get(endpoint, {}))
+    return (
+        endpoint_budgets.get('QUERIES', config.get('QUERY_BUDGET')),
+        endpoint_budgets.get('LATENCY_MS', config.get('LATENCY_BUDGET_MS')),
+        config.get('RAISE_ON_BUDGET', False),
+    )
+
+
+# RequestMetricsMiddleware records latency, DB queries, DB time and render time per resolved URL name.
+# It runs natively under both WSGI and ASGI, so async views are not pushed onto a thread by it.
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        request._render_seconds = 0.0
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            wrap_connections(stack, timer)
+            response = self.get_response(request)
+        self.record(request, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are per thread: install the timer in the thread that runs this request's queries
+        timer = QueryTimer()
+        request._render_seconds = 0.0
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(wrap_connections)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, timer, time.perf_counter() - started)
+        return response
+
+    def record(self, request, timer, latency):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.url_name if match and match.url_name else 'unresolved'
+        query_budget, latency_budget, raise_on_budget = get_budgets(request.method, endpoint)
+        over_queries = query_budget is not None and timer.queries > query_budget
+        over_latency = latency_budget is not None and latency * 1000 > latency_budget
+        registry.observe(
+            endpoint,
+            request.method,
+            latency=latency,
+            queries=timer.queries,
+            db_seconds=timer.seconds,
+            serialization_seconds=request._render_seconds,
+            over_budget=over_queries or over_latency,
+        )
+        if over_queries or over_latency:
+            logger.warning(
+                '%s %s (%s) over budget: %d queries (budget %s), %.1f ms (budget %s)',
+                request.method, request.path, endpoint, timer.queries, query_budget, latency * 1000, latency_budget,
+            )
+        if over_queries and raise_on_budget:
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} ({endpoint}) ran {timer.queries} queries, budget is {query_budget}.'
+            )
+
+    def process_template_response(self, request, response):
+        # DRF responses and template responses are rendered after this hook; time the render
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            request._render_seconds += time.perf_counter() - render_started
+        response.add_post_render_callback(rendered)
+        return response
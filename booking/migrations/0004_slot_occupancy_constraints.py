@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_slot_occupancy(apps, schema_editor):
+    # Count existing bookings per slot; capacity never drops below what is already booked
+    Booking = apps.get_model('booking', 'Booking')
+    SlotOccupancy = apps.get_model('booking', 'SlotOccupancy')
+    slots = (
+        Booking.objects.values('room_id', 'room__room_type', 'room__capacity', 'date', 'hour')
+        .annotate(count=models.Count('id'))
+        .order_by()
+    )
+    rows = []
+    for slot in slots.iterator(chunk_size=2000):
+        if slot['room__room_type'] == 'shared':
+            capacity = slot['room__capacity']
+        elif slot['room__room_type'] in ['private', 'conference']:
+            capacity = 1
+        else:
+            capacity = 0
+        rows.append(SlotOccupancy(
+            room_id=slot['room_id'], date=slot['date'], hour=slot['hour'],
+            capacity=max(capacity, slot['count']), count=slot['count'],
+        ))
+        if len(rows) >= 2000:
+            SlotOccupancy.objects.bulk_create(rows)
+            rows = []
+    SlotOccupancy.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_owner_created_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveIntegerField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'date', 'hour'), name='unique_user_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('team__isnull', False)), fields=('team', 'date', 'hour'), name='unique_team_slot'),
+        ),
+        migrations.AddField(
+            model_name='slotoccupancy',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.room'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.UniqueConstraint(fields=('room', 'date', 'hour'), name='unique_slot_occupancy'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.CheckConstraint(condition=models.Q(('count__lte', models.F('capacity'))), name='slot_occupancy_within_capacity'),
+        ),
+        migrations.RunPython(populate_slot_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_slot_occupancy_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket', models.CharField(max_length=100, unique=True)),
+                ('date', models.DateField()),
+                ('hour', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('booked', 'Booked'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('decided_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='booking.booking')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.room')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='booking.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'room', 'date', 'hour', 'id'], name='booking_boo_status_f1928a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_booking_request_queue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slotoccupancy',
+            index=models.Index(fields=['date', 'hour'], name='booking_slo_date_e6ac89_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_slot_occupancy_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.CharField(max_length=100, unique=True)),
+                ('date', models.DateField()),
+                ('hour', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date'], name='booking_boo_date_f02e27_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.room'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='booking.team'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['user', '-created_at'], name='booking_arc_user_id_785ca1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['team', '-created_at'], name='booking_arc_team_id_31f4bf_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+def populate_member_count(apps, schema_editor):
+    # Count existing memberships per team in one UPDATE
+    Team = apps.get_model('booking', 'Team')
+    members = (
+        Team.members.through.objects.filter(team_id=models.OuterRef('pk'))
+        .values('team_id').annotate(count=models.Count('id')).values('count')
+    )
+    Team.objects.update(member_count=models.functions.Coalesce(models.Subquery(members), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_booking_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_member_count, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,22 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User as AuthUser
-from django.db import transaction
-from django.db.models import Q
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Q, F, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import time
 import uuid
+from django.utils import timezone
+from .cache import occupancy_index, slot_date, invalidate_booking_lists, invalidate_slot, team_cache
+from .quotas import QuotaExceeded, booking_owner, booking_quotas
+
+# Bookable hours: one-hour slots starting 9AM through 6PM
+OPENING_HOUR = 9
+CLOSING_HOUR = 18
+BOOKING_HOURS = range(OPENING_HOUR, CLOSING_HOUR + 1)
+
+# Smallest team allowed to book a conference room
+CONFERENCE_MIN_MEMBERS = 3
 
 # User, Team, Room, and Booking models for the booking system
 # UserProfile extends the built-in User with extra fields
@@ -20,6 +33,24 @@ class UserProfile(models.Model):
 class Team(models.Model):
     name = models.CharField(max_length=100)  # Team name
     members = models.ManyToManyField(AuthUser, related_name='teams')  # Team members
+    member_count = models.PositiveIntegerField(default=0)  # Number of members, kept in step by signals
+
+    def is_conference_eligible(self):
+        return self.member_count >= CONFERENCE_MIN_MEMBERS
+
+    @classmethod
+    def refresh_member_counts(cls, team_ids):
+        # Recount members for the given teams with one UPDATE, and drop their cached eligibility
+        team_ids = list(team_ids)
+        if not team_ids:
+            return
+        members = (
+            cls.members.through.objects.filter(team_id=OuterRef('pk'))
+            .values('team_id').annotate(count=Count('id')).values('count')
+        )
+        cls.objects.filter(pk__in=team_ids).update(member_count=Coalesce(Subquery(members), 0))
+        for team_id in team_ids:
+            team_cache.invalidate(team_id)
 
 # Room model for all room types
 class Room(models.Model):
@@ -32,6 +63,147 @@ class Room(models.Model):
     capacity = models.PositiveIntegerField()  # Capacity (used for shared desks)
     name = models.CharField(max_length=50, unique=True)  # Room name
 
+    def slot_capacity(self):
+        # Bookings allowed per slot: shared desks up to capacity, private/conference rooms exactly one
+        if self.room_type == 'shared':
+            return self.capacity
+        if self.room_type in ['private', 'conference']:
+            return 1
+        return 0
+
+    def spots_left(self, booked_count):
+        # Remaining spots for a slot given its current booking count
+        return self.slot_capacity() - booked_count
+
+    def slot_full_message(self):
+        if self.room_type == 'shared':
+            return 'Shared desk is full for this slot.'
+        return 'This room is already booked for the selected slot.'
+
+# SlotOccupancy counts bookings per room slot; the database enforces count <= capacity
+class SlotOccupancy(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)  # Booked room
+    date = models.DateField()  # Slot date
+    hour = models.PositiveIntegerField()  # Slot hour (9-18)
+    capacity = models.PositiveIntegerField()  # Bookings allowed in the slot
+    count = models.PositiveIntegerField(default=0)  # Bookings currently held
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'date', 'hour'], name='unique_slot_occupancy'),
+            models.CheckConstraint(condition=Q(count__lte=F('capacity')), name='slot_occupancy_within_capacity'),
+        ]
+        indexes = [
+            # Whole-day reads: rebuild/verify and date-range scans
+            models.Index(fields=['date', 'hour']),
+        ]
+
+    @classmethod
+    def claim(cls, room, date, hour):
+        """
+        Take one spot in a slot, or raise ValidationError if it is full.
+        A single conditional UPDATE increments the counter and holds its row lock until
+        commit, so concurrent claims cannot both take the last spot. The counter row is
+        created on first use; if another transaction creates it first, the unique
+        constraint sends us back to the UPDATE.
+        """
+        slot = cls.objects.filter(room=room, date=date, hour=hour, count__lt=F('capacity'))
+        if slot.update(count=F('count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(room=room, date=date, hour=hour, capacity=room.slot_capacity(), count=1)
+            return
+        except IntegrityError:
+            pass
+        if not slot.update(count=F('count') + 1):
+            raise ValidationError(room.slot_full_message())
+
+    @classmethod
+    def release(cls, room_id, date, hour):
+        # Give back one spot when a booking is removed
+        cls.objects.filter(room_id=room_id, date=date, hour=hour, count__gt=0).update(count=F('count') - 1)
+
+    @classmethod
+    def counts(cls, room_ids, date, hour):
+        # {room_id: count} by point lookups on the unique (room, date, hour) index; slots without a row are empty
+        found = dict(cls.objects.filter(room_id__in=room_ids, date=date, hour=hour).values_list('room_id', 'count'))
+        return {room_id: found.get(room_id, 0) for room_id in room_ids}
+
+    @classmethod
+    def sync_day(cls, date, fix=True):
+        """
+        Compare one day's counters with its Booking rows and return the slots that differ,
+        as (room_id, date, hour, stored, actual). With fix, the counters are corrected in the
+        same transaction. The day's counter rows are locked in (room, date, hour) order, the
+        same order bookings take them, so bookings for the day wait instead of racing.
+        """
+        with transaction.atomic():
+            stored = {
+                (slot.room_id, slot.hour): slot
+                for slot in cls.objects.select_for_update().filter(date=date).select_related('room').order_by('room_id', 'date', 'hour')
+            }
+            actual = {
+                (room_id, hour): count
+                for room_id, hour, count in Booking.objects.filter(date=date)
+                .values('room_id', 'hour').annotate(count=Count('id')).values_list('room_id', 'hour', 'count')
+            }
+            mismatches = []
+            changed = []
+            missing = []
+            for key in sorted(set(stored) | set(actual)):
+                slot = stored.get(key)
+                count = actual.get(key, 0)
+                if slot is not None and slot.count == count:
+                    continue
+                mismatches.append((key[0], date, key[1], slot.count if slot else 0, count))
+                if slot is None:
+                    missing.append(key)
+                else:
+                    slot.count = count
+                    slot.capacity = max(slot.room.slot_capacity(), count)
+                    changed.append(slot)
+            if fix and mismatches:
+                if missing:
+                    changed += cls.create_missing(date, missing, actual)
+                cls.objects.bulk_update(changed, ['count', 'capacity'])
+                for room_id, _, hour, _, _ in mismatches:
+                    invalidate_slot(room_id, date, hour)
+        return mismatches
+
+    @classmethod
+    def create_missing(cls, date, missing, actual):
+        """
+        Create the counter rows sync_day found missing, then lock them all and return those
+        whose count still needs correcting. A booking may create one of the rows between
+        sync_day's read and this insert, so conflicts are skipped rather than raised; once
+        the row locks are held, every booking that touched them has committed and a recount
+        gives the true number.
+        """
+        rooms = Room.objects.in_bulk([room_id for room_id, _ in missing])
+        cls.objects.bulk_create([
+            cls(room_id=room_id, date=date, hour=hour, count=actual[(room_id, hour)],
+                capacity=max(rooms[room_id].slot_capacity(), actual[(room_id, hour)]))
+            for room_id, hour in missing
+        ], ignore_conflicts=True)
+        slots = Q()
+        for room_id, hour in missing:
+            slots |= Q(room_id=room_id, hour=hour)
+        locked = cls.objects.select_for_update().filter(slots, date=date).order_by('room_id', 'date', 'hour')
+        recount = {
+            (room_id, hour): count
+            for room_id, hour, count in Booking.objects.filter(slots, date=date)
+            .values('room_id', 'hour').annotate(count=Count('id')).values_list('room_id', 'hour', 'count')
+        }
+        changed = []
+        for slot in locked:
+            count = recount.get((slot.room_id, slot.hour), 0)
+            if slot.count != count:
+                slot.count = count
+                slot.capacity = max(rooms[slot.room_id].slot_capacity(), count)
+                changed.append(slot)
+        return changed
+
 # Booking model for all bookings
 class Booking(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)  # Booked room
@@ -43,11 +215,20 @@ class Booking(models.Model):
     booking_id = models.CharField(max_length=100, unique=True)  # Unique booking identifier
 
     class Meta:
-        # Remove unique_together, rely on clean() for logic
+        # Room capacity is enforced by SlotOccupancy; owners get one booking per slot
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'hour'], condition=Q(user__isnull=False), name='unique_user_slot'),
+            models.UniqueConstraint(fields=['team', 'date', 'hour'], condition=Q(team__isnull=False), name='unique_team_slot'),
+        ]
         indexes = [
             models.Index(fields=['room', 'date', 'hour']),
             models.Index(fields=['user', 'date', 'hour']),
             models.Index(fields=['team', 'date', 'hour']),
+            # Per-owner listings ordered by newest first
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['team', '-created_at']),
+            # Archiving walks past days in date order
+            models.Index(fields=['date']),
         ]
 
     def clean(self):
@@ -59,31 +240,40 @@ class Booking(models.Model):
         # Validate hour range
         if self.hour < 9 or self.hour > 18:
             raise ValidationError('Booking hours must be between 9 and 18 (9AM-6PM).')
-        if self.room.room_type == 'shared':
-            # Allow up to capacity
-            count = Booking.objects.filter(room=self.room, date=self.date, hour=self.hour)
-            if self.pk:
-                count = count.exclude(pk=self.pk)
-            if count.count() >= self.room.capacity:
-                raise ValidationError('Shared desk is full for this slot.')
+        if self.pk:
+            # Existing bookings must not count themselves, so bypass the slot cache
+            booked = Booking.objects.filter(room=self.room, date=self.date, hour=self.hour).exclude(pk=self.pk).count()
         else:
-            # For private/conference, enforce uniqueness
-            exists = Booking.objects.filter(room=self.room, date=self.date, hour=self.hour)
-            if self.pk:
-                exists = exists.exclude(pk=self.pk)
-            if exists.exists():
-                raise ValidationError('This room is already booked for the selected slot.')
-
-    def save(self, *args, **kwargs):
-        # Validate before saving
-        self.full_clean()
-        super().save(*args, **kwargs)
+            booked = occupancy_index.booked(self.room_id, self.date, self.hour)
+        # Shared desks allow up to capacity, private/conference rooms a single booking
+        if self.room.spots_left(booked) <= 0:
+            raise ValidationError(self.room.slot_full_message())
+
+    def save(self, *args, validate=True, **kwargs):
+        # Validate before saving; callers that already checked the fields can skip the extra queries
+        if validate:
+            self.full_clean()
+        with transaction.atomic(savepoint=False):
+            # Keep the slot occupancy counter in step; a full slot raises ValidationError
+            self._previous_slot = None
+            if self._state.adding:
+                SlotOccupancy.claim(self.room, self.date, self.hour)
+            else:
+                previous = Booking.objects.filter(pk=self.pk).values_list('room_id', 'date', 'hour').first()
+                if previous and previous != (self.room_id, slot_date(self.date), int(self.hour)):
+                    SlotOccupancy.release(*previous)
+                    SlotOccupancy.claim(self.room, self.date, self.hour)
+                    self._previous_slot = previous
+            super().save(*args, **kwargs)
 
     @classmethod
     def create_booking_with_lock(cls, room, user=None, team=None, date=None, hour=None):
         """
-        Create a booking with proper locking to prevent race conditions.
-        This method uses database-level locking to ensure atomicity.
+        Create a booking, relying on database constraints instead of check-then-insert.
+        The owner's quota is checked under their row lock, the slot is claimed with an
+        atomic conditional update on SlotOccupancy, then the booking is inserted; the
+        partial unique constraints on (user, date, hour) and (team, date, hour) reject
+        double bookings, and the error is mapped to a message.
         """
         if not room or not date or not hour:
             raise ValueError("Room, date, and hour are required.")
@@ -91,55 +281,346 @@ class Booking(models.Model):
             raise ValueError("Either user or team must be provided.")
         if user and team:
             raise ValueError("Cannot specify both user and team.")
-        # Lock existing bookings for this room and slot
+        hour = int(hour)
+        if hour < OPENING_HOUR or hour > CLOSING_HOUR:
+            raise ValidationError('Booking hours must be between 9 and 18 (9AM-6PM).')
+        try:
+            date = slot_date(date)
+        except ValueError:
+            date = None
+        if date is None:
+            raise ValidationError('Enter a valid date in YYYY-MM-DD format.')
+        booking = cls(
+            room=room,
+            user=user,
+            team=team,
+            date=date,
+            hour=hour,
+            booking_id=str(uuid.uuid4())
+        )
+        try:
+            with transaction.atomic():
+                owner = booking_owner(user=user, team=team)
+                quota_error = booking_quotas.lock([(owner, date)]).take(owner, date)
+                if quota_error:
+                    raise QuotaExceeded(quota_error)
+                booking.save(validate=False)
+        except IntegrityError as e:
+            if not cls.is_owner_conflict(e):
+                raise
+            raise ValidationError(cls.owner_conflict_message(user))
+        return booking
+
+    @classmethod
+    def create_bookings_with_lock(cls, requests, all_or_nothing=True):
+        """
+        Create many bookings in one transaction.
+        Each request is a dict with room, date, hour and either user or team. The
+        owners are locked for their quotas first, then the SlotOccupancy rows for every
+        requested slot are created if missing and locked in (room, date, hour) order, so
+        concurrent batches cannot deadlock. Owner conflicts are read with set-based
+        queries and backed by the unique constraints.
+        Returns one (booking, error) pair per request, in request order. With
+        all_or_nothing, any error means nothing is created.
+        """
+        results = [None] * len(requests)
+        slots = []
+        for index, request in enumerate(requests):
+            room, user, team, hour = request['room'], request.get('user'), request.get('team'), request['hour']
+            try:
+                date = slot_date(request['date'])
+            except (TypeError, ValueError):
+                date = None
+            if date is None:
+                results[index] = (None, 'Invalid date.')
+            elif hour < OPENING_HOUR or hour > CLOSING_HOUR:
+                results[index] = (None, 'Booking hours must be between 9 and 18 (9AM-6PM).')
+            elif not user and not team:
+                results[index] = (None, 'Either user or team must be provided.')
+            elif user and team:
+                results[index] = (None, 'Cannot specify both user and team.')
+            else:
+                slots.append((index, room, user, team, date, hour))
+        if not slots:
+            return results
         with transaction.atomic():
-            existing_bookings = cls.objects.select_for_update().filter(
-                room=room, date=date, hour=hour
+            quotas = booking_quotas.lock([(booking_owner(user=user, team=team), date) for _, _, user, team, date, _ in slots])
+            # Create any missing occupancy counters, then lock all of them in a deterministic order
+            rooms = {slot[1].id: slot[1] for slot in slots}
+            keys = sorted({(room.id, date, hour) for _, room, _, _, date, hour in slots})
+            SlotOccupancy.objects.bulk_create(
+                [SlotOccupancy(room_id=room_id, date=date, hour=hour, capacity=rooms[room_id].slot_capacity())
+                 for room_id, date, hour in keys],
+                ignore_conflicts=True,
             )
-            # Check if slot is available
-            if room.room_type in ['private', 'conference']:
-                if existing_bookings.exists():
-                    raise ValidationError('This room is already booked for the selected slot.')
-            elif room.room_type == 'shared':
-                if existing_bookings.count() >= room.capacity:
-                    raise ValidationError('Shared desk is full for this slot.')
-            # Check for user/team double booking
-            if user:
-                user_bookings = cls.objects.select_for_update().filter(
-                    user=user, date=date, hour=hour
+            slot_filter = Q()
+            for room_id, date, hour in keys:
+                slot_filter |= Q(room_id=room_id, date=date, hour=hour)
+            occupancy = {
+                (slot.room_id, slot.date, slot.hour): slot
+                for slot in SlotOccupancy.objects.select_for_update().filter(slot_filter).order_by('room_id', 'date', 'hour')
+            }
+            # Existing bookings held by the requesting users and teams at the same times
+            dates = {slot[4] for slot in slots}
+            hours = {slot[5] for slot in slots}
+            owner_slots = set()
+            user_ids = {slot[2].id for slot in slots if slot[2]}
+            team_ids = {slot[3].id for slot in slots if slot[3]}
+            if user_ids:
+                owner_slots.update(
+                    ('user', user_id, date, hour) for user_id, date, hour in
+                    cls.objects.filter(user_id__in=user_ids, date__in=dates, hour__in=hours).values_list('user_id', 'date', 'hour')
                 )
-                if user_bookings.exists():
-                    raise ValidationError('You already have a booking for this slot.')
-            elif team:
-                team_bookings = cls.objects.select_for_update().filter(
-                    team=team, date=date, hour=hour
+            if team_ids:
+                owner_slots.update(
+                    ('team', team_id, date, hour) for team_id, date, hour in
+                    cls.objects.filter(team_id__in=team_ids, date__in=dates, hour__in=hours).values_list('team_id', 'date', 'hour')
                 )
-                if team_bookings.exists():
-                    raise ValidationError('Your team already has a booking for this slot.')
-            # Create and save the booking
-            booking = cls(
-                room=room,
-                user=user,
-                team=team,
-                date=date,
-                hour=hour,
-                booking_id=str(uuid.uuid4())
-            )
-            booking.save()
-            return booking
+            # Decide every request in order, counting earlier winners from the same batch
+            bookings = []
+            for index, room, user, team, date, hour in slots:
+                owner = booking_owner(user=user, team=team)
+                slot = occupancy[(room.id, date, hour)]
+                if slot.count >= slot.capacity:
+                    error = room.slot_full_message()
+                elif owner + (date, hour) in owner_slots:
+                    error = cls.owner_conflict_message(user)
+                else:
+                    error = quotas.take(owner, date)
+                if error:
+                    results[index] = (None, error)
+                else:
+                    slot.count += 1
+                    owner_slots.add(owner + (date, hour))
+                    booking = cls(room=room, user=user, team=team, date=date, hour=hour, booking_id=str(uuid.uuid4()))
+                    bookings.append((index, booking))
+                    results[index] = (booking, None)
+            if all_or_nothing and any(error for _, error in results):
+                return [
+                    (None, error or 'Not booked because another slot in this request failed.')
+                    for _, error in results
+                ]
+            one_by_one = False
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create([booking for _, booking in bookings])
+            except IntegrityError:
+                # An owner booked one of these times concurrently; insert one by one to find it
+                one_by_one = True
+                for index, booking in bookings:
+                    try:
+                        with transaction.atomic():
+                            # Plain insert: the slot counters were already taken under lock above
+                            models.Model.save(booking, force_insert=True)
+                    except IntegrityError as e:
+                        if not cls.is_owner_conflict(e):
+                            raise
+                        if all_or_nothing:
+                            transaction.set_rollback(True)
+                            failed = [(None, 'Not booked because another slot in this request failed.')] * len(results)
+                            failed[index] = (None, cls.owner_conflict_message(booking.user))
+                            return failed
+                        occupancy[(booking.room_id, booking.date, booking.hour)].count -= 1
+                        results[index] = (None, cls.owner_conflict_message(booking.user))
+            SlotOccupancy.objects.bulk_update(occupancy.values(), ['count'])
+            # bulk_create skips save() and its signals, so invalidate the cached slots and lists here
+            booked = [booking for booking, _ in results if booking]
+            for booking in booked:
+                invalidate_slot(booking.room_id, booking.date, booking.hour)
+            if booked and not one_by_one:
+                # Rows saved one by one already went through the post_save signal
+                invalidate_booking_lists(
+                    user_ids={booking.user_id for booking in booked}, team_ids={booking.team_id for booking in booked}
+                )
+        return results
+
+    @classmethod
+    def is_owner_conflict(cls, error):
+        # True if an IntegrityError comes from the one-booking-per-owner-and-slot constraints.
+        # PostgreSQL names the violated constraint; SQLite lists the constrained columns instead.
+        constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+        if constraint is not None:
+            return constraint in ['unique_user_slot', 'unique_team_slot']
+        table = cls._meta.db_table
+        return any(
+            str(error).endswith(f'{table}.{owner}_id, {table}.date, {table}.hour') for owner in ['user', 'team']
+        )
+
+    @staticmethod
+    def owner_conflict_message(user):
+        if user:
+            return 'You already have a booking for this slot.'
+        return 'Your team already has a booking for this slot.'
 
     @classmethod
     def check_availability(cls, room, date, hour):
         """
         Check if a room is available for a specific slot.
-        This method uses proper locking to ensure accurate results.
+        This is a point lookup on the slot's occupancy counter; booking itself
+        re-checks under the counter's row lock.
+        """
+        booked = SlotOccupancy.counts([room.id], date, hour)[room.id]
+        return room.spots_left(booked) > 0
+
+    @classmethod
+    def archive(cls, before, chunk_size=1000):
+        """
+        Move up to chunk_size bookings dated before `before` into ArchivedBooking, oldest
+        day first, in one transaction. Returns the number of bookings moved.
+        The rows are copied with one bulk insert and removed with one DELETE, skipping the
+        per-row delete signals: past slots are not read, so instead of releasing counters
+        one by one, the SlotOccupancy rows of days that have been fully moved are dropped.
+        A day split across chunks keeps its counters until its last chunk.
         """
         with transaction.atomic():
-            existing_bookings = cls.objects.select_for_update().filter(
-                room=room, date=date, hour=hour
+            chunk = list(
+                cls.objects.select_for_update().filter(date__lt=before).order_by('date', 'id')[:chunk_size]
             )
-            if room.room_type in ['private', 'conference']:
-                return not existing_bookings.exists()
-            elif room.room_type == 'shared':
-                return existing_bookings.count() < room.capacity
-            return False
+            if not chunk:
+                return 0
+            ids = [booking.id for booking in chunk]
+            ArchivedBooking.objects.bulk_create([
+                ArchivedBooking(
+                    booking_id=booking.booking_id, room_id=booking.room_id, user_id=booking.user_id,
+                    team_id=booking.team_id, date=booking.date, hour=booking.hour, created_at=booking.created_at,
+                )
+                for booking in chunk
+            ], ignore_conflicts=True)
+            # Queued requests point at their booking; do what on_delete=SET_NULL would have done
+            BookingRequest.objects.filter(booking_id__in=ids).update(booking=None)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(cls._meta.db_table)} '
+                    f'WHERE id IN ({", ".join(["%s"] * len(ids))})',
+                    ids,
+                )
+            remaining = cls.objects.filter(date__lt=before).order_by('date').values_list('date', flat=True).first()
+            SlotOccupancy.objects.filter(date__lt=remaining or before).delete()
+            # Archived bookings leave the live lists of any number of users
+            invalidate_booking_lists(everyone=True)
+        return len(chunk)
+
+# ArchivedBooking holds bookings moved out of Booking once their date has passed, so the live table stays small
+class ArchivedBooking(models.Model):
+    booking_id = models.CharField(max_length=100, unique=True)  # Original booking identifier
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)  # Booked room
+    user = models.ForeignKey(AuthUser, null=True, blank=True, on_delete=models.SET_NULL)  # User (for private/shared)
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.SET_NULL)  # Team (for conference)
+    date = models.DateField()  # Booking date
+    hour = models.PositiveIntegerField()  # 9-18 (for 9AM-6PM)
+    created_at = models.DateTimeField()  # When the booking was made
+    archived_at = models.DateTimeField(auto_now_add=True)  # When it was moved here
+
+    class Meta:
+        indexes = [
+            # Per-owner history ordered by newest first, like the live listing
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['team', '-created_at']),
+        ]
+
+# BookingRequest is a booking waiting in the admission queue; its ticket can be polled until it is decided
+class BookingRequest(models.Model):
+    QUEUED = 'queued'
+    PROCESSING = 'processing'
+    BOOKED = 'booked'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (PROCESSING, 'Processing'),
+        (BOOKED, 'Booked'),
+        (FAILED, 'Failed'),
+    ]
+    ticket = models.CharField(max_length=100, unique=True)  # Handle returned to the caller
+    requested_by = models.ForeignKey(AuthUser, on_delete=models.CASCADE)  # User who sent the request
+    team = models.ForeignKey(Team, null=True, blank=True, on_delete=models.CASCADE)  # Booking team (conference)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)  # Requested room
+    date = models.DateField()  # Requested date
+    hour = models.PositiveIntegerField()  # Requested hour (9-18)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    detail = models.CharField(max_length=255, blank=True)  # Why the request failed
+    booking = models.ForeignKey(Booking, null=True, blank=True, on_delete=models.SET_NULL)  # Booking made for it
+    created_at = models.DateTimeField(auto_now_add=True)  # Arrival time
+    decided_at = models.DateTimeField(null=True, blank=True)  # When it was booked or failed
+
+    class Meta:
+        indexes = [
+            # Each slot's queue, oldest first
+            models.Index(fields=['status', 'room', 'date', 'hour', 'id']),
+        ]
+
+    @classmethod
+    def enqueue(cls, room, requested_by, team=None, date=None, hour=None):
+        # Queue a booking request; the date and hour are checked here so bad input fails straight away
+        hour = int(hour)
+        if hour < OPENING_HOUR or hour > CLOSING_HOUR:
+            raise ValidationError('Booking hours must be between 9 and 18 (9AM-6PM).')
+        try:
+            date = slot_date(date)
+        except ValueError:
+            date = None
+        if date is None:
+            raise ValidationError('Enter a valid date in YYYY-MM-DD format.')
+        return cls.objects.create(
+            ticket=str(uuid.uuid4()), requested_by=requested_by, team=team, room=room, date=date, hour=hour
+        )
+
+    @classmethod
+    def drain(cls, batch_size=200, room_id=None, date=None, hour=None):
+        """
+        Decide up to batch_size queued requests, oldest first, in one transaction.
+        Pass room_id, date and hour to drain a single slot's queue. Requests are claimed
+        with SKIP LOCKED where the database supports it, so several drainers can run at
+        once without blocking on each other's rows. Winners are picked in arrival order by
+        create_bookings_with_lock and inserted with one bulk_create. Returns the number of
+        requests decided.
+        """
+        pending = cls.objects.filter(status=cls.QUEUED)
+        if room_id is not None:
+            pending = pending.filter(room_id=room_id, date=date, hour=hour)
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+            ids = list(pending.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return 0
+            # Only rows still queued are ours; a concurrent drainer may have decided the rest
+            cls.objects.filter(id__in=ids, status=cls.QUEUED).update(status=cls.PROCESSING)
+            claimed = list(
+                cls.objects.filter(id__in=ids, status=cls.PROCESSING)
+                .select_related('room', 'requested_by', 'team')
+                .order_by('id')
+            )
+            results = Booking.create_bookings_with_lock([
+                {
+                    'room': request.room,
+                    'user': None if request.team else request.requested_by,
+                    'team': request.team,
+                    'date': request.date,
+                    'hour': request.hour,
+                }
+                for request in claimed
+            ], all_or_nothing=False)
+            decided_at = timezone.now()
+            for request, (booking, error) in zip(claimed, results):
+                request.status = cls.BOOKED if booking else cls.FAILED
+                request.booking = booking
+                request.detail = error or ''
+                request.decided_at = decided_at
+            cls.objects.bulk_update(claimed, ['status', 'booking', 'detail', 'decided_at'])
+        return len(claimed)
+
+    def wait(self, timeout, poll_interval=0.05, drain=True, batch_size=200):
+        # Wait up to timeout seconds for this request to be decided, draining its slot's queue meanwhile
+        deadline = time.monotonic() + timeout
+        while True:
+            if drain:
+                BookingRequest.drain(batch_size, self.room_id, self.date, self.hour)
+            self.refresh_from_db(fields=['status', 'detail', 'booking', 'decided_at'])
+            if self.status in [self.BOOKED, self.FAILED] or time.monotonic() >= deadline:
+                return self.status
+            time.sleep(poll_interval)
+
+    @classmethod
+    def purge(cls, older_than):
+        # Forget decided requests whose tickets are no longer polled
+        return cls.objects.filter(status__in=[cls.BOOKED, cls.FAILED], decided_at__lt=older_than).delete()[0]
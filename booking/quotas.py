@@ -0,0 +1,124 @@
+import datetime
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+from .cache import slot_date
+
+QUOTA_DEFAULTS = {
+    # Bookings one owner may hold dated on one day / in one ISO week; None for no limit
+    'USER_PER_DAY': None,
+    'USER_PER_WEEK': None,
+    'TEAM_PER_DAY': None,
+    'TEAM_PER_WEEK': None,
+}
+
+
+def quota_config():
+    return {**QUOTA_DEFAULTS, **getattr(settings, 'BOOKING_QUOTAS', {})}
+
+
+# A booking refused because its owner is at a quota limit
+class QuotaExceeded(ValidationError):
+    pass
+
+
+def booking_owner(user=None, team=None):
+    # ('team', id) or ('user', id); a booking belongs to exactly one of them
+    return ('team', team.id) if team else ('user', user.id)
+
+
+def week_start(date):
+    return date - datetime.timedelta(days=date.weekday())
+
+
+# QuotaUsage holds the bookings each locked owner has per day; take() counts new ones against the limits
+class QuotaUsage:
+    def __init__(self, limits, per_day):
+        self.limits = limits
+        self.per_day = per_day
+
+    def take(self, owner, date):
+        """
+        Count one more booking for owner on date and return None, or return the quota
+        message (counting nothing) if it would go over the day or week limit.
+        """
+        limits = self.limits.get(owner[0])
+        if not limits:
+            return None
+        try:
+            date = slot_date(date)
+        except (TypeError, ValueError):
+            # Malformed dates are left to the booking's own validation
+            return None
+        counts = self.per_day[owner]
+        monday = week_start(date)
+        held = {
+            'day': counts[date],
+            'week': sum(counts[monday + datetime.timedelta(days=offset)] for offset in range(7)),
+        }
+        for period, limit in limits.items():
+            if held[period] >= limit:
+                return booking_quotas.message(owner, limit, period)
+        counts[date] += 1
+        return None
+
+
+# BookingQuotas enforces each owner's bookings per day and per ISO week inside the booking transaction.
+# The owners' rows (User or Team) are locked before any slot counter, so one owner's bookings are
+# decided one at a time even when they are for different slots, then their held bookings are counted
+# with one grouped query per kind of owner. Owners without limits cost nothing.
+class BookingQuotas:
+    def limits(self):
+        # {'user': {'day': 8, 'week': 30}, 'team': {...}} with only the limits that are set
+        config = quota_config()
+        return {
+            kind: {
+                period: config[f'{kind.upper()}_PER_{period.upper()}']
+                for period in ['day', 'week']
+                if config[f'{kind.upper()}_PER_{period.upper()}'] is not None
+            }
+            for kind in ['user', 'team']
+        }
+
+    def lock(self, requests):
+        """
+        Lock the owners of requests, a list of (owner, date), and return their QuotaUsage.
+        Must run inside the transaction that creates the bookings, before slot counters
+        are locked, so every booking path takes owner and slot locks in the same order.
+        """
+        from django.contrib.auth.models import User
+        from .models import Booking, Team
+        limits = self.limits()
+        per_day = {}
+        for kind, model in [('user', User), ('team', Team)]:
+            dates = {}
+            for (owner_kind, owner_id), date in requests:
+                try:
+                    date = slot_date(date)
+                except (TypeError, ValueError):
+                    continue
+                if owner_kind == kind and limits[kind]:
+                    dates.setdefault(owner_id, set()).add(date)
+            if not dates:
+                continue
+            list(model.objects.select_for_update().filter(pk__in=dates).order_by('pk').values_list('pk', flat=True))
+            weeks = {week_start(date) for owner_dates in dates.values() for date in owner_dates}
+            held = (
+                Booking.objects.filter(**{f'{kind}_id__in': dates}, date__range=(min(weeks), max(weeks) + datetime.timedelta(days=6)))
+                .values(f'{kind}_id', 'date').annotate(count=Count('id')).values_list(f'{kind}_id', 'date', 'count')
+            )
+            for owner_id in dates:
+                per_day[(kind, owner_id)] = Counter()
+            for owner_id, date, count in held:
+                per_day[(kind, owner_id)][date] = count
+        return QuotaUsage(limits, per_day)
+
+    def message(self, owner, limit, period):
+        if owner[0] == 'team':
+            return f'Your team has reached its limit of {limit} bookings per {period}.'
+        return f'You have reached your limit of {limit} bookings per {period}.'
+
+
+# Shared quota checks used by single, bulk and queued booking
+booking_quotas = BookingQuotas()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Team, Room, Booking, UserProfile
+from .models import Team, Room, Booking, ArchivedBooking, UserProfile
 from django.contrib.auth.models import User as AuthUser
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
@@ -69,6 +69,13 @@ class BookingSerializer(serializers.ModelSerializer):
         model = Booking
         fields = ['booking_id', 'user', 'room', 'type', 'date', 'hour', 'team_id', 'team_name']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # fields limits the output to those fields (sparse fieldsets on the booking list)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def get_user(self, obj):
         # Return username if user exists
         return obj.user.username if obj.user else ""
@@ -82,9 +89,14 @@ class BookingSerializer(serializers.ModelSerializer):
         return obj.room.room_type if obj.room else ""
 
     def get_team_id(self, obj):
-        # Return team id if team exists
-        return obj.team.id if obj.team else ""
+        # Return team id if team exists (read from the FK column, no join needed)
+        return obj.team_id if obj.team_id else ""
 
     def get_team_name(self, obj):
         # Return team name if team exists
-        return obj.team.name if obj.team else "" 
\ No newline at end of file
+        return obj.team.name if obj.team else "" 
+
+# Serializer for archived bookings; same fields as a live booking so clients can show both together
+class ArchivedBookingSerializer(BookingSerializer):
+    class Meta(BookingSerializer.Meta):
+        model = ArchivedBooking
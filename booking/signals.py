@@ -0,0 +1,109 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.contrib.auth.models import User as AuthUser
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+from .cache import invalidate_booking_lists, invalidate_rooms, invalidate_slot, team_cache
+from .models import Booking, Room, SlotOccupancy, Team
+
+
+# Keep the slot occupancy cache in step with booking writes (Booking.save records a moved booking's old slot)
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    invalidate_slot(instance.room_id, instance.date, instance.hour)
+    previous = getattr(instance, '_previous_slot', None)
+    if previous:
+        invalidate_slot(*previous)
+    invalidate_booking_lists(user_ids=[instance.user_id], team_ids=[instance.team_id])
+
+
+# Deleting a booking frees its spot in the same transaction
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    SlotOccupancy.release(instance.room_id, instance.date, instance.hour)
+    invalidate_slot(instance.room_id, instance.date, instance.hour)
+    invalidate_booking_lists(user_ids=[instance.user_id], team_ids=[instance.team_id])
+
+
+# Room changes affect every cached availability result and the capacity of its slots
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, created, **kwargs):
+    if not created:
+        # Never drop capacity below bookings already held
+        SlotOccupancy.objects.filter(room=instance).update(capacity=Greatest(F('count'), instance.slot_capacity()))
+    invalidate_rooms()
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted(sender, instance, **kwargs):
+    invalidate_rooms()
+
+
+# Keep Team.member_count in step with membership changes made from either side (team.members / user.teams)
+@receiver(m2m_changed, sender=Team.members.through)
+def team_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Clearing a user's teams: remember which teams lose a member
+        instance._cleared_team_ids = list(instance.teams.values_list('id', flat=True))
+        return
+    if action == 'pre_clear':
+        # Clearing a team: remember whose booking lists lose its bookings
+        instance._cleared_member_ids = list(instance.members.values_list('id', flat=True))
+        return
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    # Joining or leaving a team changes which bookings a user's list shows
+    if reverse:
+        invalidate_booking_lists(user_ids=[instance.pk])
+    elif action == 'post_clear':
+        invalidate_booking_lists(user_ids=getattr(instance, '_cleared_member_ids', []))
+    else:
+        invalidate_booking_lists(user_ids=pk_set)
+    if not reverse:
+        Team.refresh_member_counts([instance.pk])
+        instance.refresh_from_db(fields=['member_count'])
+    elif action == 'post_clear':
+        Team.refresh_member_counts(getattr(instance, '_cleared_team_ids', []))
+    else:
+        Team.refresh_member_counts(pk_set)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_changed(sender, instance, signal, created=False, **kwargs):
+    team_cache.invalidate(instance.pk)
+    # Team names show in members' booking lists. A deleted team's members are already gone, so move every list.
+    if signal is post_delete:
+        invalidate_booking_lists(everyone=True)
+    elif not created:
+        invalidate_booking_lists(team_ids=[instance.pk])
+
+
+# Deleting a user removes their memberships without m2m_changed, so recount their teams afterwards
+@receiver(pre_delete, sender=AuthUser)
+def user_deleting(sender, instance, **kwargs):
+    instance._deleted_team_ids = list(instance.teams.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=AuthUser)
+def user_deleted(sender, instance, **kwargs):
+    Team.refresh_member_counts(getattr(instance, '_deleted_team_ids', []))
+
+
+# Cached tokens must stop working as soon as the token is deleted or its user is changed (e.g. deactivated)
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=AuthUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login, which cached tokens don't depend on
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    # The username shows in the user's booking list
+    invalidate_booking_lists(user_ids=[instance.pk])
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_cache.invalidate(key)
@@ -0,0 +1,105 @@
+// Rooms shown for the selected slot, kept up to date from the slot change stream
+let shownRooms = {};
+let slotStream = null;
+let slotPoll = null;
+// Only set when the server streams slot changes (ASGI); otherwise the slot is re-fetched every 30 seconds
+const slotStreamUrl = document.body.dataset.slotStream;
+const SLOT_POLL_MS = 30000;
+
+function renderRooms() {
+    const table = document.getElementById('available-rooms-table');
+    const tbody = table.querySelector('tbody');
+    const noRoomsMsg = document.getElementById('no-rooms-msg');
+    const rooms = Object.values(shownRooms).filter(room => room.available_spots > 0).sort((a, b) => a.id - b.id);
+    tbody.innerHTML = '';
+    rooms.forEach(room => {
+        tbody.innerHTML += `<tr>
+            <td>${room.name}</td>
+            <td>${room.type}</td>
+            <td>${room.capacity}</td>
+            <td>${room.available_spots}</td>
+        </tr>`;
+    });
+    table.style.display = rooms.length > 0 ? 'table' : 'none';
+    if (rooms.length === 0) {
+        noRoomsMsg.innerText = 'No available rooms for this slot.';
+    }
+    noRoomsMsg.style.display = rooms.length > 0 ? 'none' : 'block';
+}
+
+function showRooms(data) {
+    shownRooms = {};
+    data.rooms.forEach(room => {
+        shownRooms[room.id] = room;
+    });
+    renderRooms();
+    if (data.message) {
+        // Specific message when no rooms available for this slot and type
+        document.getElementById('no-rooms-msg').innerText = data.message;
+    }
+}
+
+async function refreshRooms(queryParams) {
+    const res = await fetch(`/api/v1/rooms/available/?${queryParams}`);
+    showRooms(await res.json());
+    watchSlot(queryParams);
+}
+
+// Follow bookings and cancellations for the slot, from the stream when there is one
+function watchSlot(queryParams) {
+    if (slotStream) {
+        slotStream.close();
+    }
+    clearTimeout(slotPoll);
+    if (!slotStreamUrl) {
+        slotPoll = setTimeout(() => refreshRooms(queryParams), SLOT_POLL_MS);
+        return;
+    }
+    slotStream = new EventSource(`${slotStreamUrl}?${queryParams}`);
+    slotStream.addEventListener('slot', function(e) {
+        const change = JSON.parse(e.data);
+        shownRooms[change.room_id] = {
+            id: change.room_id,
+            name: change.name,
+            type: change.type,
+            capacity: change.capacity,
+            available_spots: change.remaining
+        };
+        renderRooms();
+    });
+}
+
+document.getElementById('available-rooms-form').onsubmit = async function(e) {
+    e.preventDefault();
+    const roomType = document.getElementById('room-type-filter').value;
+    const date = document.getElementById('available-date').value;
+    const hour = document.getElementById('available-hour').value;
+
+    // Build query parameters
+    let queryParams = `date=${date}&hour=${hour}`;
+    if (roomType) {
+        queryParams += `&type=${roomType}`;
+    }
+
+    const res = await fetch(`/api/v1/rooms/available/?${queryParams}`);
+    const data = await res.json();
+
+    const table = document.getElementById('available-rooms-table');
+    const tbody = table.querySelector('tbody');
+    const noRoomsMsg = document.getElementById('no-rooms-msg');
+    const timeSlotInfo = document.getElementById('time-slot-info');
+
+    // Clear previous content
+    tbody.innerHTML = '';
+    table.style.display = 'none';
+    noRoomsMsg.style.display = 'none';
+    timeSlotInfo.style.display = 'none';
+
+    // Show time slot information
+    const hourText = document.getElementById('available-hour').options[document.getElementById('available-hour').selectedIndex].text;
+    timeSlotInfo.innerHTML = `<strong>Checking availability for:</strong> ${date} at ${hourText}`;
+    timeSlotInfo.style.display = 'block';
+
+    showRooms(data);
+    watchSlot(queryParams);
+};
@@ -0,0 +1,172 @@
+// When room type changes, fetch available rooms of that type
+    document.getElementById('room-type').onchange = async function() {
+        const type = this.value;
+        const res = await fetch('/api/v1/rooms/available/?type=' + type);
+        const data = await res.json();
+        const roomSelect = document.getElementById('room-id');
+        const roomInfo = document.getElementById('room-info');
+        roomSelect.innerHTML = '<option value="">Select room</option>';
+        roomInfo.style.display = 'none';
+
+        if (data.rooms.length > 0) {
+            // Populate room dropdown
+            data.rooms.forEach(room => {
+                roomSelect.innerHTML += `<option value="${room.id}" data-capacity="${room.capacity}" data-type="${room.type}">${room.name}</option>`;
+            });
+        } else {
+            roomSelect.innerHTML = '<option value="">No rooms available for this type</option>';
+        }
+        // Show team input for conference rooms only
+        document.getElementById('team-id-section').style.display = (type === 'conference') ? 'block' : 'none';
+    };
+
+    // Show room info when a room is selected
+    document.getElementById('room-id').onchange = function() {
+        const selectedOption = this.options[this.selectedIndex];
+        const roomInfo = document.getElementById('room-info');
+
+        if (this.value) {
+            // Display room type and capacity
+            const capacity = selectedOption.getAttribute('data-capacity');
+            const type = selectedOption.getAttribute('data-type');
+            roomInfo.innerHTML = `
+                <strong>Room Type:</strong> ${type}<br>
+                <strong>Capacity:</strong> ${capacity} ${type === 'shared' ? 'people' : 'person'}
+            `;
+            roomInfo.style.display = 'block';
+        } else {
+            roomInfo.style.display = 'none';
+        }
+    };
+
+    // Free spots per room for the selected slot, kept up to date from the slot change stream
+    let slotSpots = {};
+    let slotStream = null;
+    let slotPoll = null;
+    // Only set when the server streams slot changes (ASGI); otherwise the slot is re-checked every 30 seconds
+    const slotStreamUrl = document.body.dataset.slotStream;
+    const SLOT_POLL_MS = 30000;
+
+    function showSlotAvailability() {
+        const anyFree = Object.values(slotSpots).some(spots => spots > 0);
+        const message = 'No available room for the selected slot and type.';
+        const errorMsg = document.getElementById('error-msg');
+        if (!anyFree) {
+            errorMsg.innerText = message;
+            document.getElementById('success-msg').innerText = '';
+        } else if (errorMsg.innerText === message) {
+            errorMsg.innerText = '';
+        }
+    }
+
+    // Follow bookings and cancellations for the slot instead of re-fetching
+    function watchSlot(roomType, date, hour) {
+        if (slotStream) {
+            slotStream.close();
+        }
+        clearTimeout(slotPoll);
+        if (!slotStreamUrl) {
+            slotPoll = setTimeout(checkAvailability, SLOT_POLL_MS);
+            return;
+        }
+        slotStream = new EventSource(`${slotStreamUrl}?type=${roomType}&date=${date}&hour=${hour}`);
+        slotStream.addEventListener('slot', function(e) {
+            const change = JSON.parse(e.data);
+            slotSpots[change.room_id] = change.remaining;
+            showSlotAvailability();
+        });
+    }
+
+    // Check availability when date and hour are selected
+    async function checkAvailability() {
+        const roomType = document.getElementById('room-type').value;
+        const date = document.getElementById('booking-date').value;
+        const hour = document.getElementById('booking-hour').value;
+
+        if (roomType && date && hour) {
+            // Fetch available rooms for the selected slot
+            const res = await fetch(`/api/v1/rooms/available/?type=${roomType}&date=${date}&hour=${hour}`);
+            const data = await res.json();
+            slotSpots = {};
+            data.rooms.forEach(room => {
+                slotSpots[room.id] = room.available_spots;
+            });
+            watchSlot(roomType, date, hour);
+
+            if (data.message) {
+                // No rooms available for this slot and type
+                document.getElementById('error-msg').innerText = data.message;
+                document.getElementById('success-msg').innerText = '';
+                return false;
+            } else if (data.rooms.length === 0) {
+                document.getElementById('error-msg').innerText = 'No available room for the selected slot and type.';
+                document.getElementById('success-msg').innerText = '';
+                return false;
+            } else {
+                document.getElementById('error-msg').innerText = '';
+                return true;
+            }
+        }
+        return true;
+    }
+
+    // Re-check availability when date or hour changes
+    document.getElementById('booking-date').onchange = checkAvailability;
+    document.getElementById('booking-hour').onchange = checkAvailability;
+
+    // Handle booking form submit
+    document.getElementById('book-room-form').onsubmit = async function(e) {
+        e.preventDefault();
+        // Clear previous messages
+        document.getElementById('success-msg').innerText = '';
+        document.getElementById('error-msg').innerText = '';
+        const token = localStorage.getItem('token');
+        const room_id = document.getElementById('room-id').value;
+        const date = document.getElementById('booking-date').value;
+        const hour = document.getElementById('booking-hour').value;
+        const type = document.getElementById('room-type').value;
+        let body = { room_id, date, hour };
+        if (type === 'conference') {
+            body.team_id = document.getElementById('team-id').value;
+        }
+        // Send booking request to backend
+        const res = await fetch('/api/v1/bookings/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': 'Token ' + token
+            },
+            body: JSON.stringify(body)
+        });
+        const data = await res.json();
+        if (res.ok) {
+            document.getElementById('success-msg').innerText = 'Booking successful!';
+            document.getElementById('error-msg').innerText = '';
+            showSuggestions([]);
+        } else {
+            document.getElementById('error-msg').innerText = data.detail || 'Booking failed.';
+            document.getElementById('success-msg').innerText = '';
+            showSuggestions(data.suggestions || []);
+        }
+    };
+
+    // Offer the nearest free slots returned with a turned-down booking; picking one fills in the form
+    function showSuggestions(suggestions) {
+        const list = document.getElementById('suggestions');
+        list.innerHTML = '';
+        list.style.display = suggestions.length ? 'block' : 'none';
+        suggestions.forEach(s => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.innerText = `${s.name} - ${s.date} at ${s.hour}:00`;
+            button.onclick = function() {
+                document.getElementById('room-id').value = s.room_id;
+                document.getElementById('booking-date').value = s.date;
+                document.getElementById('booking-hour').value = s.hour;
+                document.getElementById('room-id').onchange();
+                checkAvailability();
+                showSuggestions([]);
+            };
+            list.appendChild(button);
+        });
+    }
@@ -0,0 +1,74 @@
+let allBookings = [];
+let nextPageUrl = null;
+
+function bookingsUrl() {
+    // The room type filter is applied by the API, so only matching bookings are fetched
+    const type = document.getElementById('room-type-filter').value;
+    return '/api/v1/bookings/' + (type ? '?type=' + encodeURIComponent(type) : '');
+}
+
+async function fetchBookings(url = bookingsUrl()) {
+    const token = localStorage.getItem('token');
+    if (!token) {
+        window.location.href = '/login/';
+    }
+    const res = await fetch(url, {
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': 'Token ' + token
+        }
+    });
+    const data = await res.json();
+    // Bookings arrive one cursor page at a time
+    allBookings = allBookings.concat(data.results);
+    nextPageUrl = data.next;
+    document.getElementById('load-more-btn').style.display = nextPageUrl ? '' : 'none';
+    renderBookings(allBookings, document.getElementById('room-type-filter').value);
+}
+
+function renderBookings(bookings, filterType) {
+    const tbody = document.getElementById('bookings-tbody');
+    tbody.innerHTML = '';
+
+    // Show/hide columns
+    document.getElementById('user-th').style.display = (filterType === 'conference') ? 'none' : '';
+    document.getElementById('team-id-th').style.display = (filterType === 'conference') ? '' : 'none';
+    document.getElementById('team-name-th').style.display = (filterType === 'conference') ? '' : 'none';
+
+    bookings.forEach(booking => {
+        let row = `<tr>
+            <td>${booking.booking_id}</td>`;
+
+        if (filterType === 'conference') {
+            row += `
+                <td style="display:none;"></td>
+                <td>${booking.room}</td>
+                <td>${booking.type}</td>
+                <td>${booking.date}</td>
+                <td>${booking.hour}:00 - ${parseInt(booking.hour)+1}:00</td>
+                <td>${booking.team_id || ''}</td>
+                <td>${booking.team_name || ''}</td>
+            `;
+        } else {
+            row += `
+                <td>${booking.user}</td>
+                <td>${booking.room}</td>
+                <td>${booking.type}</td>
+                <td>${booking.date}</td>
+                <td>${booking.hour}:00 - ${parseInt(booking.hour)+1}:00</td>
+                <td style="display:none;"></td>
+                <td style="display:none;"></td>
+            `;
+        }
+        row += `</tr>`;
+        tbody.innerHTML += row;
+    });
+}
+
+// Refetch on dropdown change
+document.getElementById('room-type-filter').onchange = function() {
+    allBookings = [];
+    fetchBookings();
+};
+
+window.onload = () => fetchBookings();
@@ -0,0 +1,21 @@
+// Handle cancel booking form submit
+    document.getElementById('cancel-booking-form').onsubmit = async function(e) {
+        e.preventDefault();
+        const token = localStorage.getItem('token');
+        const bookingId = document.getElementById('cancel-booking-id').value;
+        // Send cancellation request to backend
+        const res = await fetch(`/api/v1/cancel/${bookingId}/`, {
+            method: 'POST',
+            headers: {
+                'Authorization': 'Token ' + token
+            }
+        });
+        if (res.ok) {
+            document.getElementById('success-msg').innerText = 'Booking cancelled successfully!';
+            document.getElementById('error-msg').innerText = '';
+        } else {
+            const data = await res.json();
+            document.getElementById('error-msg').innerText = data.detail || 'Cancellation failed.';
+            document.getElementById('success-msg').innerText = '';
+        }
+    };
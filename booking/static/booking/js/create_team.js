@@ -0,0 +1,22 @@
+document.getElementById('team-form').onsubmit = async function(e) {
+    e.preventDefault();
+    const name = document.getElementById('team-name').value;
+    const members = document.getElementById('team-members').value.split(',').map(s => s.trim());
+    const token = localStorage.getItem('token');
+    const res = await fetch('/api/v1/teams/create/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': 'Token ' + token
+        },
+        body: JSON.stringify({ name, members })
+    });
+    const data = await res.json();
+    if (res.ok) {
+        document.getElementById('success-msg').innerText = 'Team created! ID: ' + data.id;
+        document.getElementById('error-msg').innerText = '';
+    } else {
+        document.getElementById('error-msg').innerText = data.detail || 'Error creating team.';
+        document.getElementById('success-msg').innerText = '';
+    }
+}
@@ -0,0 +1,26 @@
+// Show/hide dashboard sections (future use)
+function showSection(section) {
+    document.getElementById('book-section').style.display = 'none';
+    document.getElementById('cancel-section').style.display = 'none';
+    document.getElementById('booked-section').style.display = 'none';
+    document.getElementById('available-section').style.display = 'none';
+    document.getElementById(section + '-section').style.display = 'block';
+    document.getElementById('success-msg').innerText = '';
+    document.getElementById('error-msg').innerText = '';
+}
+// Logout function: removes token and redirects to home
+function logout() {
+    localStorage.removeItem('token');
+    window.location.href = '/';
+}
+// (Future) Populate rooms based on type for in-page booking form
+// document.getElementById('room-type').onchange = async function() {
+//     const type = this.value;
+//     const res = await fetch('/api/v1/rooms/available/?type=' + type);
+//     const data = await res.json();
+//     const roomSelect = document.getElementById('room-id');
+//     roomSelect.innerHTML = '<option value="">Select room</option>';
+//     data.rooms.forEach(room => {
+//         roomSelect.innerHTML += `<option value="${room.id}">${room.name}</option>`
+//     });
+// }
@@ -0,0 +1,68 @@
+function showLogin() {
+    document.getElementById('cta-buttons').style.display = 'none';
+    document.getElementById('login-form').style.display = 'block';
+    document.getElementById('register-form').style.display = 'none';
+    document.getElementById('success-msg').innerText = '';
+    document.getElementById('error-msg').innerText = '';
+}
+function showRegister() {
+    document.getElementById('cta-buttons').style.display = 'none';
+    document.getElementById('login-form').style.display = 'none';
+    document.getElementById('register-form').style.display = 'block';
+    document.getElementById('success-msg').innerText = '';
+    document.getElementById('error-msg').innerText = '';
+}
+function hideForms() {
+    document.getElementById('cta-buttons').style.display = 'block';
+    document.getElementById('login-form').style.display = 'none';
+    document.getElementById('register-form').style.display = 'none';
+    document.getElementById('success-msg').innerText = '';
+    document.getElementById('error-msg').innerText = '';
+}
+// Handle login
+document.getElementById('login-form').onsubmit = async function(e) {
+    e.preventDefault();
+    const username = document.getElementById('login-username').value;
+    const password = document.getElementById('login-password').value;
+    const res = await fetch('/api/v1/login/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ username, password })
+    });
+    const data = await res.json();
+    if (res.ok) {
+        localStorage.setItem('token', data.token);
+        localStorage.setItem('user_id', data.user.id);
+        window.location.href = '/dashboard/';
+    } else {
+        document.getElementById('error-msg').innerText = data.detail || 'Login failed.';
+        document.getElementById('success-msg').innerText = '';
+    }
+};
+// Handle register
+document.getElementById('register-form').onsubmit = async function(e) {
+    e.preventDefault();
+    const username = document.getElementById('register-username').value;
+    const password = document.getElementById('register-password').value;
+    const age = document.getElementById('register-age').value;
+    const gender = document.getElementById('register-gender').value;
+    const res = await fetch('/api/v1/register/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ username, password, age, gender })
+    });
+    const data = await res.json();
+    if (res.ok) {
+        showLogin();
+        document.getElementById('success-msg').innerText = 'Registration successful! You can login.';
+        document.getElementById('error-msg').innerText = '';
+    } else {
+        document.getElementById('error-msg').innerText = data.detail || 'Registration failed.';
+        document.getElementById('success-msg').innerText = '';
+    }
+};
+function logout() {
+    localStorage.removeItem('token');
+    localStorage.removeItem('user_id');
+    window.location.href = '/';
+}
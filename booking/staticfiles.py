@@ -0,0 +1,185 @@
+import gzip
+import mimetypes
+import os
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped without the brotli package
+    brotli = None
+
+# Text assets worth precompressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+
+# Hashed file names change with their content, so browsers and proxies may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def encoders():
+    # (Content-Encoding, file suffix, compress function), best first
+    available = []
+    if brotli is not None:
+        available.append(('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    available.append(('gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0)))
+    return available
+
+
+# CompressedManifestStaticFilesStorage is Django's manifest storage (content-hashed names, written by collectstatic)
+# that also writes .br and .gz files next to every hashed text asset, so they are compressed once at build time.
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (development and tests): use the source name, served by static_asset from the finders under DEBUG
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for _, suffix, compress in encoders():
+            compressed = compress(data)
+            # Tiny files can grow when compressed; those are always served as they are
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ['q=0', 'q=0.0']:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+def collected_file(root, name):
+    """
+    (path, content type, {Content-Encoding: path}, Cache-Control, mtime) for a file collected into root,
+    or None. The encodings are the precompressed variants beside it, best first.
+    """
+    try:
+        path = safe_join(root, name)
+    except Exception:
+        return None
+    if not os.path.isfile(path):
+        return None
+    variants = {}
+    if name.endswith(COMPRESSIBLE_EXTENSIONS):
+        for coding, suffix, _ in encoders():
+            if os.path.isfile(path + suffix):
+                variants[coding] = path + suffix
+    hashed = getattr(staticfiles_storage, 'hashed_files', {})
+    cache_control = IMMUTABLE_CACHE_CONTROL if name in hashed.values() else 'public, max-age=300'
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    return path, content_type, variants, cache_control, int(os.stat(path).st_mtime)
+
+
+def collected_files(root):
+    # {name: collected_file(root, name)} for everything collectstatic wrote, skipping the compressed copies
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            name = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+            if name.endswith(('.gz', '.br')) and os.path.isfile(os.path.join(directory, filename[:-3])):
+                continue
+            files[name] = collected_file(root, name)
+    return files
+
+
+def serve_collected(request, name, collected):
+    # Response for a collected file, picking the precompressed variant the client accepts
+    path, content_type, variants, cache_control, mtime = collected
+    response = get_conditional_response(request, last_modified=mtime)
+    if response is None:
+        served_path, encoding = path, None
+        accepted = accepted_encodings(request) if variants else set()
+        for coding, variant in variants.items():
+            if coding in accepted:
+                served_path, encoding = variant, coding
+                break
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(mtime)
+    if name.endswith(COMPRESSIBLE_EXTENSIONS):
+        response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = cache_control
+    return response
+
+
+# StaticFilesMiddleware answers STATIC_URL requests from STATIC_ROOT before any other middleware, URL
+# resolution or view runs, in the manner of WhiteNoise. The collected files are indexed once per worker,
+# so a request costs a dict lookup and an open(); with DEBUG on they are looked up on every request,
+# so running collectstatic again takes effect without a restart. A proxy or CDN can serve STATIC_ROOT
+# directly instead (e.g. nginx gzip_static/brotli_static), and then this finds nothing to do.
+class StaticFilesMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = settings.STATIC_ROOT
+        self.files = None
+        if self.root and not settings.DEBUG:
+            self.files = collected_files(self.root) if os.path.isdir(self.root) else {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        name = request.path_info[len(self.prefix):]
+        if self.files is not None:
+            collected = self.files.get(name)
+        else:
+            collected = collected_file(self.root, name) if self.root else None
+        return (name, collected) if collected else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        found = self.find(request)
+        if found:
+            return serve_collected(request, *found)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        found = self.find(request) if self.files is not None else await sync_to_async(self.find)(request)
+        if found:
+            return await sync_to_async(serve_collected)(request, *found)
+        return await self.get_response(request)
+
+
+# static_asset is the development fallback for files that haven't been collected: with DEBUG on it serves
+# the app's source files from the finders, revalidated on every use. Collected files never get here.
+def static_asset(request, path):
+    if not settings.DEBUG:
+        raise Http404('Static file not found.')
+    found = finders.find(path)
+    if not found:
+        raise Http404('Static file not found.')
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = FileResponse(open(found, 'rb'), content_type=content_type)
+    response['Cache-Control'] = 'no-cache'
+    return response
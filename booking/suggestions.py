@@ -0,0 +1,138 @@
+import datetime
+import heapq
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from .cache import occupancy_index, slot_date
+from .models import BOOKING_HOURS, OPENING_HOUR, Booking, Room
+
+SUGGESTION_DEFAULTS = {
+    'DAYS': 1,  # days either side of the preferred date searched by default
+    'HOURS': 2,  # hours either side of the preferred hour searched by default
+    'LIMIT': 5,  # suggestions returned by default
+    'ON_BOOKING_ERROR': True,  # add suggestions to the 400 for a full slot or an owner conflict
+}
+
+# Largest search the API accepts: one week either side, the whole day, 20 results
+MAX_FLEX_DAYS = 7
+MAX_FLEX_HOURS = len(BOOKING_HOURS) - 1
+MAX_SUGGESTIONS = 20
+
+
+def suggestion_config():
+    return {**SUGGESTION_DEFAULTS, **getattr(settings, 'BOOKING_SUGGESTIONS', {})}
+
+
+def bounded_int(params, key, default, low, high):
+    value = params.get(key)
+    if value in [None, '']:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a whole number.')
+    if value < low:
+        raise ValueError(f'{key} must be at least {low}.')
+    if high is not None and value > high:
+        raise ValueError(f'{key} must be between {low} and {high}.')
+    return value
+
+
+def suggestion_params(params):
+    # Search parameters from a query string; raises ValueError for missing or malformed values
+    config = suggestion_config()
+    room_type = params.get('type')
+    if room_type not in dict(Room.ROOM_TYPE_CHOICES):
+        raise ValueError('type must be private, conference or shared.')
+    if not params.get('date') or not params.get('hour'):
+        raise ValueError('date and hour are required.')
+    date = parse_date(params['date'])
+    if date is None:
+        raise ValueError('Enter a valid date in YYYY-MM-DD format.')
+    return {
+        'room_type': room_type,
+        'date': date,
+        'hour': bounded_int(params, 'hour', None, BOOKING_HOURS[0], BOOKING_HOURS[-1]),
+        'days': bounded_int(params, 'days', config['DAYS'], 0, MAX_FLEX_DAYS),
+        'hours': bounded_int(params, 'hours', config['HOURS'], 0, MAX_FLEX_HOURS),
+        'room_id': bounded_int(params, 'room', None, 1, None),
+        'team_id': bounded_int(params, 'team', None, 1, None),
+        'limit': bounded_int(params, 'limit', config['LIMIT'], 1, MAX_SUGGESTIONS),
+    }
+
+
+def owner_busy_slots(start, end, user=None, team_id=None):
+    # (date, hour) pairs the team or user already holds; the owner can't book those again
+    if team_id is not None:
+        owned = Q(team_id=team_id)
+        if user is not None:
+            # Searches on behalf of a team only see its bookings if the user is a member
+            owned &= Q(team__members=user)
+    elif user is not None:
+        owned = Q(user=user)
+    else:
+        return set()
+    return set(Booking.objects.filter(owned, date__range=(start, end)).values_list('date', 'hour'))
+
+
+def find_suggestions(room_type, date, hour, days=1, hours=2, room_id=None, user=None, team_id=None, limit=5):
+    """
+    Return up to limit free slots near a preferred one, nearest first.
+    Every room of the type is checked at every hour within `hours` of the preferred
+    hour on every day within `days` of the preferred date. The days come from the
+    occupancy index (any not held yet load in one range query) and each hour is
+    checked for all rooms at once. Results are ordered by day distance, then hour
+    distance, then the preferred room before equivalent ones, later before earlier.
+    """
+    start = date - datetime.timedelta(days=days)
+    end = date + datetime.timedelta(days=days)
+    table, occupancy = occupancy_index.load([start + datetime.timedelta(days=offset) for offset in range(2 * days + 1)])
+    positions = table.select(room_type)
+    busy = owner_busy_slots(start, end, user=user, team_id=team_id)
+    candidates = []
+    for day_offset in range(-days, days + 1):
+        day = date + datetime.timedelta(days=day_offset)
+        for hour_offset in range(-hours, hours + 1):
+            slot_hour = hour + hour_offset
+            if slot_hour not in BOOKING_HOURS or (day, slot_hour) in busy:
+                continue
+            spots = occupancy[day].spots(slot_hour - OPENING_HOUR)
+            for position in positions:
+                if spots[position] > 0:
+                    room = table.ids[position]
+                    rank = (abs(day_offset), abs(hour_offset), room != room_id, day_offset < 0, hour_offset < 0, room)
+                    candidates.append((rank, position, day, slot_hour, spots[position]))
+    return [
+        {
+            'room_id': table.ids[position],
+            'name': table.names[position],
+            'type': table.types[position],
+            'capacity': table.capacities[position],
+            'date': day.isoformat(),
+            'hour': slot_hour,
+            'available_spots': available_spots,
+        }
+        for _, position, day, slot_hour, available_spots in heapq.nsmallest(limit, candidates, key=lambda c: c[0])
+    ]
+
+
+def booking_suggestions(room, date, hour, user=None, team=None):
+    # Suggestions for a booking that was turned down, using the configured window; None when turned off
+    config = suggestion_config()
+    if not config['ON_BOOKING_ERROR']:
+        return None
+    try:
+        date = slot_date(date)
+    except ValueError:
+        date = None
+    if date is None:
+        return None
+    return find_suggestions(
+        room.room_type, date, int(hour),
+        days=config['DAYS'],
+        hours=config['HOURS'],
+        room_id=room.id,
+        user=None if team else user,
+        team_id=team.id if team else None,
+        limit=config['LIMIT'],
+    )
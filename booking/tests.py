@@ -1,9 +1,41 @@
-from django.test import TestCase
+from django.test import TestCase, AsyncClient
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
 from rest_framework import status
+from rest_framework.response import Response
 from django.contrib.auth.models import User
-from .models import Room, Team, Booking, UserProfile
+from .models import Room, Team, Booking, UserProfile, SlotOccupancy, BookingRequest, ArchivedBooking
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.test import override_settings
+from django.conf import settings
+from django.utils import timezone
+from django.core.management import call_command, CommandError
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+import datetime
+import gzip
+import io
+import json
+import tempfile
+import threading
+from unittest import mock
+from asgiref.sync import sync_to_async
+from .cache import occupancy_index, OccupancyIndex, AvailabilityResultCache
+from .metrics import registry
+from .middleware import QueryBudgetExceeded
+from .db import warm_up_connections
+from .authentication import token_cache
+from .events import broadcaster, CacheEventBus, SlotEventBroadcaster
+from .throttling import TokenBucket
+from .idempotency import idempotent_requests
+from .views import _rendered_pages
+
+# Fail any request that goes over its declared query budget
+QUERY_BUDGETS = dict(settings.BOOKING_METRICS, RAISE_ON_BUDGET=True)
 
 # Create your tests here.
 
@@ -35,9 +67,12 @@ class UserAuthTests(APITestCase):
         self.assertIn('token', response.data)
 
 # Tests for room booking, cancellation, and related APIs
+@override_settings(BOOKING_METRICS=QUERY_BUDGETS)
 class RoomBookingTests(APITestCase):
     def setUp(self):
         # Set up users, rooms, and teams for all tests
+        cache.clear()
+        occupancy_index.clear()
         self.user = User.objects.create_user(username='booker', password='pass123')
         UserProfile.objects.create(user=self.user, age=28, gender='female')
         self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
@@ -96,6 +131,46 @@ class RoomBookingTests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_rejected_booking_suggests_alternatives(self):
+        print("\nTest: A booking for a full slot should return the nearest free slots with the 400.")
+        Room.objects.create(name='Private2', room_type='private', capacity=1)
+        Booking.objects.create(room=self.private_room, user=self.user2, date='2025-07-01', hour=13, booking_id='taken-13')
+        self.authenticate()
+        response = self.client.post(reverse('booking-list'), {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 13})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Another private room at the same time first, then the preferred room an hour later
+        suggestions = response.data['suggestions']
+        self.assertEqual([(s['name'], s['date'], s['hour']) for s in suggestions[:2]], [
+            ('Private2', '2025-07-01', 13),
+            ('Private1', '2025-07-01', 14),
+        ])
+        self.assertTrue(all(s['type'] == 'private' for s in suggestions))
+        # Validation errors get no suggestions
+        response = self.client.post(reverse('booking-list'), {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 20})
+        self.assertNotIn('suggestions', response.data)
+
+    def test_slot_suggestions_api(self):
+        print("\nTest: The suggestions API should rank free slots by distance and skip the caller's own bookings.")
+        for hour in [10, 11]:
+            Booking.objects.create(room=self.private_room, user=self.user2, date='2025-07-02', hour=hour, booking_id=f'busy-{hour}')
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-02', hour=12, booking_id='own-12')
+        # Validating the bookings above loaded the index; start cold, as a fresh worker would
+        occupancy_index.clear()
+        url = reverse('room-suggestions')
+        params = {'type': 'private', 'date': '2025-07-02', 'hour': 10, 'hours': 3, 'days': 1, 'limit': 4}
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual([(s['date'], s['hour']) for s in response.data['suggestions']], [
+            ('2025-07-02', 9), ('2025-07-02', 12), ('2025-07-02', 13), ('2025-07-03', 10),
+        ])
+        # The user already holds 12:00 on that day, so it isn't offered to them
+        self.authenticate()
+        response = self.client.get(url, params)
+        self.assertEqual([s['hour'] for s in response.data['suggestions']][:3], [9, 13, 10])
+        self.assertEqual(self.client.get(url, {'type': 'private', 'date': '2025-07-02'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, dict(params, days=30)).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, dict(params, type='garage')).status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_shared_desk_capacity(self):
         print("\nTest: Booking a shared desk up to its capacity should succeed, but the next should fail.")
         # Book a shared desk up to its capacity, then ensure the next booking fails
@@ -161,6 +236,1141 @@ class RoomBookingTests(APITestCase):
         url = reverse('create_team')
         usernames = ['booker', 'member2', 'member3']
         data = {'name': 'TeamB', 'members': usernames}
-        response = self.client.post(url, data, format='json')
+        # Users, then the team and its memberships in one transaction
+        with self.assertNumQueries(5):
+            response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, 201)
         self.assertIn('id', response.data)
+        self.assertEqual(Team.objects.get(id=response.data['id']).member_count, 3)
+
+    def test_team_member_count_follows_membership(self):
+        print("\nTest: Team member counts should follow membership changes from either side.")
+        self.assertEqual(Team.objects.get(id=self.team.id).member_count, 3)
+        self.team.members.remove(self.user3)
+        self.assertEqual(self.team.member_count, 2)
+        self.user4.teams.add(self.team)
+        self.assertEqual(Team.objects.get(id=self.team.id).member_count, 3)
+        self.user4.teams.clear()
+        self.assertEqual(Team.objects.get(id=self.team.id).member_count, 2)
+        self.user3.teams.set([self.team])
+        self.user2.delete()
+        self.assertEqual(Team.objects.get(id=self.team.id).member_count, 2)
+
+    def test_conference_booking_uses_cached_eligibility(self):
+        print("\nTest: Conference bookings should check the cached member count and see membership changes.")
+        self.authenticate()
+        url = reverse('booking-list')
+        data = {'room_id': self.conference_room.id, 'date': '2025-07-02', 'hour': 11, 'team_id': self.team.id}
+        for hour in [11, 12]:
+            SlotOccupancy.objects.create(room=self.conference_room, date='2025-07-02', hour=hour, capacity=1)
+        # Room, team, slot claim, booking insert, plus savepoints
+        with self.assertNumQueries(6):
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['team_name'], 'TeamA')
+        # The team is cached now
+        with self.assertNumQueries(5):
+            response = self.client.post(url, dict(data, hour=12))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.team.members.remove(self.user2)
+        response = self.client.post(url, dict(data, hour=13))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Conference rooms require a team of at least 3 members.')
+        response = self.client.post(url, dict(data, team_id=999))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_room_availability_counts_spots(self):
+        print("\nTest: The available rooms API should report remaining spots and hide full rooms.")
+        # Book the private room and one shared desk spot, then check the slot
+        Booking.objects.create(room=self.private_room, user=self.user, date='2025-07-05', hour=10, booking_id='avail-1')
+        Booking.objects.create(room=self.shared_room, user=self.user2, date='2025-07-05', hour=10, booking_id='avail-2')
+        url = reverse('available-rooms')
+        response = self.client.get(url, {'date': '2025-07-05', 'hour': 10})
+        rooms = {room['name']: room['available_spots'] for room in response.data['rooms']}
+        self.assertNotIn('Private1', rooms)
+        self.assertEqual(rooms['Shared1'], 3)
+        self.assertEqual(rooms['Conf1'], 1)
+
+    def test_room_availability_query_count(self):
+        print("\nTest: The available rooms API should not add queries per room and should reuse cached results.")
+        # Extra rooms must not add queries; a cached result needs none
+        for i in range(5):
+            Room.objects.create(name=f'Extra{i}', room_type='shared', capacity=2)
+        url = reverse('available-rooms')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'date': '2025-07-05', 'hour': 11})
+        self.assertEqual(len(response.data['rooms']), 8)
+        with self.assertNumQueries(0):
+            self.client.get(url, {'date': '2025-07-05', 'hour': 11})
+
+    def test_available_rooms_rejects_closed_hours(self):
+        print("\nTest: Asking for availability outside bookable hours should get a 400, not an empty list.")
+        url = reverse('available-rooms')
+        for hour in [8, 19]:
+            response = self.client.get(url, {'type': 'shared', 'date': '2025-07-05', 'hour': hour})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['detail'], 'Booking hours must be between 9 and 18 (9AM-6PM).')
+
+    def test_slot_cache_invalidation(self):
+        print("\nTest: Booking and cancelling should invalidate cached slot counts and availability results.")
+        # Warm the caches, then book and cancel through the API
+        self.authenticate()
+        url = reverse('available-rooms')
+        params = {'type': 'shared', 'date': '2025-07-06', 'hour': 15}
+        self.client.get(url, params)
+        self.assertEqual(occupancy_index.booked(self.shared_room.id, '2025-07-06', 15), 0)
+        # The view loaded the room table and the day into the occupancy index, and the lookup above reused them
+        self.assertEqual(
+            {key: occupancy_index.stats()[key] for key in ['hits', 'misses', 'loads', 'size']},
+            {'hits': 1, 'misses': 1, 'loads': 1, 'size': 2},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.client.post(reverse('booking-list'), {'room_id': self.shared_room.id, 'date': '2025-07-06', 'hour': 15})
+        response = self.client.get(url, params)
+        self.assertEqual(response.data['rooms'][0]['available_spots'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-booking', args=[booking.data['booking_id']]))
+        response = self.client.get(url, params)
+        self.assertEqual(response.data['rooms'][0]['available_spots'], 4)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/virtual_workspace_test_cache',
+    }})
+    def test_shared_caches_on_file_backend(self):
+        print("\nTest: Versioned availability keys should work on a file-based cache.")
+        cache.clear()
+        results = AvailabilityResultCache()
+        key = results.result_key('shared', '2025-07-06', 16)
+        self.assertEqual(key, results.result_key('shared', '2025-07-06', 16))
+        results.bump_slot('2025-07-06', 16)
+        self.assertNotEqual(key, results.result_key('shared', '2025-07-06', 16))
+        cache.clear()
+
+    def test_availability_grid(self):
+        print("\nTest: The availability grid should return per-hour booking counts for each room and day.")
+        # Two bookings on one day, nothing on the next
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-07', hour=9, booking_id='grid-1')
+        Booking.objects.create(room=self.shared_room, user=self.user2, date='2025-07-07', hour=9, booking_id='grid-2')
+        Booking.objects.create(room=self.private_room, user=self.user3, date='2025-07-07', hour=18, booking_id='grid-3')
+        url = reverse('availability-grid')
+        response = self.client.get(url, {'start': '2025-07-07', 'end': '2025-07-08'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hours'], list(range(9, 19)))
+        rooms = {room['name']: room['occupancy'] for room in response.data['rooms']}
+        self.assertEqual(rooms['Shared1'], {'2025-07-07': [2, 0, 0, 0, 0, 0, 0, 0, 0, 0]})
+        self.assertEqual(rooms['Private1']['2025-07-07'][-1], 1)
+        self.assertEqual(rooms['Conf1'], {})
+
+    def test_occupancy_index_follows_bookings(self):
+        print("\nTest: The occupancy index should load a day once and reload it after a booking in any worker.")
+        # Separate instances stand in for separate workers
+        worker_a = OccupancyIndex()
+        worker_b = OccupancyIndex()
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-08', hour=9, booking_id='index-1')
+        with self.assertNumQueries(2):
+            rooms = {room['name']: room['available_spots'] for room in worker_a.available(None, '2025-07-08', 9)}
+        self.assertEqual(rooms, {'Private1': 1, 'Shared1': 3, 'Conf1': 1})
+        with self.assertNumQueries(0):
+            worker_a.available('shared', '2025-07-08', 9)
+        worker_b.available('private', '2025-07-08', 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(room=self.private_room, user=self.user2, date='2025-07-08', hour=10, booking_id='index-2')
+        # Only the changed day is read again, and a new room reshapes the arrays
+        with self.assertNumQueries(1):
+            self.assertEqual(worker_b.available('private', '2025-07-08', 10), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.create(name='Private2', room_type='private', capacity=1)
+        self.assertEqual([room['name'] for room in worker_a.available('private', '2025-07-08', 10)], ['Private2'])
+
+    def test_availability_grid_rejects_long_range(self):
+        print("\nTest: The availability grid should reject invalid or oversized date ranges.")
+        url = reverse('availability-grid')
+        response = self.client.get(url, {'start': '2025-07-01', 'end': '2025-09-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'start': 'not-a-date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_bookings_scoped_to_user_and_teams(self):
+        print("\nTest: Listing bookings should only show the user's and their teams' bookings, without per-row queries.")
+        # One booking each for the user, their team, and an unrelated user
+        Booking.objects.create(room=self.private_room, user=self.user, date='2025-07-08', hour=10, booking_id='mine')
+        Booking.objects.create(room=self.conference_room, team=self.team, date='2025-07-08', hour=11, booking_id='team')
+        Booking.objects.create(room=self.shared_room, user=self.user4, date='2025-07-08', hour=12, booking_id='other')
+        self.authenticate()
+        url = reverse('booking-list')
+        # One joined list query, regardless of row count; the token was cached at login
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        bookings = {booking['booking_id']: booking for booking in response.data['results']}
+        self.assertEqual(set(bookings), {'mine', 'team'})
+        self.assertEqual(bookings['team']['team_name'], 'TeamA')
+
+    def test_list_bookings_cursor_pagination(self):
+        print("\nTest: Listing bookings should page through results with a cursor.")
+        for hour in range(9, 12):
+            Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-09', hour=hour, booking_id=f'page-{hour}')
+        self.authenticate()
+        url = reverse('booking-list')
+        first = self.client.get(url, {'page_size': 2})
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertIsNotNone(first.data['next'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertEqual(second.data['results'][0]['booking_id'], 'page-9')
+
+    def test_list_bookings_filters_and_fields(self):
+        print("\nTest: Listing bookings should filter on the server and select only the requested fields.")
+        Booking.objects.create(room=self.private_room, user=self.user, date='2025-07-08', hour=10, booking_id='private-8')
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-09', hour=10, booking_id='shared-9')
+        Booking.objects.create(room=self.conference_room, team=self.team, date='2025-07-10', hour=11, booking_id='team-10')
+        today = datetime.date.today()
+        Booking.objects.create(room=self.shared_room, user=self.user, date=today - datetime.timedelta(days=1), hour=10, booking_id='past')
+        Booking.objects.create(room=self.shared_room, user=self.user, date=today + datetime.timedelta(days=1), hour=10, booking_id='future')
+        self.authenticate()
+        url = reverse('booking-list')
+
+        def listed(params):
+            return {booking['booking_id'] for booking in self.client.get(url, params).data['results']}
+        self.assertEqual(listed({'type': 'shared', 'start': '2025-07-01', 'end': '2025-07-31'}), {'shared-9'})
+        self.assertEqual(listed({'room': self.private_room.id}), {'private-8'})
+        self.assertEqual(listed({'team': self.team.id}), {'team-10'})
+        self.assertEqual(listed({'upcoming': '1', 'type': 'shared', 'start': today - datetime.timedelta(days=7)}), {'future'})
+        # Only the requested columns are read: no joins for booking_id, date and hour
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'hour,booking_id,date', 'room': self.private_room.id})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN "booking_room"', queries[0]['sql'])
+        self.assertNotIn('"username"', queries[0]['sql'])
+        self.assertEqual(response.data['results'], [{'booking_id': 'private-8', 'date': '2025-07-08', 'hour': 10}])
+        response = self.client.get(url, {'fields': 'team_name', 'team': self.team.id})
+        self.assertEqual(response.data['results'], [{'team_name': 'TeamA'}])
+        for params in [{'fields': 'booking_id,secret'}, {'type': 'garage'}, {'room': 'x'}, {'end': '2025-13-01'}]:
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_bookings_etag(self):
+        print("\nTest: An unchanged booking list should answer 304 without queries, and any change should move its ETag.")
+        Booking.objects.create(room=self.private_room, user=self.user, date='2025-07-08', hour=10, booking_id='mine')
+        self.authenticate()
+        url = reverse('booking-list')
+        first = self.client.get(url)
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        # Other query strings are other representations
+        self.assertNotEqual(self.client.get(url, {'fields': 'booking_id'})['ETag'], etag)
+        # A booking made by a team mate changes the member's list
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(room=self.conference_room, team=self.team, date='2025-07-09', hour=11, booking_id='team')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        etag = response['ETag']
+        # So do leaving a team and renaming a room
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.remove(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([booking['booking_id'] for booking in response.data['results']], ['mine'])
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private_room.name = 'Quiet1'
+            self.private_room.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['results'][0]['room'], 'Quiet1')
+
+    def test_bulk_booking_best_effort(self):
+        print("\nTest: Bulk booking in best-effort mode should book free slots and report conflicts per slot.")
+        Booking.objects.create(room=self.private_room, user=self.user2, date='2025-07-10', hour=10, booking_id='taken')
+        self.authenticate()
+        url = reverse('booking-bulk')
+        # Room ids may come as numbers or numeric strings
+        data = {
+            'room_id': str(self.private_room.id),
+            'mode': 'best_effort',
+            'slots': [
+                {'date': '2025-07-10', 'hour': 9},
+                {'date': '2025-07-10', 'hour': 10},
+                {'date': '2025-07-10', 'hour': 11},
+                {'date': '2025-07-10', 'hour': 11, 'room_id': self.shared_room.id},
+                {'date': '2025-07-10', 'hour': 12, 'room_id': 'abc'},
+            ],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['status'] for r in response.data['results']], ['booked', 'failed', 'booked', 'failed', 'failed'])
+        self.assertEqual(response.data['results'][1]['detail'], 'This room is already booked for the selected slot.')
+        self.assertEqual(response.data['results'][3]['detail'], 'You already have a booking for this slot.')
+        self.assertEqual(response.data['results'][4]['detail'], 'Invalid room id.')
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_booking_all_or_nothing(self):
+        print("\nTest: Bulk booking in all-or-nothing mode should book nothing if any slot conflicts.")
+        Booking.objects.create(room=self.conference_room, team=self.team, date='2025-07-16', hour=10, booking_id='team-taken')
+        self.authenticate()
+        url = reverse('booking-bulk')
+        # Recurring weekday series: Monday 14 to Friday 18 July 2025
+        data = {
+            'room_id': self.conference_room.id,
+            'team_id': self.team.id,
+            'recurrence': {'start_date': '2025-07-14', 'end_date': '2025-07-20', 'hour': 10},
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['booked'], 0)
+        self.assertEqual(Booking.objects.filter(team=self.team).count(), 1)
+        # Without the conflicting day the whole series is booked
+        data['recurrence']['weekdays'] = [0, 1, 3, 4]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['booked'], 4)
+
+    def test_only_owner_conflicts_become_booking_errors(self):
+        print("\nTest: Integrity errors other than an owner's double booking should not be reported as one.")
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-12', hour=10, booking_id='fixed-id')
+        with self.assertRaisesMessage(ValidationError, 'You already have a booking for this slot.'):
+            Booking.create_booking_with_lock(room=self.shared_room, user=self.user, date='2025-07-12', hour=10)
+        # A booking_id collision is not a double booking
+        with mock.patch('booking.models.uuid.uuid4', return_value='fixed-id'):
+            with self.assertRaises(IntegrityError):
+                Booking.create_booking_with_lock(room=self.shared_room, user=self.user2, date='2025-07-12', hour=10)
+
+    def test_slot_occupancy_tracks_bookings(self):
+        print("\nTest: The slot occupancy counter should follow bookings and cancellations.")
+        self.authenticate()
+        url = reverse('booking-list')
+        data = {'room_id': self.shared_room.id, 'date': '2025-07-11', 'hour': 10}
+        response = self.client.post(url, data)
+        slot = SlotOccupancy.objects.get(room=self.shared_room, date='2025-07-11', hour=10)
+        self.assertEqual((slot.count, slot.capacity), (1, 4))
+        self.client.post(reverse('cancel-booking', args=[response.data['booking_id']]))
+        slot.refresh_from_db()
+        self.assertEqual(slot.count, 0)
+
+    def test_database_rejects_double_booking(self):
+        print("\nTest: The database should reject a full slot and a second booking by the same user.")
+        Booking.create_booking_with_lock(room=self.private_room, user=self.user, date='2025-07-11', hour=11)
+        with self.assertRaisesMessage(ValidationError, 'This room is already booked for the selected slot.'):
+            Booking.create_booking_with_lock(room=self.private_room, user=self.user2, date='2025-07-11', hour=11)
+        with self.assertRaisesMessage(ValidationError, 'You already have a booking for this slot.'):
+            Booking.create_booking_with_lock(room=self.shared_room, user=self.user, date='2025-07-11', hour=11)
+        # The constraints hold even for writes that skip validation
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.bulk_create([Booking(room=self.shared_room, user=self.user, date='2025-07-11', hour=11, booking_id='raw')])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SlotOccupancy.objects.filter(room=self.private_room, date='2025-07-11', hour=11).update(count=2)
+
+    def test_booking_query_count(self):
+        print("\nTest: Creating a booking should take a small, fixed number of queries.")
+        self.authenticate()
+        url = reverse('booking-list')
+        Booking.objects.create(room=self.shared_room, user=self.user2, date='2025-07-11', hour=12, booking_id='seed')
+        # Room, slot claim, booking insert, plus savepoints; the token was cached at login
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {'room_id': self.shared_room.id, 'date': '2025-07-11', 'hour': 12})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+# Tests for the async views served by the ASGI entry point
+@override_settings(ROOT_URLCONF='virtual_workspace.asgi_urls', BOOKING_METRICS=QUERY_BUDGETS)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        occupancy_index.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
+        self.shared_room = Room.objects.create(name='Shared1', room_type='shared', capacity=4)
+        self.team = Team.objects.create(name='TeamA')
+        self.team.members.add(self.user)
+
+    async def test_async_available_rooms(self):
+        print("\nTest: The async available rooms view should match the sync view and cache its result.")
+        await Booking.objects.acreate(room=self.private_room, user=self.user, date='2025-07-01', hour=10, booking_id='private-10')
+        # Validating the booking loaded the index; start cold, as a fresh worker would
+        occupancy_index.clear()
+        client = AsyncClient()
+        params = {'date': '2025-07-01', 'hour': 10}
+        response = await client.get(reverse('available-rooms'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['rooms'],
+            [{'id': self.shared_room.id, 'name': 'Shared1', 'type': 'shared', 'capacity': 4, 'available_spots': 4}],
+        )
+        cached = await client.get(reverse('available-rooms'), params)
+        self.assertEqual(cached.json(), response.json())
+        # Room list and slot counts for the first request, nothing for the cached one
+        metrics = registry.snapshot()[('available-rooms', 'GET')]
+        self.assertEqual((metrics['requests'], metrics['queries']), (2, 2))
+        invalid = await client.get(reverse('available-rooms'), {'date': 'tomorrow', 'hour': 10})
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        closed = await client.get(reverse('available-rooms'), {'date': '2025-07-01', 'hour': 20})
+        self.assertEqual(closed.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(closed.json()['detail'], 'Booking hours must be between 9 and 18 (9AM-6PM).')
+
+    async def test_async_throttle_keys_session_users(self):
+        print("\nTest: The async views should throttle session users by user, sharing the sync views' bucket.")
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        params = {'date': '2025-07-01', 'hour': 10}
+        # Looking up the session adds two queries over the read's own budget, as it does in the sync view
+        throttled = {'RATES': {'availability': {'RATE': 0.01, 'BURST': 1}}}
+        with override_settings(BOOKING_THROTTLE=throttled, BOOKING_METRICS=dict(QUERY_BUDGETS, RAISE_ON_BUDGET=False)):
+            self.assertEqual((await client.get(reverse('available-rooms'), params)).status_code, status.HTTP_200_OK)
+            # The user's bucket is spent, whichever stack or address the next request comes from
+            self.assertGreater(await sync_to_async(TokenBucket('availability').consume)(f'user:{self.user.pk}'), 0)
+            response = await client.get(reverse('available-rooms'), params)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    async def test_async_slot_stream(self):
+        print("\nTest: The slot stream should send missed events after Last-Event-ID as Server-Sent Events.")
+        first = broadcaster.publish({'room_id': 1, 'date': '2025-07-01', 'hour': 9, 'type': 'private', 'remaining': 0})
+        broadcaster.publish({'room_id': 2, 'date': '2025-07-01', 'hour': 9, 'type': 'shared', 'remaining': 3})
+        client = AsyncClient()
+        with override_settings(BOOKING_EVENTS={'MAX_STREAM_SECONDS': 0}):
+            response = await client.get(reverse('slot-stream'), {'type': 'shared'}, headers={'Last-Event-ID': str(first - 1)})
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(body.startswith('retry: 3000\n\n'))
+        self.assertIn(f'id: {first + 1}\nevent: slot\ndata: {{"room_id": 2', body)
+        self.assertNotIn('"room_id": 1', body)
+        invalid = await client.get(reverse('slot-stream'), {'date': 'soon'})
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_slot_stream_throttled(self):
+        print("\nTest: Opening the slot stream should be throttled like availability reads, subscribing off the event loop.")
+        client = AsyncClient()
+        loop_thread = threading.get_ident()
+        subscribe = broadcaster.subscribe
+        threads = []
+
+        def tracked_subscribe(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return subscribe(*args, **kwargs)
+
+        throttled = {'RATES': {'availability': {'RATE': 0.01, 'BURST': 1}}}
+        with override_settings(BOOKING_THROTTLE=throttled, BOOKING_EVENTS={'MAX_STREAM_SECONDS': 0}), \
+                mock.patch.object(broadcaster, 'subscribe', tracked_subscribe):
+            response = await client.get(reverse('slot-stream'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            b''.join([chunk async for chunk in response.streaming_content])
+            second = await client.get(reverse('slot-stream'))
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', second)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+    async def test_async_booking_list(self):
+        print("\nTest: The async booking list should require a token and page like the sync view.")
+        for hour in range(9, 12):
+            await Booking.objects.acreate(room=self.shared_room, user=self.user, date='2025-07-09', hour=hour, booking_id=f'page-{hour}')
+        await Booking.objects.acreate(room=self.private_room, team=self.team, date='2025-07-09', hour=9, booking_id='team-9')
+        client = AsyncClient()
+        url = reverse('booking-list')
+        self.assertEqual((await client.get(url)).status_code, status.HTTP_403_FORBIDDEN)
+        headers = {'Authorization': 'Token ' + self.token.key}
+        first = (await client.get(url, {'page_size': 3}, headers=headers)).json()
+        self.assertEqual([b['booking_id'] for b in first['results']], ['team-9', 'page-11', 'page-10'])
+        second = (await client.get(first['next'], headers=headers)).json()
+        self.assertEqual([b['booking_id'] for b in second['results']], ['page-9'])
+        self.assertIsNone(second['next'])
+        # Filters, fields and ETags work as in the sync view
+        response = await client.get(url, {'type': 'private', 'fields': 'booking_id'}, headers=headers)
+        self.assertEqual(response.json()['results'], [{'booking_id': 'team-9'}])
+        response = await client.get(url, {'type': 'private', 'fields': 'booking_id'}, headers=dict(headers, If_None_Match=response['ETag']))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Creating a booking on the same URL goes to the sync view
+        created = await client.post(url, {'room_id': self.private_room.id, 'date': '2025-07-10', 'hour': 9}, headers=headers)
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+
+    async def test_async_booking_export(self):
+        print("\nTest: The async export should stream rows to staff only.")
+        await Booking.objects.acreate(room=self.private_room, team=self.team, date='2025-07-09', hour=9, booking_id='team-9')
+        client = AsyncClient()
+        url = reverse('booking-export')
+        headers = {'Authorization': 'Token ' + self.token.key}
+        self.assertEqual((await client.get(url, headers=headers)).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        await self.user.asave()
+        response = await client.get(url, {'output': 'ndjson'}, headers=headers)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        row = json.loads(body)
+        self.assertEqual((row['booking_id'], row['room'], row['team_name'], row['user']), ('team-9', 'Private1', 'TeamA', ''))
+
+
+# Tests for queue admission of booking requests
+class BookingQueueTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
+        self.client.force_authenticate(self.user)
+
+    @override_settings(BOOKING_QUEUE={'ENABLED': True, 'WAIT_SECONDS': 1})
+    def test_queued_booking_decided_inline(self):
+        print("\nTest: In queue mode a booking request should be decided while the caller waits.")
+        url = reverse('booking-list')
+        data = {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 10}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['room'], 'Private1')
+        self.client.force_authenticate(self.other)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'This room is already booked for the selected slot.')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @override_settings(BOOKING_QUEUE={'ENABLED': True, 'INLINE_DRAIN': False, 'WAIT_SECONDS': 0})
+    def test_queued_bookings_drained_in_arrival_order(self):
+        print("\nTest: Queued requests should get tickets and be decided in arrival order by the drain command.")
+        url = reverse('booking-list')
+        data = {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 10}
+        self.client.force_authenticate(self.other)
+        first = self.client.post(url, data)
+        self.client.force_authenticate(self.user)
+        second = self.client.post(url, data)
+        self.assertEqual((first.status_code, second.status_code), (status.HTTP_202_ACCEPTED, status.HTTP_202_ACCEPTED))
+        self.assertEqual(self.client.get(second['Location']).data['status'], 'queued')
+        call_command('drain_booking_queue', once=True, stdout=io.StringIO())
+        ticket = self.client.get(second['Location']).data
+        self.assertEqual((ticket['status'], ticket['booking']), ('failed', None))
+        self.assertEqual(ticket['detail'], 'This room is already booked for the selected slot.')
+        # Tickets are private to the requester
+        self.assertEqual(self.client.get(first['Location']).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(self.other)
+        ticket = self.client.get(first['Location']).data
+        self.assertEqual(ticket['status'], 'booked')
+        self.assertEqual(ticket['booking']['user'], 'other')
+        self.assertEqual(SlotOccupancy.objects.get(room=self.private_room).count, 1)
+
+
+# Tests for booking quotas and request throttling
+class BookingQuotaTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        occupancy_index.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.rooms = [Room.objects.create(name=f'Private{i}', room_type='private', capacity=1) for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def book(self, room, date, hour):
+        # Run the on-commit cache updates as a real commit would
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('booking-list'), {'room_id': room.id, 'date': date, 'hour': hour})
+
+    @override_settings(BOOKING_QUOTAS={'USER_PER_DAY': 2, 'USER_PER_WEEK': 3})
+    def test_user_quota_per_day_and_week(self):
+        print("\nTest: Bookings over a user's daily or weekly quota should be refused until one is cancelled.")
+        self.assertEqual(self.book(self.rooms[0], '2025-07-01', 10).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(self.rooms[1], '2025-07-01', 11).status_code, status.HTTP_201_CREATED)
+        response = self.book(self.rooms[2], '2025-07-01', 12)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'You have reached your limit of 2 bookings per day.')
+        self.assertEqual(self.book(self.rooms[2], '2025-07-02', 12).status_code, status.HTTP_201_CREATED)
+        response = self.book(self.rooms[2], '2025-07-03', 12)
+        self.assertEqual(response.data['detail'], 'You have reached your limit of 3 bookings per week.')
+        # A new ISO week starts on Monday
+        self.assertEqual(self.book(self.rooms[2], '2025-07-07', 12).status_code, status.HTTP_201_CREATED)
+        # Cancelling gives the place back
+        booking = Booking.objects.get(date='2025-07-01', hour=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-booking', args=[booking.booking_id]))
+        self.assertEqual(self.book(self.rooms[0], '2025-07-01', 12).status_code, status.HTTP_201_CREATED)
+
+    @override_settings(BOOKING_QUOTAS={'USER_PER_DAY': 1})
+    def test_quota_counts_existing_bookings(self):
+        print("\nTest: Quotas should count the bookings already held, however they were made.")
+        Booking.objects.create(room=self.rooms[0], user=self.user, date='2025-07-01', hour=10, booking_id='held-10')
+        response = self.book(self.rooms[1], '2025-07-01', 11)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'You have reached your limit of 1 bookings per day.')
+
+    @override_settings(
+        BOOKING_QUOTAS={'USER_PER_DAY': 1},
+        BOOKING_QUEUE={'ENABLED': True, 'INLINE_DRAIN': False, 'WAIT_SECONDS': 0},
+    )
+    def test_queued_bookings_checked_when_decided(self):
+        print("\nTest: Queued bookings should be held to the quota when the queue decides them.")
+        first = self.book(self.rooms[0], '2025-07-01', 10)
+        second = self.book(self.rooms[1], '2025-07-01', 11)
+        self.assertEqual((first.status_code, second.status_code), (status.HTTP_202_ACCEPTED, status.HTTP_202_ACCEPTED))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('drain_booking_queue', once=True, stdout=io.StringIO())
+        self.assertEqual(self.client.get(first['Location']).data['status'], 'booked')
+        ticket = self.client.get(second['Location']).data
+        self.assertEqual((ticket['status'], ticket['detail']), ('failed', 'You have reached your limit of 1 bookings per day.'))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @override_settings(BOOKING_QUOTAS={'USER_PER_DAY': 2})
+    def test_bulk_booking_respects_quota(self):
+        print("\nTest: Bulk booking should fail the slots over the quota and book the rest in best-effort mode.")
+        data = {
+            'room_id': self.rooms[0].id,
+            'mode': 'best_effort',
+            'slots': [{'date': '2025-07-01', 'hour': hour} for hour in [10, 11, 12]],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['booked'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['results'][2]['detail'], 'You have reached your limit of 2 bookings per day.')
+        self.assertEqual(self.book(self.rooms[1], '2025-07-01', 13).status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BOOKING_THROTTLE={'RATES': {'booking': {'RATE': 0.01, 'BURST': 2}}})
+    def test_booking_requests_throttled(self):
+        print("\nTest: Booking requests over the token bucket should get 429 with Retry-After.")
+        for hour in [10, 11]:
+            self.assertEqual(self.book(self.rooms[0], '2025-07-01', hour).status_code, status.HTTP_201_CREATED)
+        response = self.book(self.rooms[0], '2025-07-01', 12)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '100')
+        self.assertEqual(Booking.objects.count(), 2)
+        # Buckets are per user
+        other = User.objects.create_user(username='other', password='pass123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.book(self.rooms[1], '2025-07-01', 12).status_code, status.HTTP_201_CREATED)
+
+    @override_settings(BOOKING_THROTTLE={'RATES': {'availability': {'RATE': 0.5, 'BURST': 1}}})
+    def test_availability_requests_throttled(self):
+        print("\nTest: Availability reads over the token bucket should get 429, and the bucket should refill.")
+        url = reverse('available-rooms') + '?type=private&date=2025-07-01&hour=10'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Request was throttled.', response.data['detail'])
+        bucket = TokenBucket('availability')
+        self.assertEqual(bucket.consume('test', now=100.0), 0)
+        self.assertEqual(bucket.consume('test', now=100.5), 1.5)
+        self.assertEqual(bucket.consume('test', now=102.0), 0)
+
+
+# Tests for Idempotency-Key handling on booking creation
+class IdempotentBookingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        occupancy_index.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
+        self.client.force_authenticate(self.user)
+        self.url = reverse('booking-list')
+        self.data = {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 10}
+
+    def test_retry_replays_first_response(self):
+        print("\nTest: A retried booking with the same Idempotency-Key should get the original 201 without booking again.")
+        first = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(0):
+            retry = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        # Without a key a retry is an ordinary second attempt
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_reuse_and_in_progress(self):
+        print("\nTest: Reusing a key for another request should get 422, and a key still in use should get 409.")
+        self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-2')
+        response = self.client.post(self.url, dict(self.data, hour=11), HTTP_IDEMPOTENCY_KEY='retry-2')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+        # Keys belong to the user that sent them
+        other = User.objects.create_user(username='other', password='pass123')
+        self.client.force_authenticate(other)
+        response = self.client.post(self.url, dict(self.data, hour=11), HTTP_IDEMPOTENCY_KEY='retry-2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(self.user)
+        # Put the first request back in flight: same fingerprint, no response yet
+        key = idempotent_requests.cache_key(self.user, 'retry-2')
+        fingerprint = cache.get(key)[0]
+        cache.set(key, (fingerprint, None, None, None, 'first'))
+        response = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-2')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='x' * 256).status_code, 400)
+
+    def test_rejected_booking_not_replayed(self):
+        print("\nTest: A turned-down booking should free its key so a retry is decided again.")
+        other = User.objects.create_user(username='other', password='pass123')
+        taken = Booking.objects.create(room=self.private_room, user=other, date='2025-07-01', hour=10, booking_id='taken')
+        response = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-4')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        taken.delete()
+        response = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-4')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_expired_claim_leaves_newer_entry_alone(self):
+        print("\nTest: A request whose claim expired should not delete or overwrite the response another request stored.")
+        key = idempotent_requests.cache_key(self.user, 'retry-5')
+        newer = ('fingerprint', 201, '{"booking_id":"newer"}', None, 'other-claim')
+
+        def slow_booking(request):
+            # The pending entry expires meanwhile and another request stores its 201 under the key
+            cache.set(key, newer)
+            return Response({'detail': 'This room is already booked for the selected slot.'}, status=400)
+
+        with mock.patch('booking.views.BookingViewSet.create_booking', side_effect=slow_booking):
+            response = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-5')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(cache.get(key), newer)
+
+    def test_malformed_entry_not_replayed(self):
+        print("\nTest: An entry without a claim token should be ignored and the request decided afresh.")
+        key = idempotent_requests.cache_key(self.user, 'retry-7')
+        cache.set(key, ('fingerprint', 201, '{"booking_id":"old"}', None))
+        response = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='retry-7')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(cache.get(key)[1:3], (201, json.dumps(response.data, separators=(',', ':'))))
+
+
+# Tests for live slot change streams
+class SlotEventTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
+        self.client.force_authenticate(self.user)
+
+    def test_booking_and_cancel_publish_slot_changes(self):
+        print("\nTest: Booking and cancelling should push the slot's remaining spots to subscribers.")
+        subscription = broadcaster.subscribe({'date': '2025-07-01', 'hour': None, 'type': None}, start_poller=False)
+        self.addCleanup(subscription.close)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-list'), {'room_id': self.private_room.id, 'date': '2025-07-01', 'hour': 10})
+        _, event = subscription.get(timeout=1)
+        self.assertEqual((event['room_id'], event['hour'], event['booked'], event['remaining']), (self.private_room.id, 10, 1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-booking', args=[response.data['booking_id']]))
+        _, event = subscription.get(timeout=1)
+        self.assertEqual((event['booked'], event['remaining']), (0, 1))
+        # Other dates are filtered out
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking-list'), {'room_id': self.private_room.id, 'date': '2025-07-02', 'hour': 10})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_events_reach_other_workers_through_the_bus(self):
+        print("\nTest: Events published in one worker should reach streams in another exactly once.")
+        bus = CacheEventBus()
+        worker_a, worker_b = SlotEventBroadcaster(bus), SlotEventBroadcaster(bus)
+        filters = {'date': None, 'hour': None, 'type': None}
+        on_a = worker_a.subscribe(filters, start_poller=False)
+        on_b = worker_b.subscribe(filters, start_poller=False)
+        seq = worker_a.publish({'room_id': 1, 'date': '2025-07-01', 'hour': 9, 'type': 'private', 'remaining': 0})
+        worker_a.poll_once()
+        worker_b.poll_once()
+        self.assertEqual(on_a.get(timeout=0)[0], seq)
+        self.assertIsNone(on_a.get(timeout=0))
+        self.assertEqual(on_b.get(timeout=0), (seq, {'room_id': 1, 'date': '2025-07-01', 'hour': 9, 'type': 'private', 'remaining': 0}))
+
+    def test_event_bus_sequence_is_unique_on_file_cache(self):
+        print("\nTest: Concurrent publishers on the file cache should never share a sequence number or lose an event.")
+        with tempfile.TemporaryDirectory() as directory:
+            file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            with override_settings(CACHES={'default': settings.CACHES['default'], 'events': file_cache}):
+                bus = CacheEventBus(alias='events')
+                seqs = []
+
+                def publish(worker):
+                    for n in range(20):
+                        seqs.append(bus.publish({'worker': worker, 'n': n}))
+                threads = [threading.Thread(target=publish, args=(worker,)) for worker in range(6)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(sorted(seqs), list(range(1, 121)))
+                self.assertEqual(len(bus.read(0, 120)), 120)
+
+    def test_slot_stream_only_under_asgi(self):
+        print("\nTest: Sync workers should not serve the slot stream, and pages should only subscribe when it exists.")
+        self.assertEqual(self.client.get('/api/v1/rooms/stream/').status_code, status.HTTP_404_NOT_FOUND)
+        _rendered_pages.clear()
+        self.assertContains(self.client.get(reverse('available-rooms-page')), '<body data-slot-stream="">')
+        _rendered_pages.clear()
+        with override_settings(ROOT_URLCONF='virtual_workspace.asgi_urls'):
+            page = self.client.get(reverse('available-rooms-page'))
+        self.assertContains(page, '<body data-slot-stream="/api/v1/rooms/stream/">')
+        _rendered_pages.clear()
+
+
+# Tests for cached token authentication
+class TokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        UserProfile.objects.create(user=self.user, age=30, gender='female')
+        Token.objects.create(user=self.user)
+
+    def login(self):
+        # User, token and profile
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('login'), {'username': 'booker', 'password': 'pass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['user'], 'booker')
+        return response.data['token']
+
+    def test_cached_token_skips_auth_queries(self):
+        print("\nTest: Requests with a cached token should authenticate without touching the database.")
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        # Only the page query; the token and user come from the cache filled at login
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_200_OK)
+        # Another worker has an empty local tier and reads the shared one
+        token_cache.local.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_200_OK)
+        # Without the cache, the token lookup comes back
+        cache.clear()
+        token_cache.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_200_OK)
+
+    def test_cached_token_invalidation(self):
+        print("\nTest: Deactivating the user or deleting the token should end cached authentication at once.")
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_200_OK)
+        Token.objects.filter(key=key).delete()
+        self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cached_token_holds_no_secrets(self):
+        print("\nTest: The shared token cache should hold only the user's id, name and flags, never the key or password.")
+        key = self.login()
+        entry = cache.get(token_cache.make_key(key, token_cache.version(key)))
+        self.assertEqual(entry, (self.user.pk, False, 'booker', False, True))
+        self.assertNotIn(key, repr(entry))
+        self.assertNotIn(self.user.password, repr(entry))
+        token, _ = token_cache.lookup(key)
+        self.assertEqual((token.key, token.user.pk, token.user.username), (key, self.user.pk, 'booker'))
+        # Fields outside the entry are loaded on first use
+        with self.assertNumQueries(1):
+            self.assertEqual(token.user.password, self.user.password)
+
+    def test_cache_fill_racing_invalidation_is_discarded(self):
+        print("\nTest: A token read from the database before a deactivation should not be cached after it.")
+        key = Token.objects.get(user=self.user).key
+        token, version = token_cache.lookup(key)
+        self.assertIsNone(token)
+        # Another request reads the token, then the user is deactivated before it fills the cache
+        stale = Token.objects.select_related('user').get(key=key)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        token_cache.set(stale, version)
+        # The local copy ages out within LOCAL_TTL, as on any worker; the shared entry is never read again
+        token_cache.local.clear()
+        self.assertEqual(token_cache.lookup(key)[0], None)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        self.assertEqual(self.client.get(reverse('booking-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+# Tests for the streaming booking export
+class BookingExportTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='finance', password='pass123', is_staff=True)
+        self.user = User.objects.create_user(username='booker', password='pass123')
+        self.team = Team.objects.create(name='TeamA')
+        self.private_room = Room.objects.create(name='Private1', room_type='private', capacity=1)
+        self.shared_room = Room.objects.create(name='Shared1', room_type='shared', capacity=4)
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-02', hour=10, booking_id='shared-2')
+        Booking.objects.create(room=self.private_room, team=self.team, date='2025-07-01', hour=9, booking_id='team-1')
+        Booking.objects.create(room=self.shared_room, user=self.user, date='2025-07-05', hour=9, booking_id='shared-5')
+
+    def export(self, **params):
+        response = self.client.get(reverse('booking-export'), params)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_csv_and_ndjson(self):
+        print("\nTest: The export should stream filtered bookings as CSV or NDJSON in date order.")
+        self.client.force_authenticate(user=self.staff)
+        with self.assertNumQueries(1):
+            response, body = self.export(start='2025-07-01', end='2025-07-03')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = body.splitlines()
+        self.assertEqual(lines[0], 'booking_id,date,hour,room,type,user,team_id,team_name,created_at')
+        self.assertEqual([line.split(',')[:6] for line in lines[1:]], [
+            ['team-1', '2025-07-01', '9', 'Private1', 'private', ''],
+            ['shared-2', '2025-07-02', '10', 'Shared1', 'shared', 'booker'],
+        ])
+        _, body = self.export(output='ndjson', type='shared')
+        self.assertEqual([json.loads(line)['booking_id'] for line in body.splitlines()], ['shared-2', 'shared-5'])
+        _, body = self.export(output='ndjson', team=self.team.id)
+        self.assertEqual(json.loads(body)['team_id'], self.team.id)
+        self.assertEqual(self.client.get(reverse('booking-export'), {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('booking-export'), {'start': 'July'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_staff(self):
+        print("\nTest: Only staff should be able to export all bookings.")
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('booking-export')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command_with_history(self):
+        print("\nTest: The export command should write every booking, archived ones included with --history.")
+        Booking.archive(datetime.date(2025, 7, 2))
+        with tempfile.NamedTemporaryFile(mode='r', suffix='.ndjson') as output:
+            call_command('export_bookings', output='ndjson', file=output.name, history=True)
+            rows = [json.loads(line) for line in output]
+        self.assertEqual([row['booking_id'] for row in rows], ['team-1', 'shared-2', 'shared-5'])
+        stdout = io.StringIO()
+        call_command('export_bookings', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3)
+
+
+# Tests for the hashed, precompressed frontend assets and cached pages
+class StaticAssetTests(TestCase):
+    def test_page_uses_static_assets_and_etag(self):
+        print("\nTest: Pages should link their CSS/JS files and answer a matching ETag with 304.")
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/booking/css/home.css')
+        self.assertContains(response, '/static/booking/js/home.js')
+        self.assertNotContains(response, '<style>')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        cached = self.client.get(reverse('home'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        # Not collected: only with DEBUG on is the source file served, and without long-lived caching
+        self.assertEqual(self.client.get('/static/booking/css/home.css').status_code, 404)
+        with override_settings(DEBUG=True):
+            asset = self.client.get('/static/booking/css/home.css')
+            self.assertEqual(asset.status_code, 200)
+            self.assertEqual(asset['Cache-Control'], 'no-cache')
+            self.assertEqual(self.client.get('/static/booking/css/missing.css').status_code, 404)
+
+    def test_collected_assets_are_hashed_and_compressed(self):
+        print("\nTest: Collected assets should get hashed names, gzip variants and immutable caching.")
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = static('booking/js/home.js')
+            self.assertRegex(url, r'^/static/booking/js/home\.[0-9a-f]{12}\.js$')
+            name = url[len('/static/'):]
+            with open(staticfiles_storage.path(name), 'rb') as source:
+                original = source.read()
+            response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+            plain = self.client.get(url, headers={'Accept-Encoding': 'identity'})
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            self.assertEqual(b''.join(plain.streaming_content), original)
+            revalidated = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(self.client.get('/static/../virtual_workspace/settings.py').status_code, 404)
+            # Served by the middleware: no URL resolution, view or request metrics
+            registry.clear()
+            with self.assertNumQueries(0):
+                self.client.get(url)
+            self.assertEqual(registry.snapshot(), {})
+
+
+# Tests for request metrics and query budgets
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        Room.objects.create(name='Private1', room_type='private', capacity=1)
+
+    def test_metrics_export(self):
+        print("\nTest: The metrics endpoint should export latency, query counts and DB time per endpoint.")
+        self.client.get(reverse('available-rooms'), {'date': '2025-07-01', 'hour': 10})
+        # Staff only
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        user = User.objects.create_user(username='viewer', password='pass123')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('booking_request_duration_seconds_count{endpoint="available-rooms",method="GET"} 1', body)
+        self.assertIn('booking_request_db_queries_total{endpoint="available-rooms",method="GET"} 2', body)
+        self.assertIn('booking_request_serialization_seconds_total{endpoint="available-rooms",method="GET"}', body)
+        self.assertIn('booking_occupancy_index_days_total{result="miss"} 1', body)
+        self.assertIn('booking_occupancy_index_loads_total 1', body)
+
+    def test_query_budget_exceeded(self):
+        print("\nTest: A request over its declared query budget should fail when budgets are enforced.")
+        budgets = dict(QUERY_BUDGETS, BUDGETS={'available-rooms': {'QUERIES': 1}})
+        with override_settings(BOOKING_METRICS=budgets), self.assertLogs('booking.metrics', 'WARNING'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('available-rooms'), {'date': '2025-07-01', 'hour': 10})
+
+
+# Tests for management commands
+class ManagementCommandTests(APITestCase):
+    def test_rebuild_slot_occupancy(self):
+        print("\nTest: The occupancy rebuild should report drifted counters and fix them from bookings.")
+        user = User.objects.create_user(username='booker', password='pass123')
+        room = Room.objects.create(name='Shared1', room_type='shared', capacity=4)
+        Booking.objects.create(room=room, user=user, date='2025-07-01', hour=10, booking_id='b-10')
+        SlotOccupancy.objects.filter(room=room).update(count=3)
+        SlotOccupancy.objects.create(room=room, date='2025-07-02', hour=9, capacity=4, count=2)
+        with self.assertRaisesMessage(CommandError, 'Checked 2 days: 2 slots out of sync.'):
+            call_command('rebuild_slot_occupancy', verify=True, stdout=io.StringIO())
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_slot_occupancy', stdout=output)
+        self.assertIn(f'room {room.id} 2025-07-01 10:00 counter 3, bookings 1', output.getvalue())
+        self.assertEqual(
+            sorted(SlotOccupancy.objects.values_list('date', 'hour', 'count')),
+            [(datetime.date(2025, 7, 1), 10, 1), (datetime.date(2025, 7, 2), 9, 0)],
+        )
+        call_command('rebuild_slot_occupancy', verify=True, stdout=io.StringIO())
+
+    def test_rebuild_tolerates_counter_created_by_a_booking(self):
+        print("\nTest: A booking creating a missing counter during the rebuild should be counted, not crash it.")
+        user = User.objects.create_user(username='booker', password='pass123')
+        other = User.objects.create_user(username='other', password='pass123')
+        room = Room.objects.create(name='Shared1', room_type='shared', capacity=4)
+        Booking.objects.create(room=room, user=user, date='2025-07-01', hour=10, booking_id='b-10')
+        SlotOccupancy.objects.all().delete()
+        in_bulk = Room.objects.in_bulk
+
+        def book_meanwhile(*args, **kwargs):
+            # A concurrent booking claims the slot after sync_day read the day's counters
+            Booking.objects.create(room=room, user=other, date='2025-07-01', hour=10, booking_id='b-11')
+            return in_bulk(*args, **kwargs)
+
+        with mock.patch.object(Room.objects, 'in_bulk', side_effect=book_meanwhile):
+            with self.captureOnCommitCallbacks(execute=True):
+                SlotOccupancy.sync_day(datetime.date(2025, 7, 1))
+        self.assertEqual(SlotOccupancy.objects.get(room=room, hour=10).count, 2)
+
+    @override_settings(BOOKING_METRICS=QUERY_BUDGETS)
+    def test_archive_bookings(self):
+        print("\nTest: Archiving should move past bookings out of the live table and keep them readable as history.")
+        user = User.objects.create_user(username='booker', password='pass123')
+        room = Room.objects.create(name='Shared1', room_type='shared', capacity=4)
+        for booking_id, date, hour in [('old-1', '2025-06-01', 9), ('old-2', '2025-06-01', 10), ('old-3', '2025-06-02', 9), ('new', '2025-07-01', 9)]:
+            Booking.objects.create(room=room, user=user, date=date, hour=hour, booking_id=booking_id)
+        queued = BookingRequest.objects.create(
+            ticket='t-1', requested_by=user, room=room, date='2025-06-01', hour=9,
+            status=BookingRequest.BOOKED, booking=Booking.objects.get(booking_id='old-1'),
+        )
+        output = io.StringIO()
+        call_command('archive_bookings', before=datetime.date(2025, 7, 1), chunk_size=2, dry_run=True, stdout=output)
+        self.assertIn('3 bookings dated before 2025-07-01 would be archived.', output.getvalue())
+        output = io.StringIO()
+        call_command('archive_bookings', before=datetime.date(2025, 7, 1), chunk_size=2, stdout=output)
+        self.assertIn('Archived 3 bookings dated before 2025-07-01.', output.getvalue())
+        self.assertEqual(list(Booking.objects.values_list('booking_id', flat=True)), ['new'])
+        self.assertEqual(sorted(ArchivedBooking.objects.values_list('booking_id', flat=True)), ['old-1', 'old-2', 'old-3'])
+        # The archived days' counters go with them, so the live counters still match the live bookings
+        self.assertEqual(list(SlotOccupancy.objects.values_list('date', flat=True)), [datetime.date(2025, 7, 1)])
+        call_command('rebuild_slot_occupancy', verify=True, stdout=io.StringIO())
+        queued.refresh_from_db()
+        self.assertIsNone(queued.booking)
+        self.client.force_authenticate(user=user)
+        live = self.client.get(reverse('booking-list'))
+        self.assertEqual([b['booking_id'] for b in live.data['results']], ['new'])
+        history = self.client.get(reverse('booking-history'))
+        self.assertEqual(history.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['booking_id'] for b in history.data['results']], ['old-3', 'old-2', 'old-1'])
+        self.assertEqual(history.data['results'][0]['room'], 'Shared1')
+        # This week's bookings count toward weekly quotas, so they stay live
+        with self.assertRaisesMessage(CommandError, 'Cannot archive bookings from the current week'):
+            call_command('archive_bookings', before=timezone.localdate() + datetime.timedelta(days=7), stdout=io.StringIO())
+
+    def test_import_workspace(self):
+        print("\nTest: The import command should bulk create valid rows and report the invalid ones per row.")
+        User.objects.create_user(username='existing', password='pass123')
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {}
+            for name, content in [
+                ('rooms.csv', 'name,room_type,capacity\nPrivate1,private,1\nShared1,shared,6\nLounge,lounge,3\n'),
+                ('users.jsonl', '\n'.join(json.dumps(row) for row in [
+                    {'username': 'alice', 'password': 'secret1', 'age': 30, 'gender': 'female'},
+                    {'username': 'bob', 'password': 'secret2', 'age': 31, 'gender': 'male'},
+                    {'username': 'carol', 'password': 'secret3', 'age': 32, 'gender': 'female'},
+                    {'username': 'existing', 'password': 'secret4', 'age': 33, 'gender': 'male'},
+                    {'username': 'alice', 'password': 'secret5', 'age': 34, 'gender': 'female'},
+                    {'username': 'dave', 'password': 'secret6', 'age': 'old', 'gender': 'male'},
+                ]) + '\nnot json\n'),
+                ('teams.json', json.dumps([
+                    {'name': 'TeamA', 'members': ['alice', 'bob', 'carol']},
+                    {'name': 'TeamB', 'members': ['alice', 'bob', 'zed']},
+                ])),
+            ]:
+                paths[name] = f'{directory}/{name}'
+                with open(paths[name], 'w') as f:
+                    f.write(content)
+            output = io.StringIO()
+            with self.assertRaisesMessage(CommandError, 'Validated 3 rooms: 1 invalid.'):
+                call_command('import_workspace', 'rooms', paths['rooms.csv'], dry_run=True, stdout=output)
+            self.assertIn('row 3: room_type must be private, conference or shared.', output.getvalue())
+            self.assertFalse(Room.objects.exists())
+            call_command('import_workspace', 'rooms', paths['rooms.csv'], stdout=io.StringIO())
+            output = io.StringIO()
+            call_command('import_workspace', 'users', paths['users.jsonl'], workers=2, chunk_size=2, stdout=output)
+            output = output.getvalue()
+            self.assertIn('Imported 3 users, 4 rows failed.', output)
+            self.assertIn('row 4: username "existing" already exists.', output)
+            self.assertIn('row 5: Duplicate username "alice" in this file.', output)
+            self.assertIn('row 6: age must be a whole number.', output)
+            self.assertIn('row 7: Row could not be parsed.', output)
+            output = io.StringIO()
+            call_command('import_workspace', 'teams', paths['teams.json'], stdout=output)
+            self.assertIn('row 2: Unknown members: zed.', output.getvalue())
+        self.assertEqual(sorted(Room.objects.values_list('name', flat=True)), ['Private1', 'Shared1'])
+        self.assertEqual(UserProfile.objects.get(user__username='bob').age, 31)
+        self.assertEqual(sorted(Team.objects.get(name='TeamA').members.values_list('username', flat=True)), ['alice', 'bob', 'carol'])
+        # Passwords hashed in the pool work for login
+        response = self.client.post(reverse('login'), {'username': 'carol', 'password': 'secret3'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bench_booking(self):
+        print("\nTest: The benchmark command should report latency and query counts for every scenario.")
+        with tempfile.NamedTemporaryFile(mode='r', suffix='.json') as output:
+            call_command(
+                'bench_booking', rooms=6, users=10, teams=2, bookings=30, iterations=3,
+                concurrency=0, no_test_db=True, output=output.name, stderr=io.StringIO(),
+            )
+            results = json.load(output)
+        self.assertEqual(
+            set(results['scenarios']),
+            {'booking_create', 'conference_booking', 'available_rooms', 'booking_list', 'booking_cancel'},
+        )
+        self.assertEqual(results['scenarios']['booking_list']['latency_ms']['count'], 3)
+        self.assertIn('p95', results['scenarios']['available_rooms']['latency_ms'])
+        # The connect-overhead comparison needs a real database server
+        self.assertIn('skipped', results['connection_overhead'])
+        self.assertIn('skipped', results['server_modes'])
+        self.assertEqual(results['failures'], [])
+
+    def test_bench_booking_fails_over_budget(self):
+        print("\nTest: The benchmark command should fail when a scenario goes over its query budget.")
+        budgets = dict(settings.BOOKING_METRICS, BUDGETS={'GET booking-list': {'QUERIES': 0}})
+        with tempfile.NamedTemporaryFile(mode='r', suffix='.json') as output, override_settings(BOOKING_METRICS=budgets):
+            with self.assertRaisesMessage(CommandError, 'GET booking-list: 2 queries, budget is 0.'):
+                call_command(
+                    'bench_booking', rooms=6, users=10, teams=2, bookings=30, iterations=3, concurrency=5,
+                    no_test_db=True, skip_connection_overhead=True, server_concurrency=0, output=output.name, stderr=io.StringIO(),
+                )
+            results = json.load(output)
+        self.assertEqual(results['scenarios']['booking_list']['over_query_budget'], ['GET booking-list'])
+        # Concurrent writers need a database server
+        self.assertIn('skipped', results['contention'])
+
+
+# Tests for database connection handling
+class ConnectionTests(TestCase):
+    def test_warm_up_connections(self):
+        print("\nTest: Worker warm-up should open a usable connection for every database.")
+        self.assertEqual(warm_up_connections(), ['default'])
+        self.assertEqual(Room.objects.count(), 0)
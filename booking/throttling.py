@@ -0,0 +1,81 @@
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+THROTTLE_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    # Per scope: RATE requests per second refill the bucket, which holds at most BURST; None turns a scope off
+    'RATES': {
+        'booking': None,
+        'availability': None,
+    },
+}
+
+
+def throttle_config():
+    return {**THROTTLE_DEFAULTS, **getattr(settings, 'BOOKING_THROTTLE', {})}
+
+
+# TokenBucket keeps one (tokens, last refill) pair per client in a Django cache.
+# Each request takes a token; tokens come back at RATE per second up to BURST, so a client may burst
+# and then settle at RATE. The read-modify-write is serialized per process; across workers two racing
+# requests can both take the last token, which only lets a request or two through early.
+class TokenBucket:
+    _lock = threading.Lock()
+
+    def __init__(self, scope):
+        self.scope = scope
+
+    def enabled(self):
+        rates = throttle_config()['RATES'].get(self.scope)
+        return bool(rates) and rates.get('RATE') is not None
+
+    def consume(self, ident, now=None):
+        # 0 if the request may go ahead, otherwise the seconds until a token is back
+        if not self.enabled():
+            return 0
+        config = throttle_config()
+        rates = config['RATES'][self.scope]
+        rate, burst = rates['RATE'], rates['BURST']
+        cache = caches[config['CACHE_ALIAS']]
+        key = f'booking:throttle:{self.scope}:{ident}'
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = cache.get(key) or (burst, now)
+            tokens = min(burst, tokens + max(0, now - updated) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            # Kept until the bucket would be full again; a missing entry means a full bucket
+            cache.set(key, (tokens - 1, now), math.ceil(burst / rate) + 1)
+        return 0
+
+
+# TokenBucketThrottle is the DRF throttle for a TokenBucket scope, keyed on the authenticated user
+# (anonymous clients by address), so abusive clients are turned away before the view runs any query
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_cache_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.retry_after = TokenBucket(self.scope).consume(self.get_cache_ident(request))
+        return self.retry_after == 0
+
+    def wait(self):
+        return self.retry_after
+
+
+# Booking writes: POST /api/v1/bookings/ and /api/v1/bookings/bulk/
+class BookingRateThrottle(TokenBucketThrottle):
+    scope = 'booking'
+
+
+# Availability reads: available rooms, the grid and slot suggestions
+class AvailabilityRateThrottle(TokenBucketThrottle):
+    scope = 'availability'
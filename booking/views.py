@@ -1,19 +1,36 @@
-from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from .models import Booking, Room, Team, UserProfile
-from .serializers import BookingSerializer, UserSerializer, UserRegistrationSerializer, UserProfileSerializer
+from .models import ArchivedBooking, Booking, BookingRequest, Room, Team, UserProfile, BOOKING_HOURS, CONFERENCE_MIN_MEMBERS
+from .cache import availability_cache, occupancy_index, slot_date, team_cache
+from .metrics import registry
+from .authentication import token_cache
+from .export import EXPORT_FORMATS, export_filters, export_stream
+from .suggestions import booking_suggestions, find_suggestions, suggestion_params
+from .quotas import QuotaExceeded
+from .idempotency import idempotent_requests
+from .filters import booking_list_etag, booking_list_params, booking_list_queryset
+from .throttling import AvailabilityRateThrottle, BookingRateThrottle
+from .serializers import ArchivedBookingSerializer, BookingSerializer, UserSerializer, UserRegistrationSerializer, UserProfileSerializer
 from django.db import transaction
+from django.conf import settings
+from django.urls import NoReverseMatch, reverse
+from django.db.models import Q
 from django.utils import timezone
+import hashlib
 import uuid
-from rest_framework.permissions import AllowAny, IsAuthenticated
+import datetime
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.core.exceptions import ValidationError
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 
 # Create your views here.
 
@@ -39,22 +56,98 @@ class RegisterView(APIView):
 class LoginView(ObtainAuthToken):
     permission_classes = [AllowAny]
     def post(self, request, *args, **kwargs):
-        # Authenticate user and return token and profile
-        response = super().post(request, *args, **kwargs)
-        token = Token.objects.get(key=response.data['token'])
-        user = token.user
+        # Authenticate user and return token and profile; the user from authentication is reused throughout
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+        token.user = user
         profile = UserProfile.objects.get(user=user)
+        profile.user = user
+        # The client's next request will present this token; have it ready in the cache
+        token_cache.set(token)
         return Response({
             'token': token.key,
             'user': UserProfileSerializer(profile).data
         })
 
+# Largest number of slots accepted by one bulk booking request
+MAX_BULK_SLOTS = 200
+
+# Marks a slot whose room_id is not a whole number
+INVALID_ROOM_ID = 'invalid'
+
+
+def bulk_room_id(value):
+    # JSON bodies may carry room ids as numbers or strings; None when missing
+    if value in [None, '']:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return INVALID_ROOM_ID
+
+def expand_recurrence(recurrence):
+    # Turn {start_date, end_date, hour, weekdays} into one slot per matching day (weekdays default to Monday-Friday)
+    start_date = datetime.date.fromisoformat(recurrence['start_date'])
+    end_date = datetime.date.fromisoformat(recurrence['end_date'])
+    hour = int(recurrence['hour'])
+    weekdays = set(recurrence.get('weekdays', [0, 1, 2, 3, 4]))
+    room_id = recurrence.get('room_id')
+    slots = []
+    day = start_date
+    while day <= end_date and len(slots) <= MAX_BULK_SLOTS:
+        if day.weekday() in weekdays:
+            slot = {'date': day.isoformat(), 'hour': hour}
+            if room_id:
+                slot['room_id'] = room_id
+            slots.append(slot)
+        day += datetime.timedelta(days=1)
+    return slots
+
+def booking_queue_config():
+    # BOOKING_QUEUE settings with defaults; admission queueing is off unless ENABLED
+    return {
+        'ENABLED': False,
+        'INLINE_DRAIN': True,
+        'BATCH_SIZE': 200,
+        'WAIT_SECONDS': 2.0,
+        'POLL_INTERVAL': 0.05,
+        **getattr(settings, 'BOOKING_QUEUE', {}),
+    }
+
+# BookingCursorPagination pages booking lists by created_at (keyset), so deep pages cost the same as the first
+class BookingCursorPagination(CursorPagination):
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 # BookingViewSet handles booking creation, listing, and validation
 class BookingViewSet(viewsets.ModelViewSet):
-    queryset = Booking.objects.all().order_by('-created_at')
+    queryset = Booking.objects.select_related('room', 'user', 'team').order_by('-created_at')
     serializer_class = BookingSerializer
+    pagination_class = BookingCursorPagination
+
+    def get_throttles(self):
+        # Booking writes are rate limited per user before any slot is locked
+        if self.action in ['create', 'bulk']:
+            return [BookingRateThrottle()]
+        return super().get_throttles()
+
+    def get_queryset(self):
+        # Only the user's own bookings and their teams' bookings, with room/user/team joined up front
+        user = self.request.user
+        return self.queryset.filter(Q(user=user) | Q(team__in=user.teams.values('id')))
 
     def create(self, request, *args, **kwargs):
+        # Retries carrying an Idempotency-Key get the first request's response back instead of booking again
+        key = request.headers.get('Idempotency-Key')
+        if key is not None:
+            return idempotent_requests.respond(request, key, lambda: self.create_booking(request))
+        return self.create_booking(request)
+
+    def create_booking(self, request):
         # Extract and validate booking data
         data = request.data.copy()
         room_id = data.get('room_id')
@@ -81,33 +174,32 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Invalid hour value.'}, status=400)
 
         # Business rules for room types
+        team = None
         if room.room_type == 'private':
             # Private rooms: only individual users
             if team_id:
                 return Response({'detail': 'Private rooms can only be booked by individual users.'}, status=400)
         elif room.room_type == 'conference':
-            # Conference rooms: only teams with 3+ members
+            # Conference rooms: only teams with 3+ members, checked against the cached member count
             if not team_id:
                 return Response({'detail': 'Conference rooms can only be booked by teams.'}, status=400)
-            try:
-                team = Team.objects.get(id=team_id)
-            except Team.DoesNotExist:
+            team = team_cache.get_team(team_id)
+            if team is None:
                 return Response({'detail': 'Team does not exist.'}, status=404)
-            members = team.members.all()
-            if members.count() < 3:
+            if not team.is_conference_eligible():
                 return Response({'detail': 'Conference rooms require a team of at least 3 members.'}, status=400)
         elif room.room_type == 'shared':
             # Shared desks: only individuals
             if team_id:
                 return Response({'detail': 'Shared desks can only be booked by individual users.'}, status=400)
 
+        if booking_queue_config()['ENABLED']:
+            # Admission mode: the slot's queue decides requests in arrival order, quotas included
+            return self.create_queued(request, room, team, date, hour)
+
         try:
             # Use locking method to prevent race conditions
-            if team_id:
-                try:
-                    team = Team.objects.get(id=team_id)
-                except Team.DoesNotExist:
-                    return Response({'detail': 'Team does not exist.'}, status=404)
+            if team:
                 booking = Booking.create_booking_with_lock(
                     room=room,
                     team=team,
@@ -125,28 +217,236 @@ class BookingViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(booking)
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        except QuotaExceeded as e:
+            return Response({'detail': e.messages[0]}, status=400)
         except ValidationError as e:
-            return Response({'detail': str(e)}, status=400)
+            return self.rejected(str(e), e.messages[0], room, date, hour, user, team)
         except ValueError as e:
             return Response({'detail': str(e)}, status=400)
         except Exception as e:
             return Response({'detail': 'An error occurred while creating the booking.'}, status=500)
 
+    def rejected(self, detail, message, room, date, hour, user, team):
+        # 400 for a turned-down booking; a full slot or owner conflict also lists the nearest free slots
+        data = {'detail': detail}
+        if message in [room.slot_full_message(), Booking.owner_conflict_message(None if team else user)]:
+            suggestions = booking_suggestions(room, date, hour, user=user, team=team)
+            if suggestions is not None:
+                data['suggestions'] = suggestions
+        return Response(data, status=400)
+
+    def create_queued(self, request, room, team, date, hour):
+        # Queue the booking, then wait briefly for the result; a 202 with a ticket means it is still queued
+        config = booking_queue_config()
+        try:
+            queued = BookingRequest.enqueue(room=room, requested_by=request.user, team=team, date=date, hour=hour)
+        except ValidationError as e:
+            return Response({'detail': e.messages[0]}, status=400)
+        queued.wait(
+            config['WAIT_SECONDS'],
+            poll_interval=config['POLL_INTERVAL'],
+            drain=config['INLINE_DRAIN'],
+            batch_size=config['BATCH_SIZE'],
+        )
+        if queued.status == BookingRequest.BOOKED:
+            return Response(self.get_serializer(queued.booking).data, status=status.HTTP_201_CREATED)
+        if queued.status == BookingRequest.FAILED:
+            return self.rejected(queued.detail, queued.detail, room, date, hour, request.user, team)
+        return Response(
+            {'ticket': queued.ticket, 'status': queued.status, 'detail': 'Your booking is queued.'},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('booking-ticket', args=[queued.ticket])},
+        )
+
+    @action(detail=False, methods=['get'], url_path=r'tickets/(?P<ticket>[^/.]+)', url_name='ticket')
+    def ticket(self, request, ticket=None):
+        # Status of a queued booking request made by this user
+        try:
+            queued = BookingRequest.objects.select_related('booking__room', 'booking__user', 'booking__team').get(
+                ticket=ticket, requested_by=request.user
+            )
+        except BookingRequest.DoesNotExist:
+            return Response({'detail': 'Ticket not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'ticket': queued.ticket,
+            'status': queued.status,
+            'detail': queued.detail,
+            'booking': self.get_serializer(queued.booking).data if queued.booking else None,
+        })
+
+    @action(detail=False, methods=['get'], url_path='history')
+    def history(self, request):
+        # Past bookings moved out by archive_bookings, for the same owners as the live list, newest first
+        user = request.user
+        archived = ArchivedBooking.objects.select_related('room', 'user', 'team').filter(
+            Q(user=user) | Q(team__in=user.teams.values('id'))
+        ).order_by('-created_at')
+        page = self.paginate_queryset(archived)
+        return self.get_paginated_response(ArchivedBookingSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAdminUser])
+    def export(self, request):
+        # Stream every booking matching the filters as CSV or NDJSON (staff only).
+        # ?output= picks the format, since ?format= is taken by DRF's content negotiation.
+        output = request.GET.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({'detail': 'Output must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filters = export_filters(request.GET)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(export_stream(filters, output), content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="bookings.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        # Book many slots, or a weekly recurring series, in one transaction
+        data = request.data
+        mode = data.get('mode', 'all_or_nothing')
+        if mode not in ['all_or_nothing', 'best_effort']:
+            return Response({'detail': "mode must be 'all_or_nothing' or 'best_effort'."}, status=400)
+        if data.get('recurrence'):
+            try:
+                slots = expand_recurrence(data['recurrence'])
+            except (KeyError, TypeError, ValueError):
+                return Response({'detail': 'recurrence needs start_date, end_date and hour, with optional weekdays (0=Monday).'}, status=400)
+        else:
+            slots = data.get('slots')
+        if not slots or not isinstance(slots, list) or not all(isinstance(slot, dict) for slot in slots):
+            return Response({'detail': 'slots or recurrence is required.'}, status=400)
+        if len(slots) > MAX_BULK_SLOTS:
+            return Response({'detail': f'At most {MAX_BULK_SLOTS} slots can be booked in one request.'}, status=400)
+
+        # Fetch every room and the team once for the whole batch
+        default_room_id = data.get('room_id')
+        slot_room_ids = [bulk_room_id(slot.get('room_id', default_room_id)) for slot in slots]
+        rooms = Room.objects.in_bulk({room_id for room_id in slot_room_ids if isinstance(room_id, int)})
+        team = None
+        team_id = data.get('team_id')
+        if team_id:
+            team = team_cache.get_team(team_id)
+            if team is None:
+                return Response({'detail': 'Team does not exist.'}, status=404)
+
+        # Apply the same room-type rules as single bookings, per slot
+        results = [None] * len(slots)
+        requests = []
+        for index, slot in enumerate(slots):
+            room = rooms.get(slot_room_ids[index])
+            error = None
+            try:
+                hour = int(slot.get('hour'))
+            except (TypeError, ValueError):
+                hour = None
+                error = 'Invalid hour value.'
+            if slot_room_ids[index] == INVALID_ROOM_ID:
+                error = 'Invalid room id.'
+            elif room is None:
+                error = 'Room does not exist.'
+            elif error:
+                pass
+            elif room.room_type == 'private' and team:
+                error = 'Private rooms can only be booked by individual users.'
+            elif room.room_type == 'shared' and team:
+                error = 'Shared desks can only be booked by individual users.'
+            elif room.room_type == 'conference' and not team:
+                error = 'Conference rooms can only be booked by teams.'
+            elif room.room_type == 'conference' and not team.is_conference_eligible():
+                error = 'Conference rooms require a team of at least 3 members.'
+            if error:
+                results[index] = (None, error)
+            else:
+                requests.append((index, {
+                    'room': room,
+                    'user': None if team else request.user,
+                    'team': team,
+                    'date': slot.get('date'),
+                    'hour': hour,
+                }))
+
+        all_or_nothing = mode == 'all_or_nothing'
+        if all_or_nothing and any(results):
+            for index, _ in requests:
+                results[index] = (None, 'Not booked because another slot in this request failed.')
+        elif requests:
+            created = Booking.create_bookings_with_lock([r for _, r in requests], all_or_nothing=all_or_nothing)
+            for (index, _), result in zip(requests, created):
+                results[index] = result
+
+        response = []
+        for slot, (booking, error) in zip(slots, results):
+            item = {'room_id': slot.get('room_id', default_room_id), 'date': slot.get('date'), 'hour': slot.get('hour')}
+            if booking:
+                item.update({'status': 'booked', 'booking': self.get_serializer(booking).data})
+            else:
+                item.update({'status': 'failed', 'detail': error})
+            response.append(item)
+        booked = sum(1 for booking, _ in results if booking)
+        return Response(
+            {'mode': mode, 'booked': booked, 'failed': len(results) - booked, 'results': response},
+            status=status.HTTP_201_CREATED if booked else status.HTTP_400_BAD_REQUEST
+        )
+
     def list(self, request, *args, **kwargs):
-        # List all bookings for the user
-        return super().list(request, *args, **kwargs)
+        # List the user's and their teams' bookings, newest first, one cursor page at a time, filtered and with
+        # only the requested fields. The ETag comes from cached versions, so an unchanged page is a 304 before
+        # any query or serialization.
+        try:
+            filters = booking_list_params(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        etag = booking_list_etag(request.user, filters, request.build_absolute_uri(), request.accepted_media_type)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            page = self.paginate_queryset(booking_list_queryset(request.user, filters))
+            response = self.get_paginated_response(self.get_serializer(page, many=True, fields=filters['fields']).data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+# Rendered pages by template name; they hold no per-request data, so each is rendered once per process
+_rendered_pages = {}
+
+
+def page_context():
+    # Live slot updates are only routed under ASGI (virtual_workspace/asgi_urls.py); without them pages poll
+    try:
+        slot_stream_url = reverse('slot-stream')
+    except NoReverseMatch:
+        slot_stream_url = ''
+    return {'slot_stream_url': slot_stream_url}
+
+
+def render_page(request, template_name):
+    # Serve a static page from memory with an ETag, answering revalidations with 304 Not Modified
+    page = _rendered_pages.get(template_name)
+    if page is None:
+        content = render_to_string(template_name, page_context())
+        page = (content, '"' + hashlib.md5(content.encode()).hexdigest() + '"')
+        if not settings.DEBUG:
+            _rendered_pages[template_name] = page
+    content, etag = page
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content)
+        response['ETag'] = etag
+    # Pages point at hashed assets, so a new deploy only changes the page; browsers revalidate it each time
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 # Render home page
 def home(request):
-    return render(request, 'home.html')
+    return render_page(request, 'home.html')
 
 # Render dashboard page
 def dashboard(request):
-    return render(request, 'dashboard.html')
+    return render_page(request, 'dashboard.html')
 
 # AvailableRoomsView returns available rooms for a given type, date, and hour
 class AvailableRoomsView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AvailabilityRateThrottle]
     def get(self, request):
         room_type = request.GET.get('type')
         date = request.GET.get('date')
@@ -155,31 +455,27 @@ class AvailableRoomsView(APIView):
         if room_type:
             rooms = rooms.filter(room_type=room_type)
         available_rooms = []
-        # Check each room for availability
-        for room in rooms:
-            if date and hour:
-                try:
-                    hour_int = int(hour)
-                    # Use locking method to check availability
-                    is_available = Booking.check_availability(room, date, hour_int)
-                    if is_available:
-                        # For shared desks, calculate available spots
-                        if room.room_type == 'shared':
-                            count = Booking.objects.filter(room=room, date=date, hour=hour_int).count()
-                            available_spots = room.capacity - count
-                        else:
-                            available_spots = 1
-                        available_rooms.append({
-                            'id': room.id,
-                            'name': room.name,
-                            'type': room.room_type,
-                            'capacity': room.capacity,
-                            'available_spots': available_spots
-                        })
-                except ValueError:
-                    # Skip invalid hour values
-                    continue
-            else:
+        cache_key = None
+        if date and hour:
+            try:
+                hour_int = int(hour)
+            except ValueError:
+                # Invalid hour values match no rooms
+                hour_int = None
+            if hour_int is not None:
+                if slot_date(date) is None:
+                    return Response({'detail': 'Enter a valid date in YYYY-MM-DD format.'}, status=400)
+                if not BOOKING_HOURS[0] <= hour_int <= BOOKING_HOURS[-1]:
+                    return Response({'detail': 'Booking hours must be between 9 and 18 (9AM-6PM).'}, status=400)
+                # Serve a cached result while the slot and room versions are unchanged
+                cache_key = availability_cache.result_key(room_type, date, hour_int)
+                cached = availability_cache.get(cache_key)
+                if cached is not None:
+                    return Response(cached)
+                # Spots left for every room come from the day's occupancy arrays; a missing day loads in one query
+                available_rooms = occupancy_index.available(room_type, date, hour_int)
+        else:
+            for room in rooms:
                 available_rooms.append({
                     'id': room.id,
                     'name': room.name,
@@ -189,27 +485,99 @@ class AvailableRoomsView(APIView):
                 })
         # If no rooms available for the slot, return a message
         if date and hour and room_type and not available_rooms:
-            return Response({
+            result = {
                 'rooms': [],
                 'message': 'No available room for the selected slot and type.'
+            }
+        else:
+            result = {'rooms': available_rooms}
+        if cache_key is not None:
+            availability_cache.set(cache_key, result)
+        return Response(result)
+
+# SlotSuggestionView returns the free slots nearest a preferred one: same type, nearby hours and days, any room
+class SlotSuggestionView(APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [AvailabilityRateThrottle]
+    def get(self, request):
+        try:
+            params = suggestion_params(request.GET)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        # Slots the caller (or their team) already holds are left out
+        user = request.user if request.user.is_authenticated else None
+        suggestions = find_suggestions(
+            params['room_type'], params['date'], params['hour'],
+            days=params['days'],
+            hours=params['hours'],
+            room_id=params['room_id'],
+            user=user,
+            team_id=params['team_id'] if user else None,
+            limit=params['limit'],
+        )
+        return Response({'suggestions': suggestions})
+
+# Longest date range the availability grid will return in one call
+MAX_GRID_DAYS = 31
+
+# AvailabilityGridView returns slot occupancy for every room over a date range
+class AvailabilityGridView(APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [AvailabilityRateThrottle]
+    def get(self, request):
+        room_type = request.GET.get('type')
+        start = request.GET.get('start')
+        end = request.GET.get('end') or start
+        if not start:
+            return Response({'detail': 'start is required.'}, status=400)
+        try:
+            start_date = datetime.date.fromisoformat(start)
+            end_date = datetime.date.fromisoformat(end)
+        except ValueError:
+            return Response({'detail': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+        if end_date < start_date:
+            return Response({'detail': 'end must not be before start.'}, status=400)
+        if (end_date - start_date).days >= MAX_GRID_DAYS:
+            return Response({'detail': f'Date range cannot exceed {MAX_GRID_DAYS} days.'}, status=400)
+        dates = [start_date + datetime.timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        table, days = occupancy_index.load(dates)
+        # Each room lists booked counts per hour for the days that have bookings
+        rooms = []
+        for position in table.select(room_type):
+            occupancy = {}
+            for date in dates:
+                counts = days[date].room_counts(position, len(BOOKING_HOURS))
+                if any(counts):
+                    occupancy[date.isoformat()] = counts
+            rooms.append({
+                'id': table.ids[position],
+                'name': table.names[position],
+                'type': table.types[position],
+                'capacity': table.capacities[position],
+                'occupancy': occupancy,
             })
-        return Response({'rooms': available_rooms})
+        return Response({
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'hours': list(BOOKING_HOURS),
+            'rooms': rooms,
+        })
 
 # Render book room page
 def book_room(request):
-    return render(request, 'book_room.html')
+    return render_page(request, 'book_room.html')
 
 # Render available rooms page
 def available_rooms_page(request):
-    return render(request, 'available_rooms.html')
+    return render_page(request, 'available_rooms.html')
 
 # Render booked rooms page
 def booked_rooms_page(request):
-    return render(request, 'booked_rooms.html')
+    return render_page(request, 'booked_rooms.html')
 
 # Render cancel booking page
 def cancel_booking_page(request):
-    return render(request, 'cancel_booking.html')
+    return render_page(request, 'cancel_booking.html')
 
 # CancelBookingView handles booking cancellation and slot freeing
 class CancelBookingView(APIView):
@@ -235,17 +603,25 @@ def create_team(request):
     member_usernames = request.data.get('members', [])
     if not name or not member_usernames:
         return Response({'detail': 'Team name and at least 3 members are required.'}, status=400)
-    if len(member_usernames) < 3:
+    if len(member_usernames) < CONFERENCE_MIN_MEMBERS:
         return Response({'detail': 'Conference rooms require a team of at least 3 members.'}, status=400)
     from django.contrib.auth.models import User
-    members = User.objects.filter(username__in=member_usernames)
-    if members.count() < 3:
+    members = list(User.objects.filter(username__in=member_usernames).only('id', 'username'))
+    if len(members) < CONFERENCE_MIN_MEMBERS:
         return Response({'detail': 'Some users not found or less than 3 valid members.'}, status=400)
-    team = Team.objects.create(name=name)
-    team.members.set(members)
-    team.save()
+    # A new team has no memberships to diff against: insert them directly with the count already known
+    with transaction.atomic():
+        team = Team.objects.create(name=name, member_count=len(members))
+        Team.members.through.objects.bulk_create([Team.members.through(team=team, user=user) for user in members])
     return Response({'id': team.id, 'name': team.name, 'members': [u.username for u in members]}, status=201)
 
 # Render create team page
 def create_team_page(request):
-    return render(request, 'create_team.html')
+    return render_page(request, 'create_team.html')
+
+# Export per-endpoint request metrics for this worker in Prometheus text format (staff only;
+# scrapers authenticate with a staff user's token)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,24 @@
+# Gunicorn settings for the web container.
+# Every worker process keeps its own database connections (or its own psycopg pool), so size
+# GUNICORN_WORKERS together with DB_POOL_MAX_SIZE / GUNICORN_THREADS against PostgreSQL's max_connections.
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+# 'uvicorn.workers.UvicornWorker' serves virtual_workspace.asgi:application
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+# Recycle workers now and then; their connections are closed and reopened with them
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+# Connections must never be opened before the fork, so the app is loaded per worker
+preload_app = False
+
+
+def post_worker_init(worker):
+    # Connect before the first request arrives, so it doesn't pay the connection setup
+    from booking.db import warm_up_connections
+    aliases = warm_up_connections()
+    worker.log.info('Warmed up database connections: %s', ', '.join(aliases))
@@ -0,0 +1,22 @@
+"""
+ASGI config for virtual_workspace project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+The async availability and booking list views are served from here
+(see virtual_workspace/asgi_urls.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'virtual_workspace.settings')
+os.environ.setdefault('BOOKING_ASYNC_VIEWS', '1')
+# Each ASGI request runs its sync code in its own thread, so persistent per-thread connections
+# would pile up; this overrides DB_CONN_MAX_AGE from .env. Use DB_POOL=1 to reuse connections instead
+os.environ['DB_CONN_MAX_AGE'] = '0'
+
+application = get_asgi_application()
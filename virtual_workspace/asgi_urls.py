@@ -0,0 +1,17 @@
+"""
+URL configuration for the ASGI entry point.
+
+Same routes as virtual_workspace/urls.py, with the read-heavy endpoints served by the
+async views in booking/async_views.py. Patterns listed first win. The live slot stream
+exists only here: under WSGI each open stream would hold a whole worker.
+"""
+from django.urls import path
+from booking.async_views import available_rooms, booking_list, booking_export, slot_stream
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/v1/rooms/available/', available_rooms, name='available-rooms'),
+    path('api/v1/bookings/', booking_list, name='booking-list'),
+    path('api/v1/rooms/stream/', slot_stream, name='slot-stream'),
+    path('api/v1/bookings/export/', booking_export, name='booking-export'),
+] + sync_urlpatterns
@@ -24,9 +24,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-)nfc*6axr(jel!a1d99@lv!4%p1jwp!$30w)36(uprpbs(h6z#'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# On for a bare checkout; the Docker setup turns it off in .env (DEBUG=0) and lists its hosts in ALLOWED_HOSTS.
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booking.staticfiles.StaticFilesMiddleware',  # Collected assets from STATIC_ROOT, ahead of everything else
+    'booking.middleware.RequestMetricsMiddleware',  # Per-endpoint latency and query metrics (exported at /metrics/)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +56,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'virtual_workspace.urls'
+# The ASGI entry point sets BOOKING_ASYNC_VIEWS=1 to serve the async read views (virtual_workspace/asgi_urls.py)
+ROOT_URLCONF = 'virtual_workspace.asgi_urls' if os.environ.get('BOOKING_ASYNC_VIEWS') == '1' else 'virtual_workspace.urls'
 
 TEMPLATES = [
     {
@@ -71,10 +75,16 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'virtual_workspace.wsgi.application'
+ASGI_APPLICATION = 'virtual_workspace.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# By default each worker thread keeps its connection for DB_CONN_MAX_AGE seconds and health-checks it
+# before reuse. DB_POOL=1 switches to psycopg 3's connection pool instead (persistent connections are
+# then turned off, as Django requires). Pool sizes are per gunicorn worker process.
+
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
 
 DATABASES = {
     'default': {
@@ -84,6 +94,15 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'root'),
         'HOST': os.environ.get('POSTGRES_HOST', 'db'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+                'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),  # seconds to wait for a free connection
+            },
+        } if DB_POOL else {},
     }
 }
 
@@ -124,6 +143,18 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# collectstatic writes content-hashed copies of booking/static here, with .gz/.br variants beside them
+STATIC_ROOT = os.environ.get('STATIC_ROOT', str(BASE_DIR / 'staticfiles'))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'booking.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -132,9 +163,120 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'booking.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Point CACHE_BACKEND at a file-based or Redis cache so gunicorn workers share cached data
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'virtual-workspace'),
+    }
+}
+
+# Slot occupancy and availability result caching. Slot counts live in each worker's occupancy index;
+# availability results and the versions that invalidate them use CACHES[CACHE_ALIAS]. Set TTL to 0 to disable.
+BOOKING_SLOT_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 30,  # seconds
+    'TEAM_TTL': 300,  # seconds a team's member count stays cached for conference bookings
+    'INDEX_DAYS': 366,  # days of per-room occupancy arrays each worker keeps (booking.cache.occupancy_index)
+}
+
+# Token authentication cache (booking.authentication.CachedTokenAuthentication). Tokens are kept per worker
+# for LOCAL_TTL seconds in front of CACHES[CACHE_ALIAS] for TTL seconds. Deleting a token or saving its user
+# drops it from the shared cache at once; other workers' local copies age out within LOCAL_TTL.
+BOOKING_AUTH_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,  # seconds
+    'LOCAL_TTL': 5,  # seconds; 0 turns the per-worker tier off
+    'LOCAL_MAX_ENTRIES': 10000,
+}
+
+# Request metrics and budgets per resolved URL name ('METHOD url-name' keys override 'url-name').
+# Requests over a budget are logged to 'booking.metrics'; with RAISE_ON_BUDGET they raise (for tests).
+BOOKING_METRICS = {
+    'QUERY_BUDGET': 20,
+    'LATENCY_BUDGET_MS': 500,
+    'BUDGETS': {
+        'available-rooms': {'QUERIES': 3},
+        'availability-grid': {'QUERIES': 3},
+        'room-suggestions': {'QUERIES': 4},
+        'GET booking-list': {'QUERIES': 2},
+        'booking-history': {'QUERIES': 2},
+        'POST booking-list': {'QUERIES': 15},  # a turned-down booking adds 3 reads for suggestions
+        'cancel-booking': {'QUERIES': 8},
+        # Password hashing alone takes most of the default latency budget
+        'login': {'LATENCY_MS': 2000},
+        'register': {'LATENCY_MS': 2000},
+    },
+    'RAISE_ON_BUDGET': False,
+}
+
+# Live slot change streams (/api/v1/rooms/stream/). Events cross workers through CACHES[CACHE_ALIAS],
+# so point it at a shared cache when running more than one worker.
+BOOKING_EVENTS = {
+    'CACHE_ALIAS': 'default',
+    'HISTORY_TTL': 300,  # seconds events stay available to other workers and for Last-Event-ID replay
+    'POLL_INTERVAL': 0.5,  # seconds
+    'HEARTBEAT': 15,  # seconds
+    'MAX_STREAM_SECONDS': 300,  # clients reconnect after this and resume from Last-Event-ID
+}
+
+# Queue admission for booking bursts (POST /api/v1/bookings/). When enabled, each booking joins its slot's queue
+# and is decided in arrival order, in batches, by the waiting requests themselves (INLINE_DRAIN) and/or
+# `manage.py drain_booking_queue`. Requests not decided within WAIT_SECONDS get 202 and a ticket to poll.
+BOOKING_QUEUE = {
+    'ENABLED': os.environ.get('BOOKING_QUEUE', '0') == '1',
+    'INLINE_DRAIN': True,
+    'BATCH_SIZE': 200,
+    'WAIT_SECONDS': 2.0,
+    'POLL_INTERVAL': 0.05,  # seconds
+}
+
+# Alternative slots (/api/v1/rooms/suggestions/, and the 400 for a full slot or double booking): free slots of the
+# same room type within DAYS days and HOURS hours of the requested one, nearest first, at most LIMIT of them.
+BOOKING_SUGGESTIONS = {
+    'DAYS': 1,
+    'HOURS': 2,
+    'LIMIT': 5,
+    'ON_BOOKING_ERROR': True,
+}
+
+# Booking quotas: how many bookings one user or team may hold dated on one day or in one ISO week (None for no
+# limit). Counted from bookings inside the booking transaction, under a row lock on the user or team.
+# Off by default; for example 8/30 per user and 10/40 per team.
+BOOKING_QUOTAS = {
+    'USER_PER_DAY': None,
+    'USER_PER_WEEK': None,
+    'TEAM_PER_DAY': None,
+    'TEAM_PER_WEEK': None,
+}
+
+# Token-bucket request throttling per user (per address for anonymous clients), in CACHES[CACHE_ALIAS].
+# Each scope refills RATE requests per second up to a burst of BURST; over it the API answers 429 with Retry-After.
+# Off by default (None); for example {'RATE': 1.0, 'BURST': 30} for booking and {'RATE': 10.0, 'BURST': 120}
+# for availability.
+BOOKING_THROTTLE = {
+    'CACHE_ALIAS': 'default',
+    'RATES': {
+        'booking': None,  # POST /api/v1/bookings/ and /api/v1/bookings/bulk/
+        'availability': None,  # available rooms, grid, suggestions and the slot stream
+    },
+}
+
+# Idempotent booking creation: POST /api/v1/bookings/ with an Idempotency-Key header stores its 201/202 response in
+# CACHES[CACHE_ALIAS] for TTL seconds, and retries with the same key get that response back without booking again.
+# The 409 for a key still in flight needs an atomic add: Redis or Memcached, or the file cache on a single host.
+BOOKING_IDEMPOTENCY = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 86400,  # seconds
+    'PENDING_TTL': 30,  # seconds a key stays claimed while its first request runs
+}
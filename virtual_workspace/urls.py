@@ -15,9 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from booking.views import BookingViewSet, RegisterView, LoginView, home, dashboard, AvailableRoomsView, book_room, available_rooms_page, booked_rooms_page, cancel_booking_page, CancelBookingView, create_team, create_team_page
+from booking.views import BookingViewSet, RegisterView, LoginView, home, dashboard, AvailableRoomsView, AvailabilityGridView, SlotSuggestionView, book_room, available_rooms_page, booked_rooms_page, cancel_booking_page, CancelBookingView, create_team, create_team_page, metrics
+from booking.staticfiles import static_asset
 from rest_framework.authtoken.views import obtain_auth_token
 
 router = DefaultRouter()
@@ -32,6 +33,8 @@ urlpatterns = [
     path('', home, name='home'),
     path('dashboard/', dashboard, name='dashboard'),
     path('api/v1/rooms/available/', AvailableRoomsView.as_view(), name='available-rooms'),
+    path('api/v1/rooms/grid/', AvailabilityGridView.as_view(), name='availability-grid'),
+    path('api/v1/rooms/suggestions/', SlotSuggestionView.as_view(), name='room-suggestions'),
     path('book-room/', book_room, name='book-room'),
     path('available-rooms/', available_rooms_page, name='available-rooms-page'),
     path('booked-rooms/', booked_rooms_page, name='booked-rooms-page'),
@@ -39,4 +42,6 @@ urlpatterns = [
     path('cancel-booking/', cancel_booking_page, name='cancel-booking-page'),
     path('api/v1/teams/create/', create_team, name='create_team'),
     path('create-team/', create_team_page, name='create_team_page'),
+    path('metrics/', metrics, name='metrics'),
+    re_path(r'^static/(?P<path>.+)$', static_asset, name='static-asset'),
 ]